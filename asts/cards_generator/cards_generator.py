@@ -1,27 +1,40 @@
-from anki.collection import Collection
+from anki.collection import AddNoteRequest, Collection
 from anki.decks import DeckId
 from anki.notes import Note
 from anki.models import NotetypeDict
 
-from concurrent.futures import Future, ThreadPoolExecutor, wait
-from os                 import path
-from threading          import Lock, Thread, Event
-from typing             import cast, Callable, Generator
+from concurrent.futures import Future
+from functools          import partial
+from math               import ceil
+from queue              import Queue
+from threading          import Lock, Thread
+from typing             import Any, Callable, Generator
 
 from asts.custom_typing.globals import (
-    CACHE_MEDIA_DIR, VIDEO_FORMAT, AUDIO_FORMAT, IMAGE_FORMAT
+    VIDEO_FORMAT, AUDIO_FORMAT, IMAGE_FORMAT, AUDIO_ENCODE_SETTINGS, IMAGE_ENCODE_SETTINGS,
+    MAX_SEGMENTS_PER_BATCH, MAX_BATCH_GAP_SECONDS, NOTES_PER_TRANSACTION
 )
-from asts.utils.core_utils import _print, get_chunked, NEW_LINE
-from asts.utils.extra_utils import cut_video, remove_cached_media_files
+from asts.utils.core_utils import _print, get_chunked, get_file_identity, NEW_LINE
+from asts.utils.extra_utils import cut_video, cut_video_clip, cut_videos_batch, remove_cached_media_files
+from asts.utils.sync_utils import detect_sync_offsets, get_sync_offset
 from asts.custom_typing.aliases  import (
-    OptionalFilename, Filepath, OptionalVideoFilepath,
+    OptionalFilename, Filepath, OptionalFilepath, OptionalVideoFilepath,
     OptionalAudioFilepath, OptionalImageFilepath,
 )
 from asts.custom_typing.card_info import CardInfo, CardInfoIndex
-from asts.custom_typing.dialogue_info import DialogueInfo, DialogueInfoIndex
-from asts.custom_typing.typed_list_store import TypedListStore
+from asts.custom_typing.dialogue_store import DialogueStore
 from asts.custom_typing.cards_editor_states import CardsEditorState, CardsEditorStates
+from asts.custom_typing.process_registry import ProcessRegistry
 from asts.custom_typing.pango_markup_to_html import PangoMarkupToHTML
+from asts.cards_generator.job_queue import EpisodeCheckpoint
+from asts.cards_generator.media_scheduler import MediaScheduler
+from asts.cards_generator.progress_aggregator import ProgressAggregator, ProgressSnapshot, ProgressStage
+from asts.custom_typing.audio_track_cache import AudioTrackCache
+from asts.custom_typing.voice_activity_cache import VoiceActivityCache
+from asts.custom_typing.video_metadata import VideoMetadata
+from asts.custom_typing.video_clip_mode import VideoClipMode
+from asts.custom_typing.media_cache import MediaCache
+from asts.custom_typing.timestamp import Timestamp
 
 
 class CardsGenerator(Thread):
@@ -29,12 +42,16 @@ class CardsGenerator(Thread):
         self,
         anki_collection_filepath: Filepath,
         video_filepath: Filepath,
-        _dialogue_info_list_store_front: TypedListStore[DialogueInfo],
-        _dialogue_info_list_store_back: TypedListStore[DialogueInfo],
+        _dialogue_info_list_store_front: DialogueStore,
+        _dialogue_info_list_store_back: DialogueStore,
         deck_name: str,
         cards_editor_state: CardsEditorState,
-        idle_add_update_progress_bar: Callable[[int, int], None],
-        max_workers: int = 2
+        update_progress: Callable[[ProgressSnapshot], None],
+        max_workers: int | None = None,
+        use_audio_track_cache: bool = False,
+        episode_checkpoint: EpisodeCheckpoint | None = None,
+        sync_to_audio: bool = False,
+        video_clip_mode: VideoClipMode = VideoClipMode.REENCODE
     ) -> None:
         """
         CardsGenerator
@@ -43,35 +60,79 @@ class CardsGenerator(Thread):
 
         :param anki_collection_filepath: Anki's collection filepath.
         :param video_filepath: Video filepath.
-        :param _dialogue_info_list_store_front: ListStore object filled with DialogueInfo objects.
-        :param _dialogue_info_list_store_back: ListStore object filled with DialogueInfo objects.
+        :param _dialogue_info_list_store_front: DialogueStore with the dialogues of the front of the cards.
+        :param _dialogue_info_list_store_back: DialogueStore with the dialogues of the back of the cards.
         :param deck_name: Anki's deck name.
         :param cards_editor_state: State object that keeps the track of CardsEditor's class state.
-        :param idle_add_update_progress_bar: A callable to be called when Futures are
-                                             done to update the CardsEditor's Gtk.ProgressBar.
-        :param max_workers: The maximum number of threads that can be used to execute the given calls.
+        :param update_progress: A callable to be called with the progress as tasks are done,
+                                at most once every PROGRESS_UPDATE_INTERVAL_SECONDS and from any thread,
+                                see ProgressAggregator.
+        :param max_workers: The maximum number of ffmpeg processes running at once,
+                            defaults to the number of CPUs. The actual number is adapted while running.
+        :param use_audio_track_cache: Decode the audio track of the video only once and slice
+                                      the audio clips out of it instead of cutting them from the video.
+        :param episode_checkpoint: Checkpoint of a JobQueue episode, cards already committed
+                                   to the collection are skipped and the new ones are recorded.
+        :param sync_to_audio: Detect how far the subtitles are from the voice of the video
+                              and shift the timestamps of the cards by it before cutting the medias.
+        :param video_clip_mode: How the video clips are cut, the clips are stream copied from the keyframes
+                                of the video unless it's REENCODE, see VideoClipMode.
         :return:
         """
 
         super().__init__()
 
         self._video_filepath: Filepath = video_filepath
-        self._dialogue_info_list_store_front: TypedListStore[DialogueInfo] = _dialogue_info_list_store_front
-        self._dialogue_info_list_store_back: TypedListStore[DialogueInfo] = _dialogue_info_list_store_back
+        # Must be taken before opening the Collection, since it changes the working directory
+        self._video_identity: str = get_file_identity(video_filepath)
+        self._media_cache: MediaCache = MediaCache()
+        self._scheduled_media_filepaths: set[Filepath] = set()
+        self._dialogue_info_list_store_front: DialogueStore = _dialogue_info_list_store_front
+        self._dialogue_info_list_store_back: DialogueStore = _dialogue_info_list_store_back
         self._deck_name: str = deck_name
+        self._deck_id: DeckId
         # Collection actually changes the directory
         # to the path of anki_collection_filepath
         self._deck: Collection =  Collection(anki_collection_filepath)
-        self._idle_add_update_progress_bar: Callable[[int, int], None] = idle_add_update_progress_bar
+        self._update_progress: Callable[[ProgressSnapshot], None] = update_progress
         self._lock: Lock
         self._cards_editor_state: CardsEditorState = cards_editor_state
-        self._max_workers: int = max_workers
-        self._cut_medias_future: list[Future[None]] = []
+        self._episode_checkpoint: EpisodeCheckpoint | None = episode_checkpoint
+        # ffmpeg processes running, killed as soon as the cards generator is cancelled
+        self._process_registry: ProcessRegistry = ProcessRegistry()
+        self._media_scheduler: MediaScheduler = MediaScheduler(max_workers)
+        self._progress_aggregator: ProgressAggregator = ProgressAggregator(
+            update_progress,
+            self._media_scheduler.get_concurrency
+        )
+        self._audio_track_cache: AudioTrackCache | None = (
+            AudioTrackCache(video_filepath, self._process_registry) if use_audio_track_cache else None
+        )
+        self._voice_activity_cache: VoiceActivityCache | None = (
+            VoiceActivityCache(video_filepath) if sync_to_audio else None
+        )
+        self._video_clip_mode: VideoClipMode = video_clip_mode
+        # Unless they're re-encoded, the video clips are cut on their own from the keyframes of the video
+        self._is_cutting_clips_from_keyframes: bool = video_clip_mode != VideoClipMode.REENCODE
+        self._video_metadata: VideoMetadata = VideoMetadata(video_filepath)
+        # position -> offset pairs the timestamps are shifted by, see detect_sync_offsets
+        self._sync_offsets: list[tuple[int, int]] = []
+        self._cut_medias_future: list[Future[bool]] = []
         self._prepare_cards_future: list[Future[None]] = []
-        self._futures_list: list[Future[None]] = []
-        self._chunks_card_info_list: list[list[CardInfo]]
-        self._total_number_tasks: int = 0
-        self._number_completed_tasks: int = 0
+        # filepath of a media -> future of the worker cutting it
+        self._media_futures: dict[Filepath, Future[bool]] = {}
+        # number of medias each card is still waiting for, indexed as _card_info_list
+        self._pending_medias_count: list[int] = []
+        # indexes of the cards whose medias are all done, ready to be written
+        self._ready_cards_queue: Queue[int] = Queue()
+        self._futures_list: list[Future[Any]] = []
+        self._card_info_list: list[CardInfo]
+        self._pending_card_info_list: list[CardInfo]
+        # Outcome of the run, see is_successful
+        self._is_successful: bool = False
+        self._exception: Exception | None = None
+        # Cards left out by _write_cards, because of a media missing or a note that couldn't be created
+        self._number_failed_cards: int = 0
 
 
     def _create_card(
@@ -125,109 +186,562 @@ class CardsGenerator(Thread):
         return note
 
 
-    def _write_card(
+    def _prepare_note(self, card: CardInfo) -> Note | None:
+        """
+        _prepare_note
+
+        Creates the note of a card, adding its medias to the anki.collection.
+
+        :param card: A CardInfo object with data related to a specific card.
+        :return: The note to be added to the anki.collection.
+        """
+
+        # the database can't be used concurrently,
+        # only the thread running _write_cards should call this,
+        # otherwise DBError will be raised
+        front_field: str                    = card[CardInfoIndex.FRONT_FIELD]
+        back_field: str                     = card[CardInfoIndex.BACK_FIELD]
+        video: OptionalVideoFilepath        = self._get_cached_media_filepath(card[CardInfoIndex.VIDEO_FILEPATH])
+        audio: OptionalAudioFilepath        = self._get_cached_media_filepath(card[CardInfoIndex.AUDIO_FILEPATH])
+        image: OptionalImageFilepath        = self._get_cached_media_filepath(card[CardInfoIndex.IMAGE_FILEPATH])
+        video_filepath: OptionalFilename    = None
+        audio_filepath: OptionalFilename    = None
+        image_filepath: OptionalFilename    = None
+
+        # A card missing some of its medias is left out, rather than written incomplete
+        if (
+            bool(video) != bool(card[CardInfoIndex.VIDEO_FILEPATH])
+            or bool(audio) != bool(card[CardInfoIndex.AUDIO_FILEPATH])
+            or bool(image) != bool(card[CardInfoIndex.IMAGE_FILEPATH])
+        ):
+            _print(f"Failed to cut medias for card: {front_field}{NEW_LINE}{back_field}{NEW_LINE}", True)
+
+            return None
+
+        # Medias are content addressed, Anki won't duplicate a media already in its collection
+        if video:
+            video_filepath = self._deck.media.add_file(video)
+
+        if audio:
+            audio_filepath = self._deck.media.add_file(audio)
+
+        if image:
+            image_filepath = self._deck.media.add_file(image)
+
+        note: Note | None = self._create_card(
+            front_field,
+            back_field,
+            video_filepath,
+            audio_filepath,
+            image_filepath
+        )
+
+        if not note:
+            _print(f"Failed to create note: {front_field}{NEW_LINE}{back_field}{NEW_LINE}", True)
+
+        return note
+
+
+    def _add_notes(self, notes: list[tuple[int, Note]]) -> None:
+        """
+        _add_notes
+
+        Adds the notes to the anki.collection within a single transaction, resolving the futures of their cards
+        and checkpointing them along with the medias cut so far.
+
+        :param notes: Notes to be added along with the index of their cards.
+        :return:
+        """
+
+        if not notes: return
+
+        try:
+            self._deck.add_notes([AddNoteRequest(note=note, deck_id=self._deck_id) for _, note in notes])
+        except Exception as e:
+            _print(f"Failed to add {len(notes)} notes: {e}{NEW_LINE}", True)
+
+            for card_index, _ in notes:
+                self._prepare_cards_future[card_index].set_exception(e)
+
+            return
+
+        self._media_cache.save()
+
+        if self._episode_checkpoint:
+            self._episode_checkpoint.commit([self._card_info_list[card_index].get_key() for card_index, _ in notes])
+
+        for card_index, _ in notes:
+            self._prepare_cards_future[card_index].set_result(None)
+
+
+    def _get_cached_media_filepath(self, filepath: OptionalFilepath) -> OptionalFilepath:
+        """
+        _get_cached_media_filepath
+
+        Gets the filepath of a media only if it's in the media cache.
+
+        :param filepath: Filepath of the media within the media cache.
+        :return: The filepath if the media is cached, None otherwise.
+        """
+
+        if not filepath or not self._media_cache.contains(filepath): return None
+
+        return filepath
+
+
+    def _get_media_filepath(
         self,
-        card: CardInfo,
-        wait_for_cut_medias_completion_event: Event
-    ) -> None:
+        start_timestamp: Timestamp,
+        end_timestamp: Timestamp,
+        media_format: str,
+        encode_settings: str
+    ) -> Filepath:
+        """
+        _get_media_filepath
+
+        Gets the filepath of a media of the video within the media cache.
+
+        :param start_timestamp: Start timestamp of the media.
+        :param end_timestamp: End timestamp of the media.
+        :param media_format: Media file format.
+        :param encode_settings: Settings used to encode the media.
+        :return: Filepath of the media within the media cache.
+        """
+
+        return self._media_cache.get_filepath(
+            self._video_identity,
+            start_timestamp.timestamp,
+            end_timestamp.timestamp,
+            media_format,
+            encode_settings
+        )
+
+
+    def _get_pending_media_filepath(self, filepath: OptionalFilepath) -> OptionalFilepath:
+        """
+        _get_pending_media_filepath
+
+        Gets the filepath of a media only if it still has to be cut,
+        medias already cached or already scheduled to be cut are left out.
+
+        :param filepath: Filepath of the media within the media cache.
+        :return: The filepath if the media has to be cut, None otherwise.
+        """
+
+        if not filepath or filepath in self._scheduled_media_filepaths: return None
+
+        self._scheduled_media_filepaths.add(filepath)
+
+        if self._media_cache.contains(filepath): return None
+
+        return filepath
+
+
+    def _get_pending_card_info_list(self) -> list[CardInfo]:
+        """
+        _get_pending_card_info_list
+
+        Gets the cards with only the medias that still have to be cut.
+
+        :return: List of CardInfo objects.
+        """
+
+        self._scheduled_media_filepaths.clear()
+        pending_card_info_list: list[CardInfo] = []
+
+        for card_info in self._card_info_list:
+            video: OptionalVideoFilepath = self._get_pending_media_filepath(card_info[CardInfoIndex.VIDEO_FILEPATH])
+            audio: OptionalAudioFilepath = self._get_pending_media_filepath(card_info[CardInfoIndex.AUDIO_FILEPATH])
+            image: OptionalImageFilepath = self._get_pending_media_filepath(card_info[CardInfoIndex.IMAGE_FILEPATH])
+
+            if not (video or audio or image): continue
+
+            pending_card_info_list.append(
+                CardInfo(
+                    front_field=card_info[CardInfoIndex.FRONT_FIELD],
+                    back_field=card_info[CardInfoIndex.BACK_FIELD],
+                    start_timestamp=card_info[CardInfoIndex.START_TIMESTAMP],
+                    end_timestamp=card_info[CardInfoIndex.END_TIMESTAMP],
+                    video_filepath=video,
+                    audio_filepath=audio,
+                    image_filepath=image
+                )
+            )
+
+        return pending_card_info_list
+
+
+    def _on_medias_cut(self, card_info_list: list[CardInfo], future: Future[bool]) -> None:
         """
-        _write_card
+        _on_medias_cut
 
-        Creates and writes a new card to the anki.collection.
-        Can raise exception StopAsyncIteration in case of cancelling tasks.
+        Commits the medias to the media cache when they were cut successfully, discards them otherwise.
 
-        :param tuple_sentence: A CardInfo object with data related to a specific card.
-        :param wait_for_cut_medias_completion_event: Event for waiting on all medias completion.
+        :param card_info_list: Cards whose medias were cut.
+        :param future: The future that was completed.
         :return:
         """
 
-        if self._cards_editor_state.is_state(CardsEditorStates.CANCELLED): return
+        is_cut: bool = not future.cancelled() and future.exception() is None and future.result()
 
-        # Wait for medias to be completed before queuing them to start making cards.
-        wait_for_cut_medias_completion_event.wait()
+        for card_info in card_info_list:
+            for filepath in (
+                card_info[CardInfoIndex.VIDEO_FILEPATH],
+                card_info[CardInfoIndex.AUDIO_FILEPATH],
+                card_info[CardInfoIndex.IMAGE_FILEPATH]
+            ):
+                if not filepath: continue
 
-        # the database needs to write cards one by one
-        # we need to lock here to ensure that no more than one card
-        # is being written, otherwise DBError will be raised
-        with self._lock:
-            front_field: str                    = card[CardInfoIndex.FRONT_FIELD]
-            back_field: str                     = card[CardInfoIndex.BACK_FIELD]
-            video: OptionalVideoFilepath        = card[CardInfoIndex.VIDEO_FILEPATH]
-            audio: OptionalAudioFilepath        = card[CardInfoIndex.AUDIO_FILEPATH]
-            image: OptionalImageFilepath        = card[CardInfoIndex.IMAGE_FILEPATH]
-            video_filepath: OptionalFilename    = None
-            audio_filepath: OptionalFilename    = None
-            image_filepath: OptionalFilename    = None
-
-            if video:
-                video_filepath = self._deck.media.add_file(video)
-
-            if audio:
-                audio_filepath = self._deck.media.add_file(audio)
-
-            if image:
-                image_filepath = self._deck.media.add_file(image)
-
-            note: Note | None = self._create_card(
-                front_field,
-                back_field,
-                video_filepath,
-                audio_filepath,
-                image_filepath
+                if is_cut:
+                    self._media_cache.commit(filepath)
+                else:
+                    self._media_cache.discard(filepath)
+
+
+    def _get_card_info_list_to_batch(self) -> list[CardInfo]:
+        """
+        _get_card_info_list_to_batch
+
+        Gets the cards whose medias should be cut from the video in batches,
+        when the audio track cache is used the audios are left out since they're sliced from the cached track,
+        and unless the video clips are re-encoded they're left out since they're cut from the keyframes.
+
+        :return: List of CardInfo objects.
+        """
+
+        if not self._audio_track_cache and not self._is_cutting_clips_from_keyframes:
+            return self._pending_card_info_list
+
+        card_info_list: list[CardInfo] = [
+            CardInfo(
+                front_field=card_info[CardInfoIndex.FRONT_FIELD],
+                back_field=card_info[CardInfoIndex.BACK_FIELD],
+                start_timestamp=card_info[CardInfoIndex.START_TIMESTAMP],
+                end_timestamp=card_info[CardInfoIndex.END_TIMESTAMP],
+                video_filepath=None if self._is_cutting_clips_from_keyframes else card_info[CardInfoIndex.VIDEO_FILEPATH],
+                audio_filepath=None if self._audio_track_cache else card_info[CardInfoIndex.AUDIO_FILEPATH],
+                image_filepath=card_info[CardInfoIndex.IMAGE_FILEPATH]
+            )
+            for card_info in self._pending_card_info_list
+        ]
+
+        return [
+            card_info for card_info in card_info_list
+            if card_info[CardInfoIndex.VIDEO_FILEPATH]
+            or card_info[CardInfoIndex.AUDIO_FILEPATH]
+            or card_info[CardInfoIndex.IMAGE_FILEPATH]
+        ]
+
+
+    def _cut_audio(self, card_info: CardInfo, is_audio_track_prepared: bool) -> bool:
+        """
+        _cut_audio
+
+        Cuts the audio of a card, slicing it from the cached audio track when it's available
+        or falling back to cutting it from the video otherwise.
+
+        :param card_info: Card whose audio should be cut.
+        :param is_audio_track_prepared: If the cached audio track is ready to be sliced.
+        :return: True if the audio was cut.
+        """
+
+        if self._cards_editor_state.is_state(CardsEditorStates.CANCELLED): return False
+
+        audio_filepath: OptionalAudioFilepath = card_info[CardInfoIndex.AUDIO_FILEPATH]
+
+        if not audio_filepath: return True
+
+        if self._audio_track_cache and is_audio_track_prepared:
+            return self._audio_track_cache.encode_clip(
+                card_info[CardInfoIndex.START_TIMESTAMP].seconds,
+                card_info[CardInfoIndex.END_TIMESTAMP].seconds,
+                audio_filepath
+            )
+
+        return cut_video(
+            self._video_filepath,
+            card_info,
+            self._cards_editor_state,
+            process_registry=self._process_registry
+        )
+
+
+    def _cut_video_clip(self, card_info: CardInfo, are_keyframes_prepared: bool) -> bool:
+        """
+        _cut_video_clip
+
+        Cuts the video clip of a card from the keyframes of the video when they're indexed,
+        or falls back to re-encoding it otherwise.
+
+        :param card_info: Card whose video clip should be cut.
+        :param are_keyframes_prepared: If the keyframes of the video are indexed.
+        :return: True if the video clip was cut.
+        """
+
+        if are_keyframes_prepared:
+            return cut_video_clip(
+                self._video_filepath,
+                card_info,
+                self._cards_editor_state,
+                self._video_metadata,
+                self._video_clip_mode,
+                process_registry=self._process_registry
             )
 
-            if not note:
-                _print(f"Failed to create note: {front_field}{NEW_LINE}{back_field}{NEW_LINE}", True)
+        return cut_video(
+            self._video_filepath,
+            card_info,
+            self._cards_editor_state,
+            process_registry=self._process_registry
+        )
 
-                return
 
-            self._deck.addNote(note)
+    def _get_media_batches(self) -> list[list[CardInfo]]:
+        """
+        _get_media_batches
 
+        Groups the cards into batches covering contiguous time ranges of the video,
+        the cards are sorted by their start timestamp and spread across the workers,
+        a batch is broken whenever the gap to the next card makes seeking cheaper than decoding.
 
-    def _cut_medias(self, executor: ThreadPoolExecutor) -> None:
+        :return: A list of batches, each one sorted by the start timestamp of its cards.
+        """
+
+        sorted_card_info_list: list[CardInfo] = sorted(
+            self._get_card_info_list_to_batch(),
+            key=lambda card_info: card_info[CardInfoIndex.START_TIMESTAMP].milliseconds
+        )
+        batch_size: int = max(1, min(ceil(len(sorted_card_info_list) / self._media_scheduler.get_max_concurrency()), MAX_SEGMENTS_PER_BATCH))
+        batches: list[list[CardInfo]] = []
+
+        for chunk in get_chunked(sorted_card_info_list, batch_size):
+            batch: list[CardInfo] = [chunk[0]]
+
+            for previous_card_info, card_info in zip(chunk, chunk[1:]):
+                gap: float = (
+                    card_info[CardInfoIndex.START_TIMESTAMP].seconds
+                    - previous_card_info[CardInfoIndex.END_TIMESTAMP].seconds
+                )
+
+                if gap > MAX_BATCH_GAP_SECONDS:
+                    batches.append(batch)
+                    batch = []
+
+                batch.append(card_info)
+
+            batches.append(batch)
+
+        return batches
+
+
+    def _cut_medias(self) -> None:
         """
         _cut_medias
 
-        Cut the clip selected to be used at the creation of cards.
+        Cut the clip selected to be used at the creation of cards,
+        each worker cuts a whole batch of cards from a single ffmpeg process.
+        When the audio track cache is used, the audios are encoded from the cached track instead,
+        and unless the video clips are re-encoded, each of them is cut from the keyframes of the video on its own.
 
-        :param executor: Pool of threads where all workers will sit.
         :return:
         """
 
-        for card_info_list in self._chunks_card_info_list:
-            for card_info in card_info_list:
-                future: Future[None] = executor.submit(
-                    cut_video,
-                    self._video_filepath,
-                    card_info,
-                    self._cards_editor_state
+        for card_info_batch in self._get_media_batches():
+            future: Future[bool] = self._media_scheduler.submit(
+                cut_videos_batch,
+                self._video_filepath,
+                card_info_batch,
+                self._cards_editor_state,
+                self._process_registry,
+                self._has_audio_stream(),
+                work=self._get_medias_duration(card_info_batch)
+            )
+
+            self._cut_medias_future.append(future)
+            self._futures_list.append(future)
+            self._add_media_futures(card_info_batch, future)
+            self._progress_aggregator.add_tasks(ProgressStage.CUTTING)
+            future.add_done_callback(partial(self._on_medias_cut, card_info_batch))
+            future.add_done_callback(partial(self._on_task_done, ProgressStage.CUTTING))
+
+        if self._is_cutting_clips_from_keyframes:
+            # The batches above are already being cut while the keyframes are indexed
+            are_keyframes_prepared: bool = self._video_metadata.prepare_keyframes()
+
+            for card_info in self._pending_card_info_list:
+                if not card_info[CardInfoIndex.VIDEO_FILEPATH]: continue
+
+                # Only the video clip is cut here, the other medias of the card belong to a batch
+                self._submit_single_media(
+                    self._cut_video_clip,
+                    CardInfo(
+                        start_timestamp=card_info[CardInfoIndex.START_TIMESTAMP],
+                        end_timestamp=card_info[CardInfoIndex.END_TIMESTAMP],
+                        video_filepath=card_info[CardInfoIndex.VIDEO_FILEPATH]
+                    ),
+                    are_keyframes_prepared
                 )
 
-                self._cut_medias_future.append(future)
-                self._futures_list.append(future)
-                self._add_task()
-                future.add_done_callback(self._mark_task_completed)
-                future.add_done_callback(self._update_progress_bar_on_done)
+        if not self._audio_track_cache: return
 
+        # The batches above are already being cut while the audio track is decoded
+        is_audio_track_prepared: bool = self._audio_track_cache.prepare()
 
-    def _prepare_cards(self, executor: ThreadPoolExecutor, wait_for_cut_medias_completion_event: Event) -> None:
+        for card_info in self._pending_card_info_list:
+            if not card_info[CardInfoIndex.AUDIO_FILEPATH]: continue
+
+            # Only the audio is cut here, the other medias of the card belong to a batch
+            self._submit_single_media(
+                self._cut_audio,
+                CardInfo(
+                    start_timestamp=card_info[CardInfoIndex.START_TIMESTAMP],
+                    end_timestamp=card_info[CardInfoIndex.END_TIMESTAMP],
+                    audio_filepath=card_info[CardInfoIndex.AUDIO_FILEPATH]
+                ),
+                is_audio_track_prepared
+            )
+
+
+    def _get_medias_duration(self, card_info_list: list[CardInfo]) -> float:
         """
-        _prepare_cards
+        _get_medias_duration
+
+        Gets the duration of the medias of the cards, the work the media scheduler measures its throughput in.
+
+        :param card_info_list: Cards whose medias are cut together.
+        :return: Seconds of medias to be cut.
+        """
+
+        return sum(
+            card_info[CardInfoIndex.END_TIMESTAMP].seconds - card_info[CardInfoIndex.START_TIMESTAMP].seconds
+            for card_info in card_info_list
+        )
+
+
+    def _submit_single_media(
+        self,
+        cut_media: Callable[[CardInfo, bool], bool],
+        card_info: CardInfo,
+        is_source_prepared: bool
+    ) -> None:
+        """
+        _submit_single_media
+
+        Schedules a worker cutting a single media of a card outside of the batches.
 
-        Prepare cards to be written to the Anki's collection database.
+        :param cut_media: Method cutting the media, either _cut_audio or _cut_video_clip.
+        :param card_info: Card holding only the media to be cut.
+        :param is_source_prepared: If the audio track or the keyframes the media is cut from are ready.
+        :return:
+        """
+
+        future: Future[bool] = self._media_scheduler.submit(
+            cut_media,
+            card_info,
+            is_source_prepared,
+            work=self._get_medias_duration([card_info])
+        )
+
+        self._cut_medias_future.append(future)
+        self._futures_list.append(future)
+        self._add_media_futures([card_info], future)
+        self._progress_aggregator.add_tasks(ProgressStage.CUTTING)
+        future.add_done_callback(partial(self._on_medias_cut, [card_info]))
+        future.add_done_callback(partial(self._on_task_done, ProgressStage.CUTTING))
+
+
+    def _add_media_futures(self, card_info_list: list[CardInfo], future: Future[bool]) -> None:
+        """
+        _add_media_futures
+
+        Keeps track of the future cutting the medias of the cards,
+        so the cards depending on them can be written as soon as it's done.
+
+        :param card_info_list: Cards whose medias are cut by the future.
+        :param future: The future cutting the medias.
+        :return:
+        """
+
+        for card_info in card_info_list:
+            for filepath in (
+                card_info[CardInfoIndex.VIDEO_FILEPATH],
+                card_info[CardInfoIndex.AUDIO_FILEPATH],
+                card_info[CardInfoIndex.IMAGE_FILEPATH]
+            ):
+                if filepath: self._media_futures[filepath] = future
+
+
+    def _schedule_card(self, card_index: int) -> None:
+        """
+        _schedule_card
+
+        Queues the card to be written once all the futures cutting its medias are done,
+        cards whose medias are all cached are queued right away.
+
+        :param card_index: Index of the card within the list of cards.
+        :return:
+        """
+
+        card_info: CardInfo = self._card_info_list[card_index]
+        media_futures: set[Future[bool]] = {
+            self._media_futures[filepath]
+            for filepath in (
+                card_info[CardInfoIndex.VIDEO_FILEPATH],
+                card_info[CardInfoIndex.AUDIO_FILEPATH],
+                card_info[CardInfoIndex.IMAGE_FILEPATH]
+            )
+            if filepath and filepath in self._media_futures
+        }
+
+        if not media_futures:
+            self._ready_cards_queue.put(card_index)
+
+            return
+
+        # Must be set before adding the callbacks, futures already done call them right away
+        self._pending_medias_count[card_index] = len(media_futures)
+
+        for future in media_futures:
+            future.add_done_callback(partial(self._on_card_media_done, card_index))
+
+
+    def _on_card_media_done(self, card_index: int, _: Future[bool]) -> None:
+        """
+        _on_card_media_done
+
+        Counts down the medias the card is waiting for, queuing it to be written after the last one.
 
-        :param executor: Pool of threads where all workers will sit.
-        :param wait_for_cut_medias_completion_event: Event for waiting on all medias completion.
+        :param card_index: Index of the card within the list of cards.
+        :param future: The future that was completed.
         :return:
         """
 
+        with self._lock:
+            self._pending_medias_count[card_index] -= 1
+
+            if self._pending_medias_count[card_index]: return
+
+        self._ready_cards_queue.put(card_index)
+
+
+    def _prepare_cards(self) -> bool:
+        """
+        _prepare_cards
+
+        Prepare cards to be written to the Anki's collection database,
+        each card is scheduled to be written as soon as its own medias are done.
+
+        :return: True if the cards were scheduled.
+        """
+
         deck_id: DeckId | None = self._deck.decks.id(self._deck_name)
 
         # This should never happen
         if not deck_id:
             _print(f"Failed to get deck id for name: {self._deck_name}{NEW_LINE}", True)
-            return
+            return False
 
+        self._deck_id = deck_id
         self._deck.decks.select(deck_id)
         card_type: str = self._deck.models.current()["name"]
         model: NotetypeDict | None = self._deck.models.by_name(card_type)
@@ -235,22 +749,146 @@ class CardsGenerator(Thread):
         # This should never happen
         if not model:
             _print(f"Failed to get model for card type: {card_type}{NEW_LINE}", True)
-            return
+            return False
 
         model["did"] = deck_id
 
         self._deck.models.save(model)
         self._deck.models.set_current(model)
 
-        for card_info_list in self._chunks_card_info_list:
-            for card in card_info_list:
-                future: Future[None] = executor.submit(self._write_card, card, wait_for_cut_medias_completion_event)
+        self._pending_medias_count = [0] * len(self._card_info_list)
+        self._progress_aggregator.add_tasks(ProgressStage.ADDING_MEDIAS, len(self._card_info_list))
+        self._progress_aggregator.add_tasks(ProgressStage.WRITING, len(self._card_info_list))
+
+        for _ in self._card_info_list:
+            # Resolved by _write_cards, it isn't run by the media scheduler
+            future: Future[None] = Future()
+
+            self._prepare_cards_future.append(future)
+            self._futures_list.append(future)
+            future.add_done_callback(partial(self._on_task_done, ProgressStage.WRITING))
+
+        for card_index in range(len(self._card_info_list)):
+            self._schedule_card(card_index)
+
+        return True
+
+
+    def _write_cards(self) -> None:
+        """
+        _write_cards
+
+        Writes the cards in the order they become ready, overlapping with the medias still being cut.
+        Notes are added to the anki.collection in transactions of NOTES_PER_TRANSACTION notes.
+        Cards not written because of cancelling have their futures cancelled, and their medias counted as skipped.
+
+        :return:
+        """
+
+        notes: list[tuple[int, Note]] = []
+        number_prepared_cards: int = 0
+
+        try:
+            for _ in range(len(self._card_info_list)):
+                if self._cards_editor_state.is_state(CardsEditorStates.CANCELLED): return
+
+                card_index: int = self._ready_cards_queue.get()
+                future: Future[None] = self._prepare_cards_future[card_index]
+
+                if not future.set_running_or_notify_cancel(): continue
 
-                self._prepare_cards_future.append(future)
-                self._futures_list.append(future)
-                self._add_task()
-                future.add_done_callback(self._mark_task_completed)
-                future.add_done_callback(self._update_progress_bar_on_done)
+                try:
+                    note: Note | None = self._prepare_note(self._card_info_list[card_index])
+                except Exception as e:
+                    future.set_exception(e)
+
+                    continue
+                finally:
+                    number_prepared_cards += 1
+                    self._progress_aggregator.complete_task(ProgressStage.ADDING_MEDIAS)
+
+                if not note:
+                    self._number_failed_cards += 1
+                    future.set_result(None)
+
+                    continue
+
+                notes.append((card_index, note))
+
+                if len(notes) >= NOTES_PER_TRANSACTION:
+                    self._add_notes(notes)
+                    notes = []
+        finally:
+            # Notes already prepared are still added when cancelling
+            self._add_notes(notes)
+
+            if number_prepared_cards < len(self._card_info_list):
+                self._progress_aggregator.complete_task(
+                    ProgressStage.ADDING_MEDIAS,
+                    True,
+                    len(self._card_info_list) - number_prepared_cards
+                )
+
+            for future in self._prepare_cards_future:
+                future.cancel()
+
+
+    def _detect_sync_offsets(self) -> list[tuple[int, int]]:
+        """
+        _detect_sync_offsets
+
+        Detects how far the dialogues are from the voice of the video,
+        all dialogues are used, not only the selected ones.
+
+        :return: The offsets detected, see detect_sync_offsets, empty if it isn't enabled or nothing was detected.
+        """
+
+        if not self._voice_activity_cache: return []
+
+        voice_activity: bytearray | None = self._voice_activity_cache.get_voice_activity()
+
+        if not voice_activity: return []
+
+        sync_offsets: list[tuple[int, int]] = detect_sync_offsets(
+            voice_activity,
+            self._dialogue_info_list_store_front.get_timestamp_columns()
+        )
+
+        if not sync_offsets:
+            _print(
+                f"Couldn't detect the offset of the subtitles to the audio of {self._video_filepath}.{NEW_LINE}",
+                True
+            )
+
+        return sync_offsets
+
+
+    def _get_synced_timestamp(self, milliseconds: int) -> Timestamp:
+        """
+        _get_synced_timestamp
+
+        Creates the timestamp of a card, shifted by the offset detected there, if any.
+
+        :param milliseconds: Timestamp of a dialogue in milliseconds.
+        :return: The timestamp of the card.
+        """
+
+        if not self._sync_offsets: return Timestamp(milliseconds)
+
+        return Timestamp(milliseconds + get_sync_offset(self._sync_offsets, milliseconds))
+
+
+    def _has_audio_stream(self) -> bool:
+        """
+        _has_audio_stream
+
+        Tells whether the video has an audio stream, from its cached metadata.
+
+        :return: False if the video has no audio stream, True if it has one or it couldn't be probed.
+        """
+
+        # Nothing is known about a video that couldn't be probed, its medias are cut as usual
+        return not self._video_metadata.get_streams() or self._video_metadata.get_audio_layout() is not None
 
 
     def _create_card_info_list(self) -> Generator[CardInfo, None, None]:
@@ -263,51 +901,53 @@ class CardsGenerator(Thread):
         """
 
         pango_markup_to_html: PangoMarkupToHTML = PangoMarkupToHTML()
+        has_audio_stream: bool = self._has_audio_stream()
 
-        for dialogue_info_front in self._dialogue_info_list_store_front:
-            if not (dialogue_info_front[DialogueInfoIndex.HAS_VIDEO]
-                or dialogue_info_front[DialogueInfoIndex.HAS_AUDIO]
-                or dialogue_info_front[DialogueInfoIndex.HAS_IMAGE]):
-                continue
+        if not has_audio_stream:
+            _print(f"{self._video_filepath} has no audio stream, the audios of the cards are left out{NEW_LINE}", True)
+
+        for index in range(len(self._dialogue_info_list_store_front)):
+            if not self._dialogue_info_list_store_front.has_any_media(index): continue
 
-            index: int = dialogue_info_front.get_index()
-            dialogue_info_back: DialogueInfo = cast(
-                DialogueInfo,
-                self._dialogue_info_list_store_back[index]
-            )
             front_field_text: str = pango_markup_to_html.get_text_parsed(
-                dialogue_info_front[DialogueInfoIndex.DIALOGUE]
+                self._dialogue_info_list_store_front.get_dialogue(index)
             )
             back_field_text: str = pango_markup_to_html.get_text_parsed(
-                dialogue_info_back[DialogueInfoIndex.DIALOGUE]
+                self._dialogue_info_list_store_back.get_dialogue(index)
             )
             card_info: CardInfo = CardInfo(
                 front_field=front_field_text,
                 back_field=back_field_text
             )
-            card_info[CardInfoIndex.START_TIMESTAMP] = (
-                dialogue_info_front[DialogueInfoIndex.START_TIMESTAMP_FIELD_INFO].get_timestamp_object()
+            card_info[CardInfoIndex.START_TIMESTAMP] = self._get_synced_timestamp(
+                self._dialogue_info_list_store_front.get_start(index)
             )
-            card_info[CardInfoIndex.END_TIMESTAMP] = (
-                dialogue_info_front[DialogueInfoIndex.END_TIMESTAMP_FIELD_INFO].get_timestamp_object()
+            card_info[CardInfoIndex.END_TIMESTAMP] = self._get_synced_timestamp(
+                self._dialogue_info_list_store_front.get_end(index)
             )
 
-            if dialogue_info_front[DialogueInfoIndex.HAS_VIDEO]:
-                card_info[CardInfoIndex.VIDEO_FILEPATH] = path.join(
-                    CACHE_MEDIA_DIR,
-                    f"{dialogue_info_front[DialogueInfoIndex.DIALOGUE_UUID]}{VIDEO_FORMAT}"
+            if self._dialogue_info_list_store_front.has_video(index):
+                card_info[CardInfoIndex.VIDEO_FILEPATH] = self._get_media_filepath(
+                    card_info[CardInfoIndex.START_TIMESTAMP],
+                    card_info[CardInfoIndex.END_TIMESTAMP],
+                    VIDEO_FORMAT,
+                    self._video_clip_mode.get_encode_settings()
                 )
 
-            if dialogue_info_front[DialogueInfoIndex.HAS_AUDIO]:
-                card_info[CardInfoIndex.AUDIO_FILEPATH] = path.join(
-                    CACHE_MEDIA_DIR,
-                    f"{dialogue_info_front[DialogueInfoIndex.DIALOGUE_UUID]}{AUDIO_FORMAT}"
+            if self._dialogue_info_list_store_front.has_audio(index) and has_audio_stream:
+                card_info[CardInfoIndex.AUDIO_FILEPATH] = self._get_media_filepath(
+                    card_info[CardInfoIndex.START_TIMESTAMP],
+                    card_info[CardInfoIndex.END_TIMESTAMP],
+                    AUDIO_FORMAT,
+                    AUDIO_ENCODE_SETTINGS
                 )
 
-            if dialogue_info_front[DialogueInfoIndex.HAS_IMAGE]:
-                card_info[CardInfoIndex.IMAGE_FILEPATH] = path.join(
-                    CACHE_MEDIA_DIR,
-                    f"{dialogue_info_front[DialogueInfoIndex.DIALOGUE_UUID]}{IMAGE_FORMAT}"
+            if self._dialogue_info_list_store_front.has_image(index):
+                card_info[CardInfoIndex.IMAGE_FILEPATH] = self._get_media_filepath(
+                    card_info[CardInfoIndex.START_TIMESTAMP],
+                    card_info[CardInfoIndex.END_TIMESTAMP],
+                    IMAGE_FORMAT,
+                    IMAGE_ENCODE_SETTINGS
                 )
 
             yield card_info
@@ -332,57 +972,57 @@ class CardsGenerator(Thread):
         except AttributeError:
             pass
 
+        if self._audio_track_cache: self._audio_track_cache.close()
+
+        self._media_cache.evict()
+        self._media_cache.save()
+
         remove_cached_media_files()
 
 
-    def get_total_number_of_tasks(self) -> int:
+    def get_progress(self) -> ProgressSnapshot:
         """
-        get_total_number_of_tasks
+        get_progress
 
-        Gets the total number of tasks.
+        Gets the progress so far, only once the cards generator is running.
 
-        :return: Total number of tasks.
+        :return: The progress.
         """
 
-        return self._total_number_tasks
+        return self._progress_aggregator.get_snapshot()
 
 
-    def _mark_task_completed(self, _: Future[None]) -> None:
+    def _on_task_done(self, stage: ProgressStage, future: Future[Any]) -> None:
         """
-        _mark_task_completed
+        _on_task_done
 
-        Updates the number of completed tasks.
+        Counts a task as done, whether it succeeded, failed or was cancelled.
 
+        :param stage: Stage of the task.
         :param future: The future that was completed.
         :return:
         """
 
-        self._number_completed_tasks += 1
+        self._progress_aggregator.complete_task(stage, future.cancelled())
 
 
-    def _add_task(self) -> None:
-        """
-        _add_task
-
-        Updates the total number of tasks.
-
-        :return:
-        """
-
-        self._total_number_tasks += 1
+    def _on_cards_editor_state_changed(self, _: CardsEditorStates, state: CardsEditorStates) -> None:
+        if state == CardsEditorStates.CANCELLED: self._cancel()
 
 
-    def _update_progress_bar_on_done(self, _: Future[None]) -> None:
+    def _cancel(self) -> None:
         """
-        _update_progress_bar_on_done
+        _cancel
 
-        Callback function to update CardsEditor's progress bar.
+        Stops the work left right away, called from the thread cancelling. The ffmpeg processes running are killed
+        and the queued medias are dropped, their futures being cancelled, the cards waiting on them are then skipped
+        by _write_cards. The work avoided is reported along with the progress.
 
-        :param future: The future that was completed.
         :return:
         """
 
-        self._idle_add_update_progress_bar(self._number_completed_tasks, self._total_number_tasks)
+        self._progress_aggregator.cancel(self._process_registry.kill_all())
+        self._media_scheduler.cancel()
 
 
     #def _db_error_dialog(self) -> None:
@@ -399,7 +1039,23 @@ class CardsGenerator(Thread):
     #    idle_add(AnkiDialog(self._handler).showAll)
 
 
-    def get_futures_list(self) -> list[Future[None]]:
+    def is_successful(self) -> bool:
+        """
+        is_successful
+
+        Tells whether every card was written, once the cards generator is done.
+
+        :return: False if it failed, was cancelled or left out some card, True otherwise.
+        """
+
+        return self._is_successful
+
+
+    def get_exception(self) -> Exception | None:
+        return self._exception
+
+
+    def get_futures_list(self) -> list[Future[Any]]:
         """
         get_futures_list
 
@@ -422,29 +1078,44 @@ class CardsGenerator(Thread):
 
         try:
             self._cards_editor_state.set_state(CardsEditorStates.RUNNING)
+            self._cards_editor_state.add_listener(self._on_cards_editor_state_changed)
+
+            # Cancelled before listening
+            if self._cards_editor_state.is_state(CardsEditorStates.CANCELLED): self._cancel()
 
-            self._total_number_tasks = 0
-            self._number_completed_tasks = 0
             self._lock = Lock()
-            self._chunks_card_info_list = get_chunked(
-                list(self._create_card_info_list()),
-                self._max_workers
+            self._sync_offsets = self._detect_sync_offsets()
+            self._card_info_list = [
+                card_info for card_info in self._create_card_info_list()
+                if not self._episode_checkpoint or not self._episode_checkpoint.is_committed(card_info.get_key())
+            ]
+            self._pending_card_info_list = self._get_pending_card_info_list()
+            self._media_futures = {}
+            self._ready_cards_queue = Queue()
+
+            with self._media_scheduler:
+                self._cut_medias()
+
+                # Cards are written by this thread while the workers are still cutting medias
+                if not self._prepare_cards(): return
+
+                self._write_cards()
+
+            self._is_successful = (
+                not self._cards_editor_state.is_state(CardsEditorStates.CANCELLED)
+                and not self._number_failed_cards
+                and all(
+                    not future.cancelled() and future.exception() is None
+                    for future in self._prepare_cards_future
+                )
             )
+        except Exception as e:
+            _print(f"Failed to generate the cards of {self._video_filepath}: {e!r}{NEW_LINE}", True)
 
-            # Sets the event for waiting on all medias completion to assure all medias are done when making cards
-            wait_for_cut_medias_completion_event = Event()
-
-            # This can raise Anki's DBError exception,
-            # let the higher class using this handle it
-            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
-                self._cut_medias(executor)
-                self._prepare_cards(executor, wait_for_cut_medias_completion_event)
-                wait(self._cut_medias_future)
-
-                # Sets the event indicating the completion of all medias, cards can be made now
-                wait_for_cut_medias_completion_event.set()
-                wait(self._prepare_cards_future)
+            self._exception = e
         finally:
+            self._cards_editor_state.remove_listener(self._on_cards_editor_state_changed)
+            self._progress_aggregator.flush()
             self._cleaning()
             self._cards_editor_state.set_state(CardsEditorStates.NORMAL)
 
@@ -0,0 +1,353 @@
+from json       import dump, load, JSONDecodeError
+from os         import makedirs, path, replace
+from threading  import Lock
+from typing     import Any, NamedTuple
+
+from asts.utils.core_utils import _print, NEW_LINE
+from asts.custom_typing.aliases import Filepath, OptionalFilepath
+from asts.custom_typing.globals import CACHE_JOBS_DIR
+from asts.custom_typing.video_clip_mode import VideoClipMode
+
+
+class EpisodeJob(NamedTuple):
+    index: int
+    video_filepath: Filepath
+    subtitles_filepath: Filepath
+    optional_subtitles_filepath: OptionalFilepath
+
+
+class JobQueue:
+    def __init__(self, job_name: str) -> None:
+        """
+        JobQueue
+
+        Persistent queue of episodes, pairs of video and subtitles, to be turned into cards of the same deck.
+
+        The queue is checkpointed to CACHE_JOBS_DIR as the cards are written, keeping which episodes are done
+        and the keys of the cards already committed to the collection, so an interrupted job resumes
+        where it stopped. Medias already cut aren't encoded again either, they're kept by the media cache.
+        The options of the job are checkpointed too, so it resumes with the options it was created with.
+
+        :param job_name: Name of the job, a job with the same name is resumed.
+        :return:
+        """
+
+        self._filepath: Filepath = path.join(CACHE_JOBS_DIR, f"{job_name}.json")
+        self._lock: Lock = Lock()
+        self._collection_filepath: OptionalFilepath = None
+        self._deck_name: str | None = None
+        self._medias: list[str] = []
+        self._rules: list[str] = []
+        self._workers: int | None = None
+        self._use_audio_track_cache: bool = False
+        # None until the job is configured, the keys of the committed cards depend on it
+        self._sync_to_audio: bool | None = None
+        self._video_clip_mode: str = VideoClipMode.REENCODE.value
+        self._episodes: list[dict[str, Any]] = []
+        # Keys of the committed cards of each episode, indexed as _episodes
+        self._committed_card_keys: list[set[str]] = []
+
+        self._load()
+
+
+    def _load(self) -> None:
+        """
+        _load
+
+        Loads the job checkpoint, if any.
+
+        :return:
+        """
+
+        try:
+            with open(self._filepath, "r") as f:
+                job: dict[str, Any] = load(f)
+        except FileNotFoundError:
+            return
+        except (JSONDecodeError, OSError) as e:
+            _print(f"Failed to load job {self._filepath}, starting it over: {e}{NEW_LINE}", True)
+            return
+
+        self._collection_filepath = job.get("collection")
+        self._deck_name = job.get("deck")
+        self._medias = job.get("medias", [])
+        self._rules = job.get("rules", [])
+        self._workers = job.get("workers")
+        self._use_audio_track_cache = job.get("audio_track_cache", False)
+        self._sync_to_audio = job.get("sync_to_audio")
+        self._video_clip_mode = job.get("video_clip_mode", VideoClipMode.REENCODE.value)
+        self._episodes = job.get("episodes", [])
+        self._committed_card_keys = [set(episode.pop("committed", [])) for episode in self._episodes]
+
+
+    def save(self) -> None:
+        """
+        save
+
+        Writes the job checkpoint to disk.
+
+        :return:
+        """
+
+        partial_filepath: Filepath = f"{self._filepath}.part"
+
+        makedirs(CACHE_JOBS_DIR, exist_ok=True)
+
+        with self._lock:
+            job: dict[str, Any] = {
+                "collection": self._collection_filepath,
+                "deck": self._deck_name,
+                "medias": self._medias,
+                "rules": self._rules,
+                "workers": self._workers,
+                "audio_track_cache": self._use_audio_track_cache,
+                "sync_to_audio": self._sync_to_audio,
+                "video_clip_mode": self._video_clip_mode,
+                "episodes": [
+                    { **episode, "committed": sorted(committed_card_keys) }
+                    for episode, committed_card_keys in zip(self._episodes, self._committed_card_keys)
+                ]
+            }
+
+            with open(partial_filepath, "w") as f:
+                dump(job, f)
+
+            replace(partial_filepath, self._filepath)
+
+
+    def configure(
+        self,
+        collection_filepath: OptionalFilepath,
+        deck_name: str | None,
+        medias: list[str] | None,
+        rules: list[str] | None = None,
+        workers: int | None = None,
+        use_audio_track_cache: bool | None = None,
+        sync_to_audio: bool | None = None,
+        video_clip_mode: str | None = None
+    ) -> None:
+        """
+        configure
+
+        Sets the options of the job, the ones not given are kept from the checkpoint.
+
+        Syncing to the audio is set once, when the job is created, since the cards it shifts
+        are keyed by their shifted timestamps, changing it would write the committed cards again.
+
+        :param collection_filepath: Anki's collection filepath.
+        :param deck_name: Anki's deck name.
+        :param medias: Medias to be added to every card.
+        :param rules: Rules selecting the medias of some cards, see MediaRule.
+        :param workers: Maximum number of medias cut at once.
+        :param use_audio_track_cache: Whether the audio clips are sliced from the pre-decoded audio track.
+        :param sync_to_audio: Whether the medias are shifted to the voice of the video.
+        :param video_clip_mode: How the video clips are cut, a VideoClipMode value.
+        :return:
+        """
+
+        if collection_filepath: self._collection_filepath = collection_filepath
+        if deck_name: self._deck_name = deck_name
+        if medias: self._medias = medias
+        if rules: self._rules = rules
+        if workers: self._workers = workers
+        if use_audio_track_cache is not None: self._use_audio_track_cache = use_audio_track_cache
+        if video_clip_mode: self._video_clip_mode = video_clip_mode
+
+        if self._sync_to_audio is None:
+            self._sync_to_audio = bool(sync_to_audio)
+        elif sync_to_audio is not None and sync_to_audio != self._sync_to_audio:
+            _print(
+                f"The job was created {'with' if self._sync_to_audio else 'without'} syncing to the audio, "
+                f"it's kept so the cards already written aren't written again{NEW_LINE}",
+                True
+            )
+
+
+    def get_collection_filepath(self) -> OptionalFilepath:
+        return self._collection_filepath
+
+
+    def get_deck_name(self) -> str | None:
+        return self._deck_name
+
+
+    def get_medias(self) -> list[str]:
+        return self._medias
+
+
+    def get_rules(self) -> list[str]:
+        return self._rules
+
+
+    def get_workers(self) -> int | None:
+        return self._workers
+
+
+    def is_using_audio_track_cache(self) -> bool:
+        return self._use_audio_track_cache
+
+
+    def is_syncing_to_audio(self) -> bool:
+        return bool(self._sync_to_audio)
+
+
+    def get_video_clip_mode(self) -> str:
+        return self._video_clip_mode
+
+
+    def add_episode(
+        self,
+        video_filepath: Filepath,
+        subtitles_filepath: Filepath,
+        optional_subtitles_filepath: OptionalFilepath = None
+    ) -> None:
+        """
+        add_episode
+
+        Queues an episode, episodes already queued are left as they are.
+
+        :param video_filepath: Video filepath.
+        :param subtitles_filepath: Subtitles filepath used for the front of the cards.
+        :param optional_subtitles_filepath: Subtitles filepath used for the back of the cards.
+        :return:
+        """
+
+        episode: dict[str, Any] = {
+            "video": video_filepath,
+            "subtitles": subtitles_filepath,
+            "optional_subtitles": optional_subtitles_filepath,
+            "done": False
+        }
+
+        with self._lock:
+            for queued_episode in self._episodes:
+                if (queued_episode["video"] == video_filepath
+                    and queued_episode["subtitles"] == subtitles_filepath
+                    and queued_episode["optional_subtitles"] == optional_subtitles_filepath):
+                    return
+
+            self._episodes.append(episode)
+            self._committed_card_keys.append(set())
+
+
+    def get_pending_episodes(self) -> list[EpisodeJob]:
+        """
+        get_pending_episodes
+
+        Gets the episodes not done yet, in the order they were queued.
+
+        :return: List of EpisodeJob.
+        """
+
+        with self._lock:
+            return [
+                EpisodeJob(index, episode["video"], episode["subtitles"], episode["optional_subtitles"])
+                for index, episode in enumerate(self._episodes)
+                if not episode["done"]
+            ]
+
+
+    def get_episode_checkpoint(self, episode_index: int) -> "EpisodeCheckpoint":
+        """
+        get_episode_checkpoint
+
+        Gets the checkpoint of the cards of an episode.
+
+        :param episode_index: Index of the episode within the queue.
+        :return: The checkpoint of the episode.
+        """
+
+        return EpisodeCheckpoint(self, episode_index)
+
+
+    def is_card_committed(self, episode_index: int, card_key: str) -> bool:
+        """
+        is_card_committed
+
+        Tells whether the card of the episode was already committed to the collection.
+
+        :param episode_index: Index of the episode within the queue.
+        :param card_key: Key of the card, see CardInfo.get_key.
+        :return: True if the card was committed.
+        """
+
+        with self._lock:
+            return card_key in self._committed_card_keys[episode_index]
+
+
+    def commit_cards(self, episode_index: int, card_keys: list[str]) -> None:
+        """
+        commit_cards
+
+        Records the cards as committed to the collection and checkpoints the job.
+
+        :param episode_index: Index of the episode within the queue.
+        :param card_keys: Keys of the cards committed.
+        :return:
+        """
+
+        with self._lock:
+            self._committed_card_keys[episode_index].update(card_keys)
+
+        self.save()
+
+
+    def mark_episode_done(self, episode_index: int) -> None:
+        """
+        mark_episode_done
+
+        Records the episode as done and checkpoints the job.
+
+        :param episode_index: Index of the episode within the queue.
+        :return:
+        """
+
+        with self._lock:
+            self._episodes[episode_index]["done"] = True
+
+        self.save()
+
+
+class EpisodeCheckpoint:
+    def __init__(self, job_queue: JobQueue, episode_index: int) -> None:
+        """
+        EpisodeCheckpoint
+
+        Checkpoint of the cards of a single episode of a JobQueue.
+
+        :param job_queue: The queue the episode belongs to.
+        :param episode_index: Index of the episode within the queue.
+        :return:
+        """
+
+        self._job_queue: JobQueue = job_queue
+        self._episode_index: int = episode_index
+
+
+    def is_committed(self, card_key: str) -> bool:
+        """
+        is_committed
+
+        Tells whether the card was already committed to the collection.
+
+        :param card_key: Key of the card, see CardInfo.get_key.
+        :return: True if the card was committed.
+        """
+
+        return self._job_queue.is_card_committed(self._episode_index, card_key)
+
+
+    def commit(self, card_keys: list[str]) -> None:
+        """
+        commit
+
+        Records the cards as committed to the collection.
+
+        :param card_keys: Keys of the cards, see CardInfo.get_key.
+        :return:
+        """
+
+        self._job_queue.commit_cards(self._episode_index, card_keys)
+
+
+__all__: list[str] = ["EpisodeCheckpoint", "EpisodeJob", "JobQueue"]
@@ -0,0 +1,304 @@
+from collections        import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from math               import floor
+from os                 import cpu_count
+from threading          import Lock
+from time               import monotonic
+from types              import TracebackType
+from typing             import Any, Callable
+
+# Unix only, elsewhere the concurrency is adapted to the throughput alone
+try:
+    from resource       import getrusage, struct_rusage, RUSAGE_CHILDREN
+except ImportError:
+    getrusage = None
+
+from asts.custom_typing.globals import (
+    MEDIA_SCHEDULER_INITIAL_CONCURRENCY, MEDIA_SCHEDULER_WINDOW_SECONDS,
+    MEDIA_SCHEDULER_THROUGHPUT_TOLERANCE
+)
+
+
+class MediaScheduler:
+    # Cores used by a job below which it's mostly waiting on the disk
+    _MIN_CORES_PER_JOB: float = 0.1
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        initial_concurrency: int = MEDIA_SCHEDULER_INITIAL_CONCURRENCY
+    ) -> None:
+        """
+        MediaScheduler
+
+        Runs the media jobs, each one driving its own ffmpeg process, with an adaptive concurrency.
+
+        The concurrency starts at initial_concurrency and is adapted at the end of every window of completed jobs:
+        it ramps up while the throughput improves, as long as the CPU time the jobs spend leaves cores to spare,
+        and backs off when the throughput drops after a ramp up, which happens once the disk is saturated.
+        The throughput counts the work of the jobs, as given when submitting them, not the jobs themselves,
+        since a job may cut a whole batch of medias or a single one. Each window is compared to the window
+        run before the last change of the concurrency, and once a ramp up didn't pay off it isn't tried again.
+
+        :param max_concurrency: Maximum number of jobs running at once, defaults to the number of CPUs.
+        :param initial_concurrency: Number of jobs running at once before adapting.
+        :return:
+        """
+
+        self._max_concurrency: int = max(1, max_concurrency or cpu_count() or 1)
+        self._concurrency: int = max(1, min(initial_concurrency, self._max_concurrency))
+        # The jobs are ffmpeg processes, the threads only wait on them
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=self._max_concurrency)
+        self._lock: Lock = Lock()
+        self._queue: deque[tuple[Future[Any], Callable[..., Any], tuple[Any, ...], float]] = deque()
+        self._futures_list: list[Future[Any]] = []
+        self._number_running_jobs: int = 0
+        self._window_start_time: float = monotonic()
+        self._window_start_cpu_time: float | None = self._get_children_cpu_time()
+        self._window_completed_jobs: int = 0
+        self._window_completed_work: float = 0.0
+        # Throughput of the window run before the last change of the concurrency and the direction of that change
+        self._baseline_throughput: float = 0.0
+        self._last_step: int = 0
+        # Concurrency past which a ramp up didn't pay off
+        self._ceiling_concurrency: int = self._max_concurrency
+        self._is_cancelled: bool = False
+
+
+    def __enter__(self) -> "MediaScheduler":
+        return self
+
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None
+    ) -> None:
+        self.shutdown()
+
+
+    def _get_children_cpu_time(self) -> float | None:
+        """
+        _get_children_cpu_time
+
+        Gets the CPU time spent by the finished child processes, the ffmpeg processes.
+
+        :return: User and system CPU time in seconds, None if it can't be measured on this platform.
+        """
+
+        if not getrusage: return None
+
+        usage: struct_rusage = getrusage(RUSAGE_CHILDREN)
+
+        return usage.ru_utime + usage.ru_stime
+
+
+    def get_concurrency(self) -> int:
+        """
+        get_concurrency
+
+        Gets the number of jobs currently allowed to run at once.
+
+        :return: The current concurrency.
+        """
+
+        return self._concurrency
+
+
+    def get_max_concurrency(self) -> int:
+        """
+        get_max_concurrency
+
+        Gets the maximum number of jobs allowed to run at once.
+
+        :return: The maximum concurrency.
+        """
+
+        return self._max_concurrency
+
+
+    def submit(self, fn: Callable[..., Any], *args: Any, work: float = 1.0) -> Future[Any]:
+        """
+        submit
+
+        Queues a job to be run once the concurrency allows it.
+
+        :param fn: Callable running the job.
+        :param args: Arguments passed to fn.
+        :param work: (Optional) amount of work done by the job, such as the seconds of medias it cuts,
+                     the throughput is measured in it.
+        :return: Future of the job, it can be cancelled while it's queued.
+                 Once the scheduler is cancelled, it's already cancelled.
+        """
+
+        future: Future[Any] = Future()
+
+        with self._lock:
+            self._futures_list.append(future)
+
+            if not self._is_cancelled:
+                self._queue.append((future, fn, args, work))
+                self._dispatch()
+
+                return future
+
+        future.cancel()
+        # Lets wait see it as done, as _dispatch does for the futures cancelled while queued
+        future.set_running_or_notify_cancel()
+
+        return future
+
+
+    def cancel(self) -> int:
+        """
+        cancel
+
+        Cancels every queued job at once, as well as the jobs submitted from now on,
+        the jobs already running are left to whoever started them.
+
+        :return: Number of queued jobs cancelled.
+        """
+
+        with self._lock:
+            self._is_cancelled = True
+            queued_futures: list[Future[Any]] = [future for future, _, _, _ in self._queue]
+
+            self._queue.clear()
+
+        # Outside of the lock, cancelling runs the callbacks of the futures
+        for future in queued_futures:
+            future.cancel()
+            future.set_running_or_notify_cancel()
+
+        return len(queued_futures)
+
+
+    def _dispatch(self) -> None:
+        """
+        _dispatch
+
+        Starts queued jobs while there is room for them, must be called holding the lock.
+
+        :return:
+        """
+
+        while self._queue and self._number_running_jobs < self._concurrency:
+            future, fn, args, work = self._queue.popleft()
+
+            # Cancelled while it was queued
+            if not future.set_running_or_notify_cancel(): continue
+
+            self._number_running_jobs += 1
+            self._executor.submit(self._run_job, future, fn, args, work)
+
+
+    def _run_job(self, future: Future[Any], fn: Callable[..., Any], args: tuple[Any, ...], work: float) -> None:
+        """
+        _run_job
+
+        Runs a job, resolving its future and starting the next queued jobs.
+
+        :param future: Future of the job.
+        :param fn: Callable running the job.
+        :param args: Arguments passed to fn.
+        :param work: Amount of work done by the job.
+        :return:
+        """
+
+        try:
+            result: Any = fn(*args)
+        except BaseException as e:
+            self._on_job_done(work)
+            future.set_exception(e)
+
+            return
+
+        # Let the next job start before running the callbacks of this one
+        self._on_job_done(work)
+        future.set_result(result)
+
+
+    def _on_job_done(self, work: float) -> None:
+        """
+        _on_job_done
+
+        Accounts a completed job, adapting the concurrency and starting the next queued jobs.
+
+        :param work: Amount of work done by the job.
+        :return:
+        """
+
+        with self._lock:
+            self._number_running_jobs -= 1
+            self._window_completed_jobs += 1
+            self._window_completed_work += max(work, 0.0)
+            self._adapt()
+            self._dispatch()
+
+
+    def _adapt(self) -> None:
+        """
+        _adapt
+
+        Adapts the concurrency at the end of a window, must be called holding the lock.
+
+        :return:
+        """
+
+        elapsed_time: float = monotonic() - self._window_start_time
+
+        if self._window_completed_jobs < self._concurrency or elapsed_time < MEDIA_SCHEDULER_WINDOW_SECONDS:
+            return
+
+        cpu_time: float | None = self._get_children_cpu_time()
+        throughput: float = self._window_completed_work / elapsed_time
+        cpu_bound_concurrency: int = self._max_concurrency
+
+        if cpu_time is not None and self._window_start_cpu_time is not None:
+            # ffmpeg may use more than one core per job, or less than one when waiting on the disk
+            cores_per_job: float = (cpu_time - self._window_start_cpu_time) / (elapsed_time * self._concurrency)
+            cpu_bound_concurrency = max(
+                1,
+                floor(self._max_concurrency / max(cores_per_job, self._MIN_CORES_PER_JOB))
+            )
+
+        can_ramp_up: bool = self._concurrency < min(self._ceiling_concurrency, cpu_bound_concurrency)
+        step: int = 0
+
+        if self._last_step > 0 and throughput < self._baseline_throughput * (1 - MEDIA_SCHEDULER_THROUGHPUT_TOLERANCE):
+            # The last ramp up didn't pay off, the disk is saturated
+            step = -1
+            self._ceiling_concurrency = self._concurrency - 1
+        elif (self._last_step > 0
+            and throughput <= self._baseline_throughput * (1 + MEDIA_SCHEDULER_THROUGHPUT_TOLERANCE)):
+            # Nor did it hurt, the concurrency is kept but not ramped up any further
+            self._ceiling_concurrency = self._concurrency
+        elif can_ramp_up:
+            step = 1
+
+        if step:
+            self._concurrency = max(1, self._concurrency + step)
+            self._baseline_throughput = throughput
+
+        self._last_step = step
+        self._window_start_time = monotonic()
+        self._window_start_cpu_time = cpu_time
+        self._window_completed_jobs = 0
+        self._window_completed_work = 0.0
+
+
+    def shutdown(self) -> None:
+        """
+        shutdown
+
+        Waits for all the jobs, queued ones included, and releases the threads.
+
+        :return:
+        """
+
+        wait(self._futures_list)
+        self._executor.shutdown()
+
+
+__all__: list[str] = ["MediaScheduler"]
@@ -0,0 +1,249 @@
+from enum       import Enum
+from threading  import Lock, Timer
+from time       import monotonic
+from typing     import Callable, NamedTuple
+
+from asts.custom_typing.globals import PROGRESS_UPDATE_INTERVAL_SECONDS
+
+
+class ProgressStage(Enum):
+    CUTTING         = "cutting"
+    ADDING_MEDIAS   = "adding medias"
+    WRITING         = "writing"
+
+
+# Stages counted by the overall progress, the medias are added while the notes are written
+_OVERALL_STAGES: tuple[ProgressStage, ...] = (ProgressStage.CUTTING, ProgressStage.WRITING)
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes: int
+    remaining_seconds: int
+    minutes, remaining_seconds = divmod(round(seconds), 60)
+
+    if minutes < 60: return f"{minutes}:{remaining_seconds:02}"
+
+    return f"{minutes // 60}:{minutes % 60:02}:{remaining_seconds:02}"
+
+
+class ProgressSnapshot(NamedTuple):
+    """
+    ProgressSnapshot
+
+    Progress of the cards generator at some point.
+
+    completed: Number of tasks done, medias cut and notes written, skipped ones included.
+    total: Number of tasks.
+    concurrency: Number of medias being cut at once.
+    throughput: Tasks done per second so far.
+    eta: Seconds left at that throughput, None until a task is done.
+    stages: Stage -> number of its tasks done and number of its tasks.
+    skipped: Number of tasks cancelled before they ran.
+    is_cancelled: If the cards generator was cancelled.
+    number_killed_processes: Number of ffmpeg processes killed when cancelling.
+    """
+
+    completed: int
+    total: int
+    concurrency: int
+    throughput: float
+    eta: float | None
+    stages: dict[ProgressStage, tuple[int, int]]
+    skipped: int = 0
+    is_cancelled: bool = False
+    number_killed_processes: int = 0
+
+
+    def is_done(self) -> bool:
+        return self.completed >= self.total
+
+
+    def get_summary(self) -> str:
+        """
+        get_summary
+
+        Describes the overall progress.
+
+        :return: The number of tasks done out of all of them, the workers, the throughput and the time left,
+                 once cancelled the work avoided.
+        """
+
+        if self.is_cancelled and self.is_done():
+            return (
+                f"Cancelled, {self.skipped}/{self.total} tasks skipped"
+                f" and {self.number_killed_processes} ffmpeg processes stopped."
+            )
+
+        if self.is_cancelled: return f"Cancelling, please wait. {self.completed}/{self.total}"
+
+        summary: str = f"{self.completed}/{self.total} ({self.concurrency} workers, {self.throughput:.1f}/s"
+
+        if self.eta is not None and not self.is_done(): summary += f", {_format_seconds(self.eta)} left"
+
+        return summary + ")"
+
+
+    def get_stages_summary(self) -> str:
+        """
+        get_stages_summary
+
+        Describes the progress of each stage.
+
+        :return: The number of tasks done out of all of them for each stage with some task.
+        """
+
+        return ", ".join(
+            f"{stage.value.capitalize()} {completed}/{total}"
+            for stage, (completed, total) in self.stages.items() if total
+        )
+
+
+class ProgressAggregator:
+    def __init__(
+        self,
+        update_progress: Callable[[ProgressSnapshot], None],
+        get_concurrency: Callable[[], int],
+        min_interval: float = PROGRESS_UPDATE_INTERVAL_SECONDS
+    ) -> None:
+        """
+        ProgressAggregator
+
+        Counts the tasks of the cards generator per stage, as they're added and done from any thread,
+        and coalesces the progress updates so that at most one is sent every min_interval, however
+        many tasks are done meanwhile. An update held back is sent once the interval is over, and
+        the last task done is always sent right away.
+
+        :param update_progress: Function called with the progress, from the thread of the task done
+                                or from a timer thread, it must be cheap and thread safe.
+        :param get_concurrency: Function getting the number of medias being cut at once.
+        :param min_interval: Shortest time in seconds between two updates.
+        :return:
+        """
+
+        self._update_progress: Callable[[ProgressSnapshot], None] = update_progress
+        self._get_concurrency: Callable[[], int] = get_concurrency
+        self._min_interval: float = min_interval
+        self._lock: Lock = Lock()
+        self._completed: dict[ProgressStage, int] = {stage: 0 for stage in ProgressStage}
+        self._totals: dict[ProgressStage, int] = {stage: 0 for stage in ProgressStage}
+        self._skipped: int = 0
+        self._is_cancelled: bool = False
+        self._number_killed_processes: int = 0
+        self._start_time: float = monotonic()
+        self._last_update_time: float = 0.0
+        # Sends the update held back, at most one is waiting at a time
+        self._timer: Timer | None = None
+
+
+    def add_tasks(self, stage: ProgressStage, number_tasks: int = 1) -> None:
+        with self._lock:
+            self._totals[stage] += number_tasks
+
+
+    def complete_task(self, stage: ProgressStage, is_skipped: bool = False, number_tasks: int = 1) -> None:
+        """
+        complete_task
+
+        Counts tasks of a stage as done and sends the progress, unless one was sent less than min_interval ago.
+        Skipped tasks of the stages outside of the overall progress aren't counted as skipped.
+
+        :param stage: Stage of the tasks.
+        :param is_skipped: If the tasks were cancelled before they ran.
+        :param number_tasks: (Optional) number of tasks done.
+        :return:
+        """
+
+        snapshot: ProgressSnapshot | None = None
+
+        with self._lock:
+            self._completed[stage] += number_tasks
+
+            if is_skipped and stage in _OVERALL_STAGES: self._skipped += number_tasks
+
+            time_since_update: float = monotonic() - self._last_update_time
+            is_last_task: bool = all(
+                self._completed[overall_stage] >= self._totals[overall_stage] for overall_stage in _OVERALL_STAGES
+            )
+
+            if is_last_task or time_since_update >= self._min_interval:
+                self._last_update_time = monotonic()
+                snapshot = self._take_snapshot()
+            elif not self._timer:
+                self._timer = Timer(self._min_interval - time_since_update, self._send_held_update)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if snapshot: self._update_progress(snapshot)
+
+
+    def cancel(self, number_killed_processes: int) -> None:
+        """
+        cancel
+
+        Marks the progress as cancelled, the tasks left are counted as skipped as they're done.
+
+        :param number_killed_processes: Number of ffmpeg processes killed.
+        :return:
+        """
+
+        with self._lock:
+            self._is_cancelled = True
+            self._number_killed_processes += number_killed_processes
+
+
+    def flush(self) -> None:
+        """
+        flush
+
+        Sends the progress right away, for the end of the cards generator.
+
+        :return:
+        """
+
+        with self._lock:
+            self._last_update_time = monotonic()
+            snapshot: ProgressSnapshot = self._take_snapshot()
+
+        self._update_progress(snapshot)
+
+
+    def _send_held_update(self) -> None:
+        with self._lock:
+            self._timer = None
+
+        self.flush()
+
+
+    def _take_snapshot(self) -> ProgressSnapshot:
+        """
+        _take_snapshot
+
+        Takes the progress so far, the lock must be held.
+
+        :return: The progress.
+        """
+
+        completed: int = sum(self._completed[stage] for stage in _OVERALL_STAGES)
+        total: int = sum(self._totals[stage] for stage in _OVERALL_STAGES)
+        elapsed: float = monotonic() - self._start_time
+        throughput: float = completed / elapsed if elapsed > 0 else 0.0
+
+        return ProgressSnapshot(
+            completed,
+            total,
+            self._get_concurrency(),
+            throughput,
+            (total - completed) / throughput if throughput > 0 else None,
+            {stage: (self._completed[stage], self._totals[stage]) for stage in ProgressStage},
+            self._skipped,
+            self._is_cancelled,
+            self._number_killed_processes
+        )
+
+
+    def get_snapshot(self) -> ProgressSnapshot:
+        with self._lock:
+            return self._take_snapshot()
+
+
+__all__: list[str] = ["ProgressAggregator", "ProgressSnapshot", "ProgressStage"]
@@ -0,0 +1,435 @@
+from argparse   import ArgumentParser, BooleanOptionalAction, Namespace
+from os         import path
+from sys        import stdout
+from threading  import Lock
+from time       import monotonic
+from typing     import Callable
+
+from asts.utils.core_utils import _print, die, NEW_LINE
+from asts.custom_typing.globals import PROGRESS_LOG_INTERVAL_SECONDS
+from asts.utils.extra_utils import (
+    create_cache_dir, create_dialogues_list_stores, is_file_collection,
+    is_file_subtitles, is_file_video
+)
+from asts.custom_typing.dialogue_store import DialogueFlags, DialogueStore
+from asts.custom_typing.media_rule import MediaRule
+from asts.custom_typing.search_index import SearchIndex
+from asts.custom_typing.cards_editor_states import CardsEditorState, CardsEditorStates
+from asts.custom_typing.video_clip_mode import VideoClipMode
+from asts.cards_generator.cards_generator import CardsGenerator
+from asts.cards_generator.job_queue import EpisodeCheckpoint, EpisodeJob, JobQueue
+from asts.cards_generator.progress_aggregator import ProgressSnapshot
+
+
+MEDIA_CHOICES: tuple[str, str, str] = ("video", "audio", "image")
+
+
+def create_argument_parser() -> ArgumentParser:
+    """
+    create_argument_parser
+
+    Creates the parser of the command line arguments.
+
+    :return: The argument parser.
+    """
+
+    parser: ArgumentParser = ArgumentParser(
+        prog="run-asts-cli",
+        description="Creates Anki cards from videos and their subtitles without a graphical interface."
+    )
+
+    parser.add_argument(
+        "-c", "--collection",
+        help="Anki's collection filepath, usually ~/.local/share/Anki2/<user name>/collection.anki2."
+    )
+    parser.add_argument(
+        "-d", "--deck",
+        help="Name of the deck, it's created if there is no deck with this name."
+    )
+    parser.add_argument(
+        "-v", "--video",
+        action="append",
+        default=[],
+        help="Video filepath, can be repeated to process several videos in a row."
+    )
+    parser.add_argument(
+        "-s", "--subtitles",
+        action="append",
+        default=[],
+        help="Subtitles filepath used for the front of the cards, one for each video."
+    )
+    parser.add_argument(
+        "-o", "--optional-subtitles",
+        action="append",
+        default=[],
+        help="Subtitles filepath used for the back of the cards, if given, one for each video."
+    )
+    parser.add_argument(
+        "-m", "--media",
+        action="append",
+        choices=MEDIA_CHOICES,
+        help="Media to be added to every card, can be repeated, defaults to audio and image."
+    )
+    parser.add_argument(
+        "-r", "--rule",
+        action="append",
+        default=[],
+        help="Rule selecting a media for the dialogues matching a query, applied after --media and in order, "
+             "e.g. \"audio dur:1..8 -re:♪ -style:sign\", \"image len:20..\" or \"-audio speaker:narrator\". "
+             "The query is the one of the search of the graphical interface, can be repeated."
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=None,
+        help="Maximum number of medias cut at once, defaults to the number of CPUs."
+    )
+    parser.add_argument(
+        "-j", "--job",
+        help="Name of a resumable job, the videos given are queued to it and an interrupted job "
+             "resumes where it stopped, with the options it was created with, when run again. "
+             "Options given again override them, except --sync-to-audio."
+    )
+    parser.add_argument(
+        "--audio-track-cache",
+        action=BooleanOptionalAction,
+        default=None,
+        help="Decode the audio track of each video only once and slice the audio clips out of it."
+    )
+    parser.add_argument(
+        "--sync-to-audio",
+        action=BooleanOptionalAction,
+        default=None,
+        help="Detect how far the subtitles are from the voice of each video and shift the medias cut by it."
+    )
+    parser.add_argument(
+        "--video-clip-mode",
+        choices=[video_clip_mode.value for video_clip_mode in VideoClipMode],
+        default=None,
+        help="How the video clips are cut, \"reencode\" scales them down, \"copy\" stream copies them "
+             "from the keyframe before them and \"smart\" only encodes their head up to their first keyframe, "
+             "both at the resolution of the video. Defaults to reencode."
+    )
+
+    return parser
+
+
+def validate_arguments(parser: ArgumentParser, arguments: Namespace) -> None:
+    """
+    validate_arguments
+
+    Checks the files given exist and are the right kind, exiting through the parser otherwise.
+
+    :param parser: The argument parser.
+    :param arguments: The parsed arguments.
+    :return:
+    """
+
+    if not arguments.collection or not arguments.deck:
+        parser.error("the collection and the deck are required, unless resuming a job")
+
+    if not arguments.video and not arguments.job:
+        parser.error("at least a video and its subtitles are required")
+
+    if not is_file_collection(arguments.collection) or not path.isfile(arguments.collection):
+        parser.error(f"invalid collection file: {arguments.collection}")
+
+    if len(arguments.video) != len(arguments.subtitles):
+        parser.error("every video needs its own subtitles")
+
+    if arguments.optional_subtitles and len(arguments.optional_subtitles) != len(arguments.video):
+        parser.error("optional subtitles, if given, are needed for every video")
+
+    for video_filepath in arguments.video:
+        if not is_file_video(video_filepath) or not path.isfile(video_filepath):
+            parser.error(f"invalid video file: {video_filepath}")
+
+    for rule in arguments.rule:
+        try:
+            MediaRule(rule)
+        except ValueError as e:
+            parser.error(str(e))
+
+    for subtitles_filepath in arguments.subtitles + arguments.optional_subtitles:
+        if not is_file_subtitles(subtitles_filepath) or not path.isfile(subtitles_filepath):
+            parser.error(f"invalid subtitles file: {subtitles_filepath}")
+
+
+def select_medias(dialogues_list_store: DialogueStore, medias: list[str]) -> None:
+    """
+    select_medias
+
+    Selects the medias to be added to every card.
+
+    :param dialogues_list_store: List store with the dialogues of the front of the cards.
+    :param medias: Medias to be added, any of MEDIA_CHOICES.
+    :return:
+    """
+
+    dialogues_list_store.set_medias(DialogueFlags.HAS_VIDEO, "video" in medias)
+    dialogues_list_store.set_medias(DialogueFlags.HAS_AUDIO, "audio" in medias)
+    dialogues_list_store.set_medias(DialogueFlags.HAS_IMAGE, "image" in medias)
+
+
+def apply_media_rules(
+    front_field_list_store: DialogueStore,
+    back_field_list_store: DialogueStore,
+    rules: list[str]
+) -> None:
+    """
+    apply_media_rules
+
+    Selects the medias of the dialogues matching each rule, in order.
+
+    :param front_field_list_store: List store with the dialogues of the front of the cards.
+    :param back_field_list_store: List store with the dialogues of the back of the cards.
+    :param rules: Rules to be applied, see MediaRule.
+    :return:
+    """
+
+    if not rules: return
+
+    front_search_index: SearchIndex = SearchIndex()
+    back_search_index: SearchIndex = SearchIndex()
+
+    front_search_index.extend(
+        front_field_list_store.get_dialogue(index) for index in range(len(front_field_list_store))
+    )
+    back_search_index.extend(
+        back_field_list_store.get_dialogue(index) for index in range(len(back_field_list_store))
+    )
+
+    for rule in rules:
+        MediaRule(rule).apply(front_field_list_store, front_search_index, back_search_index)
+
+
+def print_progress(progress: ProgressSnapshot) -> None:
+    """
+    print_progress
+
+    Prints the progress of the cards being generated over the line printed before, for a terminal.
+
+    :param progress: Progress of the cards generator.
+    :return:
+    """
+
+    # Clears what's left of a longer line printed before
+    _print(f"\r{progress.get_summary()} {progress.get_stages_summary()}\033[K")
+
+
+def create_progress_logger() -> Callable[[ProgressSnapshot], None]:
+    """
+    create_progress_logger
+
+    Creates the function printing the progress of the cards being generated.
+
+    On a terminal the progress is printed over the same line on every update, otherwise, in a log,
+    a plain line is printed at most every PROGRESS_LOG_INTERVAL_SECONDS, as well as the last progress.
+
+    :return: Function called with the progress of the cards generator.
+    """
+
+    if stdout.isatty(): return print_progress
+
+    lock: Lock = Lock()
+    last_log_time: float | None = None
+    last_line: str = ""
+
+    def log_progress(progress: ProgressSnapshot) -> None:
+        nonlocal last_log_time, last_line
+
+        line: str = f"{progress.get_summary()} {progress.get_stages_summary()}"
+
+        with lock:
+            # The last progress may be sent again when the cards generator ends
+            if line == last_line: return
+            if (not progress.is_done() and last_log_time is not None
+                and monotonic() - last_log_time < PROGRESS_LOG_INTERVAL_SECONDS):
+                return
+
+            last_log_time = monotonic()
+            last_line = line
+
+            _print(f"{line}{NEW_LINE}")
+
+    return log_progress
+
+
+def generate_cards(
+    arguments: Namespace,
+    episode_job: EpisodeJob,
+    episode_checkpoint: EpisodeCheckpoint | None = None
+) -> bool:
+    """
+    generate_cards
+
+    Generates the cards of a single video, blocking until they're all written.
+    Interrupting it cancels the cards generator, killing its ffmpeg processes, before exiting.
+
+    :param arguments: The parsed arguments.
+    :param episode_job: The video and subtitles to generate the cards from.
+    :param episode_checkpoint: Checkpoint of the episode when running a job.
+    :return: True if every card was written.
+    :raises Exception: The exception the cards generator failed with.
+    """
+
+    front_field_list_store: DialogueStore
+    back_field_list_store: DialogueStore
+    front_field_list_store, back_field_list_store = create_dialogues_list_stores(
+        episode_job.subtitles_filepath,
+        episode_job.optional_subtitles_filepath
+    )
+
+    select_medias(front_field_list_store, arguments.media or ["audio", "image"])
+    apply_media_rules(front_field_list_store, back_field_list_store, arguments.rule)
+
+    _print(f"Generating cards from {episode_job.video_filepath}{NEW_LINE}")
+
+    cards_editor_state: CardsEditorState = CardsEditorState()
+
+    cards_generator: CardsGenerator = CardsGenerator(
+        arguments.collection,
+        episode_job.video_filepath,
+        front_field_list_store,
+        back_field_list_store,
+        arguments.deck,
+        cards_editor_state,
+        create_progress_logger(),
+        max_workers=arguments.workers,
+        use_audio_track_cache=bool(arguments.audio_track_cache),
+        episode_checkpoint=episode_checkpoint,
+        sync_to_audio=bool(arguments.sync_to_audio),
+        video_clip_mode=VideoClipMode(arguments.video_clip_mode or VideoClipMode.REENCODE.value)
+    )
+
+    cards_generator.start()
+
+    try:
+        cards_generator.join()
+    except KeyboardInterrupt:
+        cards_editor_state.set_state(CardsEditorStates.CANCELLED)
+        cards_generator.join()
+
+        raise
+
+    # Ends the line of the progress printed over and over
+    if stdout.isatty(): _print(NEW_LINE)
+
+    exception: Exception | None = cards_generator.get_exception()
+
+    if exception: raise exception
+
+    return cards_generator.is_successful()
+
+
+def run_job(arguments: Namespace, job_queue: JobQueue) -> None:
+    """
+    run_job
+
+    Generates the cards of every episode of the job not done yet, checkpointing them as they're written.
+
+    :param arguments: The parsed arguments, merged with the options of the job.
+    :param job_queue: The job to be run.
+    :return:
+    """
+
+    number_incomplete_episodes: int = 0
+
+    for episode_job in job_queue.get_pending_episodes():
+        try:
+            is_successful: bool = generate_cards(
+                arguments,
+                episode_job,
+                job_queue.get_episode_checkpoint(episode_job.index)
+            )
+        except Exception as e:
+            die(f"Failed to generate cards from {episode_job.video_filepath}: {e}")
+
+        # The cards already written are checkpointed, the others are retried when resuming the job
+        if not is_successful:
+            _print(f"Some cards of {episode_job.video_filepath} weren't written{NEW_LINE}", True)
+            number_incomplete_episodes += 1
+
+            continue
+
+        job_queue.mark_episode_done(episode_job.index)
+
+    if number_incomplete_episodes:
+        die(f"{number_incomplete_episodes} episodes aren't done, run the job again to resume them")
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    main
+
+    Runs the whole subtitles to deck pipeline from the command line.
+
+    :param argv: Command line arguments, defaults to sys.argv.
+    :return:
+    """
+
+    parser: ArgumentParser = create_argument_parser()
+    arguments: Namespace = parser.parse_args(argv)
+    job_queue: JobQueue | None = JobQueue(arguments.job) if arguments.job else None
+
+    # Collection changes the working directory, the files must not be relative to it
+    if arguments.collection: arguments.collection = path.abspath(arguments.collection)
+    arguments.video = [path.abspath(filepath) for filepath in arguments.video]
+    arguments.subtitles = [path.abspath(filepath) for filepath in arguments.subtitles]
+    arguments.optional_subtitles = [path.abspath(filepath) for filepath in arguments.optional_subtitles]
+
+    if job_queue:
+        job_queue.configure(
+            arguments.collection,
+            arguments.deck,
+            arguments.media,
+            arguments.rule,
+            arguments.workers,
+            arguments.audio_track_cache,
+            arguments.sync_to_audio,
+            arguments.video_clip_mode
+        )
+        arguments.collection = job_queue.get_collection_filepath()
+        arguments.deck = job_queue.get_deck_name()
+        arguments.media = job_queue.get_medias()
+        arguments.rule = job_queue.get_rules()
+        arguments.workers = job_queue.get_workers()
+        arguments.audio_track_cache = job_queue.is_using_audio_track_cache()
+        arguments.sync_to_audio = job_queue.is_syncing_to_audio()
+        arguments.video_clip_mode = job_queue.get_video_clip_mode()
+
+    validate_arguments(parser, arguments)
+    create_cache_dir()
+
+    episode_jobs: list[EpisodeJob] = [
+        EpisodeJob(
+            index,
+            video_filepath,
+            subtitles_filepath,
+            arguments.optional_subtitles[index] if arguments.optional_subtitles else None
+        )
+        for index, (video_filepath, subtitles_filepath) in enumerate(zip(arguments.video, arguments.subtitles))
+    ]
+
+    if job_queue:
+        for episode_job in episode_jobs:
+            job_queue.add_episode(
+                episode_job.video_filepath,
+                episode_job.subtitles_filepath,
+                episode_job.optional_subtitles_filepath
+            )
+
+        job_queue.save()
+        run_job(arguments, job_queue)
+
+        return
+
+    for episode_job in episode_jobs:
+        try:
+            if not generate_cards(arguments, episode_job):
+                _print(f"Some cards of {episode_job.video_filepath} weren't written{NEW_LINE}", True)
+        except Exception as e:
+            die(f"Failed to generate cards from {episode_job.video_filepath}: {e}")
+
+
+__all__: list[str] = ["main"]
@@ -0,0 +1,249 @@
+from ffmpeg     import input as FFMPEGInput
+from ffmpeg     import Error as FFMPEGError
+from mmap       import mmap, ACCESS_READ
+from os         import listdir, makedirs, path, remove, replace, utime
+from threading  import Lock
+from typing     import BinaryIO
+
+from asts.utils.core_utils import _print, clamp, get_file_identity
+from asts.utils.ffmpeg_utils import run_ffmpeg
+from asts.custom_typing.aliases import Filepath
+from asts.custom_typing.process_registry import ProcessRegistry
+from asts.custom_typing.globals import (
+    CACHE_AUDIO_TRACKS_DIR, AUDIO_BITRATE, AUDIO_TRACK_SAMPLE_RATE,
+    AUDIO_TRACK_CHANNELS, AUDIO_TRACK_SAMPLE_WIDTH, AUDIO_TRACK_CACHE_MAX_SIZE
+)
+
+
+class AudioTrackCache:
+    _PCM_FORMAT: str = "s16le"
+    _PCM_CODEC: str = "pcm_s16le"
+
+    def __init__(self, video_filepath: Filepath, process_registry: ProcessRegistry | None = None) -> None:
+        """
+        AudioTrackCache
+
+        Decodes the audio track of a video only once into a raw PCM file kept under CACHE_AUDIO_TRACKS_DIR,
+        audio clips are then sliced out of it through a memory map and only need to be encoded.
+
+        The cached track is keyed by the video file identity, so it's reused across sessions
+        as long as the video file isn't modified. The tracks are bounded by AUDIO_TRACK_CACHE_MAX_SIZE,
+        evicting the least recently used ones, their modification time being when they were last used.
+
+        :param video_filepath: Path to the video whose audio track should be cached.
+        :param process_registry: (Optional) registry keeping track of the ffmpeg processes, to kill them when cancelling.
+        :return:
+        """
+
+        self._video_filepath: Filepath = video_filepath
+        self._process_registry: ProcessRegistry | None = process_registry
+        self._pcm_filepath: Filepath = path.join(
+            CACHE_AUDIO_TRACKS_DIR,
+            f"{get_file_identity(video_filepath)}.{self._PCM_FORMAT}"
+        )
+        self._block_align: int = AUDIO_TRACK_CHANNELS * AUDIO_TRACK_SAMPLE_WIDTH
+        self._lock: Lock = Lock()
+        self._file: BinaryIO | None = None
+        self._mmap: mmap | None = None
+
+
+    def _decode(self) -> bool:
+        """
+        _decode
+
+        Decodes the whole audio track of the video to the cache file.
+
+        The track is first written to a temporary file and then moved in place,
+        so an interrupted decoding never leaves a truncated track behind.
+
+        :return: True if the track was decoded.
+        """
+
+        partial_filepath: Filepath = f"{self._pcm_filepath}.part"
+
+        makedirs(CACHE_AUDIO_TRACKS_DIR, exist_ok=True)
+
+        is_decoded: bool
+
+        try:
+            is_decoded = run_ffmpeg(
+                FFMPEGInput(self._video_filepath).output(
+                    partial_filepath,
+                    format=self._PCM_FORMAT,
+                    acodec=self._PCM_CODEC,
+                    ac=AUDIO_TRACK_CHANNELS,
+                    ar=AUDIO_TRACK_SAMPLE_RATE,
+                    vn=None,
+                    sn=None
+                ).global_args(
+                    "-y",
+                    "-nostdin",
+                    "-loglevel",
+                    "quiet"
+                ),
+                self._process_registry
+            )
+        except FFMPEGError as e:
+            _print(f"Error decoding the audio track: {e.stderr.decode() if e.stderr else e}", True)
+
+            is_decoded = False
+
+        if not is_decoded:
+            if path.exists(partial_filepath): remove(partial_filepath)
+
+            return False
+
+        replace(partial_filepath, self._pcm_filepath)
+
+        return True
+
+
+    def prepare(self) -> bool:
+        """
+        prepare
+
+        Decodes the audio track if it isn't cached yet and maps it into memory.
+
+        :return: True if the track is ready to be sliced.
+        """
+
+        with self._lock:
+            if self._mmap: return True
+
+            if path.exists(self._pcm_filepath):
+                utime(self._pcm_filepath)
+            elif not self._decode():
+                return False
+
+            self._evict()
+
+            # mmap can't map empty files, a video without any audio stream ends up here
+            if not path.getsize(self._pcm_filepath):
+                return False
+
+            self._file = open(self._pcm_filepath, "rb")
+            self._mmap = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+
+        return True
+
+
+    def _evict(self) -> None:
+        """
+        _evict
+
+        Removes the least recently used tracks, other than the track of this video,
+        while the tracks are bigger than AUDIO_TRACK_CACHE_MAX_SIZE.
+
+        :return:
+        """
+
+        tracks: list[tuple[float, int, Filepath]] = []
+
+        for filename in listdir(CACHE_AUDIO_TRACKS_DIR):
+            filepath: Filepath = path.join(CACHE_AUDIO_TRACKS_DIR, filename)
+
+            # Tracks being decoded by another run are left alone
+            if filepath == self._pcm_filepath or not filename.endswith(f".{self._PCM_FORMAT}"): continue
+
+            try:
+                tracks.append((path.getmtime(filepath), path.getsize(filepath), filepath))
+            except FileNotFoundError:
+                pass
+
+        total_size: int = path.getsize(self._pcm_filepath) + sum(size for _, size, _ in tracks)
+
+        for _, size, filepath in sorted(tracks):
+            if total_size <= AUDIO_TRACK_CACHE_MAX_SIZE: break
+
+            try:
+                remove(filepath)
+            except OSError:
+                # Still mapped by another run on Windows, or already evicted by it
+                continue
+
+            total_size -= size
+
+
+    def _get_byte_offset(self, seconds: float) -> int:
+        """
+        _get_byte_offset
+
+        Converts a position in seconds to an offset in bytes aligned to the start of a sample frame.
+
+        :param seconds: Position in seconds.
+        :return: Offset in bytes within the cached track.
+        """
+
+        size: int = len(self._mmap) if self._mmap else 0
+        offset: int = round(seconds * AUDIO_TRACK_SAMPLE_RATE) * self._block_align
+
+        return int(clamp(offset, 0, size - size % self._block_align))
+
+
+    def encode_clip(self, start: float, end: float, audio_filepath: Filepath) -> bool:
+        """
+        encode_clip
+
+        Slices the audio between start and end out of the cached track and encodes it.
+
+        :param start: Start of the clip in seconds.
+        :param end: End of the clip in seconds.
+        :param audio_filepath: Path where the encoded clip should be written.
+        :return: True if the clip was encoded.
+        """
+
+        if not self._mmap:
+            _print(f"Audio track of {self._video_filepath} isn't prepared, clip wasn't encoded.", True)
+
+            return False
+
+        start_offset: int = self._get_byte_offset(start)
+        end_offset: int = self._get_byte_offset(end)
+
+        if end_offset <= start_offset: return False
+
+        try:
+            with memoryview(self._mmap)[start_offset:end_offset] as samples:
+                return run_ffmpeg(
+                    FFMPEGInput(
+                        "pipe:",
+                        format=self._PCM_FORMAT,
+                        ac=AUDIO_TRACK_CHANNELS,
+                        ar=AUDIO_TRACK_SAMPLE_RATE
+                    ).output(
+                        audio_filepath,
+                        b=AUDIO_BITRATE
+                    ).global_args(
+                        "-y",
+                        "-loglevel",
+                        "quiet"
+                    ),
+                    self._process_registry,
+                    samples
+                )
+        except FFMPEGError as e:
+            _print(f"Error encoding audio clip: {e.stderr.decode() if e.stderr else e}", True)
+
+            return False
+
+
+    def close(self) -> None:
+        """
+        close
+
+        Unmaps the cached track, the track itself is kept on disk for later sessions.
+
+        :return:
+        """
+
+        with self._lock:
+            if self._mmap:
+                self._mmap.close()
+                self._mmap = None
+
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+__all__: list[str] = ["AudioTrackCache"]
@@ -1,4 +1,5 @@
 from enum import Enum
+from hashlib import sha1
 from typing import Literal, overload
 
 from asts.custom_typing.aliases import (
@@ -257,5 +258,21 @@ class CardInfo:
                 self._end_timestamp = value
 
 
+    def get_key(self) -> str:
+        """
+        get_key
+
+        Gets a key identifying the card by its time range and fields,
+        it doesn't change across sessions as long as the card isn't edited.
+
+        :return: Hex digest identifying the card.
+        """
+
+        return sha1(
+            f"{self._start_timestamp.timestamp}|{self._end_timestamp.timestamp}|"
+            f"{self._front_field}|{self._back_field}".encode()
+        ).hexdigest()
+
+
 __all__: list[str] = ["CardInfo", "CardInfoIndex"]
 
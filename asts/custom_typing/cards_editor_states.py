@@ -1,4 +1,6 @@
-from enum import IntEnum
+from enum       import IntEnum
+from threading  import Lock
+from typing     import Callable
 
 
 class CardsEditorStates(IntEnum):
@@ -23,6 +25,8 @@ class CardsEditorState:
         """
 
         self._state: CardsEditorStates = CardsEditorStates.NORMAL
+        self._lock: Lock = Lock()
+        self._listeners: list[Callable[[CardsEditorStates, CardsEditorStates], None]] = []
 
 
     def get_state(self) -> CardsEditorStates:
@@ -48,10 +52,37 @@ class CardsEditorState:
         :return:
         """
 
-        if self._state == CardsEditorStates.NORMAL and state == CardsEditorStates.CANCELLED: return
-        if self._state == CardsEditorStates.CANCELLED and state == CardsEditorStates.RUNNING: return
+        previous_state: CardsEditorStates
 
-        self._state = state
+        with self._lock:
+            previous_state = self._state
+
+            if previous_state == state: return
+            if previous_state == CardsEditorStates.NORMAL and state == CardsEditorStates.CANCELLED: return
+            if previous_state == CardsEditorStates.CANCELLED and state == CardsEditorStates.RUNNING: return
+
+            self._state = state
+
+        for listener in list(self._listeners):
+            listener(previous_state, state)
+
+
+    def add_listener(self, listener: Callable[[CardsEditorStates, CardsEditorStates], None]) -> None:
+        """
+        add_listener
+
+        Adds a function to be called with the previous and the new state whenever the state changes.
+        It's called from the thread changing the state, which may not be the main thread.
+
+        :param listener: Function to be called.
+        :return:
+        """
+
+        self._listeners.append(listener)
+
+
+    def remove_listener(self, listener: Callable[[CardsEditorStates, CardsEditorStates], None]) -> None:
+        if listener in self._listeners: self._listeners.remove(listener)
 
 
     def is_state(self, state: CardsEditorStates) -> bool:
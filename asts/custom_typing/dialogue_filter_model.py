@@ -0,0 +1,199 @@
+from asts.custom_typing.globals import GIO_VERSION, GOBJECT_VERSION, GTK_VERSION
+
+from gi import require_version
+require_version(*GIO_VERSION)
+require_version(*GOBJECT_VERSION)
+require_version(*GTK_VERSION)
+from gi.repository.Gio import ListModel
+from gi.repository.GObject import GType, Object
+from gi.repository.Gtk import FilterChange
+
+from array          import array
+from collections    import OrderedDict
+from heapq          import merge
+from typing         import Callable, Iterable
+
+from asts.custom_typing.globals import DIALOGUE_FILTER_CACHE_SIZE
+from asts.custom_typing.dialogue_info import DialogueInfo
+from asts.custom_typing.dialogue_store import DialogueStore
+
+
+# Given the sorted indexes of some rows, gives back the sorted indexes of the ones matching
+MatchFunc = Callable[[Iterable[int]], list[int]]
+
+
+class DialogueFilterModel(Object, ListModel):
+    def __init__(self, model: DialogueStore) -> None:
+        """
+        DialogueFilterModel
+
+        Gio.ListModel showing the rows of a DialogueStore matched by a MatchFunc.
+
+        The rows matching are worked out all at once, from precomputed data such as a SearchIndex,
+        instead of asking a filter about every row through its object, and the views are notified only once.
+        Rows appended to the store are matched as they come.
+
+        A match function stricter or less strict than the previous one only tests the rows that could change,
+        and the rows matched by the last DIALOGUE_FILTER_CACHE_SIZE keys are kept to be shown again right away.
+
+        :param model: Store whose rows are filtered.
+        :return:
+        """
+
+        super().__init__()
+
+        self._model: DialogueStore = model
+        self._match_func: MatchFunc | None = None
+        # indexes in the store of the rows shown, None while every row is
+        self._positions: array[int] | None = None
+        # key of a match function -> rows it matched, the most recently used last
+        self._cached_positions: OrderedDict[str, array[int]] = OrderedDict()
+        # indexes of the rows edited since the rows were last matched, they're tested again whatever the change
+        self._changed_rows: set[int] = set()
+
+        self._model.connect("items-changed", self._on_model_items_changed)
+
+
+    def do_get_item_type(self) -> GType:
+        return DialogueInfo.__gtype__
+
+
+    def do_get_n_items(self) -> int:
+        return len(self._model) if self._positions is None else len(self._positions)
+
+
+    def do_get_item(self, position: int) -> DialogueInfo | None:
+        if self._positions is None: return self._model.do_get_item(position)
+        if not 0 <= position < len(self._positions): return None
+
+        return self._model.do_get_item(self._positions[position])
+
+
+    def _on_model_items_changed(self, _: DialogueStore, position: int, removed: int, added: int) -> None:
+        """
+        _on_model_items_changed
+
+        Handles the items-changed signal of the store, matching the rows appended to it.
+
+        :param model: Store which emitted the signal.
+        :param position: Position of the change.
+        :param removed: Number of rows removed.
+        :param added: Number of rows added.
+        :return:
+        """
+
+        # The cached rows miss the ones just appended
+        self._cached_positions.clear()
+
+        if self._match_func is None or self._positions is None:
+            self.items_changed(position, removed, added)
+            return
+
+        if removed or position != len(self._model) - added:
+            self.set_match_func(self._match_func)
+            return
+
+        n_positions: int = len(self._positions)
+
+        self._positions.extend(self._match_func(range(position, position + added)))
+
+        if len(self._positions) > n_positions:
+            self.items_changed(n_positions, 0, len(self._positions) - n_positions)
+
+
+    def _get_hidden_rows(self) -> list[int]:
+        """
+        _get_hidden_rows
+
+        Gets the rows of the store which aren't shown.
+
+        :return: Sorted indexes of the rows.
+        """
+
+        if self._positions is None: return []
+
+        shown_rows: set[int] = set(self._positions)
+
+        return [index for index in range(len(self._model)) if index not in shown_rows]
+
+
+    def set_match_func(
+        self,
+        match_func: MatchFunc | None,
+        change: FilterChange = FilterChange.DIFFERENT,
+        key: str | None = None
+    ) -> None:
+        """
+        set_match_func
+
+        Filters the rows again.
+
+        :param match_func: Function telling which rows are shown, None to show every row.
+        :param change: How match_func compares to the previous one. FilterChange.MORE_STRICT only tests the rows shown,
+                       FilterChange.LESS_STRICT only tests the rows hidden, FilterChange.DIFFERENT tests every row.
+        :param key: (Optional) key identifying match_func, the rows it matches are cached under it.
+        :return:
+        """
+
+        n_items: int = self.do_get_n_items()
+        positions: array[int] | None
+
+        if match_func is None:
+            positions = None
+        elif key is not None and key in self._cached_positions:
+            self._cached_positions.move_to_end(key)
+            positions = array("q", self._cached_positions[key])
+        elif change == FilterChange.MORE_STRICT:
+            positions = array("q", match_func(
+                sorted(set(self._positions) | self._changed_rows) if self._positions is not None
+                else range(len(self._model))
+            ))
+        elif change == FilterChange.LESS_STRICT and self._positions is not None:
+            positions = array("q", merge(
+                (index for index in self._positions if index not in self._changed_rows),
+                match_func(sorted(set(self._get_hidden_rows()) | self._changed_rows))
+            ))
+        else:
+            positions = array("q", match_func(range(len(self._model))))
+
+        self._match_func = match_func
+        self._positions = positions
+        self._changed_rows.clear()
+
+        if key is not None and positions is not None:
+            self._cached_positions[key] = positions
+
+            while len(self._cached_positions) > DIALOGUE_FILTER_CACHE_SIZE:
+                self._cached_positions.popitem(last=False)
+
+        self.items_changed(0, n_items, self.do_get_n_items())
+
+
+    def clear_cache(self) -> None:
+        """
+        clear_cache
+
+        Forgets the rows matched so far, for when what the match functions look at changes.
+
+        :return:
+        """
+
+        self._cached_positions.clear()
+
+
+    def invalidate_row(self, index: int) -> None:
+        """
+        invalidate_row
+
+        Forgets what's known about whether a row matches, for when it's edited.
+        The rows matched so far are forgotten and the row is tested again by the next match function.
+
+        :param index: Index of the row in the store.
+        :return:
+        """
+
+        self._cached_positions.clear()
+        self._changed_rows.add(index)
+
+
+__all__: list[str] = ["DialogueFilterModel", "MatchFunc"]
@@ -42,7 +42,8 @@ class DialogueInfo(Object):
         end_timestamp_field_info: TimestampFieldInfo = TimestampFieldInfo(),
         has_video: bool = False,
         has_audio: bool = False,
-        has_image: bool = False
+        has_image: bool = False,
+        index: int | None = None
     ) -> None:
         """
         DialogueInfo
@@ -56,15 +57,20 @@ class DialogueInfo(Object):
         :param has_video: If the card has video media.
         :param has_audio: If the card has audio media.
         :param has_image: If the card has image media.
+        :param index: (Optional) zero-based index of the dialogue, by default the next index of the class.
         :return:
         """
 
         super().__init__()
 
         # Class index is 0-based
-        self._index: int                                        = DialogueInfo.__cls_index
-        DialogueInfo.__cls_index                                += 1
-        self._dialogue_uuid: str                                = str(uuid1())
+        if index is None:
+            index = DialogueInfo.__cls_index
+            DialogueInfo.__cls_index += 1
+
+        self._index: int                                        = index
+        # Only generated when it's asked for
+        self._dialogue_uuid: str | None                         = None
         self._dialogue: str                                     = dialogue
         self._start_timestamp_field_info: TimestampFieldInfo    = start_timestamp_field_info
         self._end_timestamp_field_info: TimestampFieldInfo      = end_timestamp_field_info
@@ -75,6 +81,9 @@ class DialogueInfo(Object):
 
     @Property(type=str, default="", flags=ParamFlags.READABLE)
     def dialogue_uuid(self) -> str:
+        if self._dialogue_uuid is None:
+            self._dialogue_uuid = str(uuid1())
+
         return self._dialogue_uuid
 
 
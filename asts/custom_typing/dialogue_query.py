@@ -0,0 +1,325 @@
+from enum       import Enum, auto
+from re         import compile, IGNORECASE, Match
+from re         import error as RegexError
+from typing     import cast, Callable, Iterable, NamedTuple, Pattern
+
+from asts.utils.search_utils import fold_text
+from asts.custom_typing.globals import SEARCH_FUZZY_CHARACTERS_PER_EDIT
+from asts.custom_typing.dialogue_store import DialogueFlags, DialogueStore
+from asts.custom_typing.search_index import SearchIndex
+
+
+# A run of characters up to a space, spaces between double quotes included, the closing quote may still be missing
+_QUERY_TOKEN_PATTERN: Pattern[str] = compile(r'(?:[^\s"]|"[^"]*"?)+')
+# [[hours:]minutes:]seconds[.milliseconds]
+_QUERY_TIME_PATTERN: Pattern[str] = compile(r"^(?:(?:([0-9]+):)?([0-9]+):)?([0-9]+)(?:[.,]([0-9]{1,3}))?$")
+_QUERY_MEDIA_FLAGS: dict[str, int] = {
+    "media": DialogueFlags.HAS_VIDEO | DialogueFlags.HAS_AUDIO | DialogueFlags.HAS_IMAGE,
+    "video": DialogueFlags.HAS_VIDEO,
+    "audio": DialogueFlags.HAS_AUDIO,
+    "image": DialogueFlags.HAS_IMAGE
+}
+
+
+class _QueryTermKind(Enum):
+    TEXT        = auto()
+    REGEX       = auto()
+    FUZZY       = auto()
+    TIME        = auto()
+    MEDIA       = auto()
+    DURATION    = auto()
+    LENGTH      = auto()
+    STYLE       = auto()
+    SPEAKER     = auto()
+
+
+class _QueryTerm(NamedTuple):
+    kind: _QueryTermKind
+    value: str | Pattern[str] | tuple[int, int] | int
+    is_back: bool = False
+    is_negated: bool = False
+
+
+def _unquote(value: str) -> str:
+    return value.replace('"', "")
+
+
+def _parse_time(value: str) -> int:
+    """
+    _parse_time
+
+    Parses a time of a query.
+
+    :param value: Time as [[hours:]minutes:]seconds[.milliseconds].
+    :return: The time in milliseconds.
+    """
+
+    time_match: Match[str] | None = _QUERY_TIME_PATTERN.match(value)
+
+    if not time_match:
+        raise ValueError(f"Invalid time {value!r}, expected [[hours:]minutes:]seconds[.milliseconds].")
+
+    hours: str | None
+    minutes: str | None
+    seconds: str
+    milliseconds: str | None
+    hours, minutes, seconds, milliseconds = time_match.groups()
+
+    return (
+        ((int(hours or 0) * 60 + int(minutes or 0)) * 60 + int(seconds)) * 1000
+        + int((milliseconds or "0").ljust(3, "0"))
+    )
+
+
+def _parse_count(value: str) -> int:
+    if not value.isdigit(): raise ValueError(f"Invalid number {value!r}.")
+
+    return int(value)
+
+
+def _parse_range(value: str, parse_bound: Callable[[str], int]) -> tuple[int, int]:
+    """
+    _parse_range
+
+    Parses a range of a query, either end may be left out.
+
+    :param value: Range as start..end, both included, or a single value.
+    :param parse_bound: Function parsing each end.
+    :return: Start and end of the range.
+    """
+
+    start: str
+    separator: str
+    end: str
+    start, separator, end = value.partition("..")
+
+    if not separator: end = start
+
+    return (
+        parse_bound(start) if start else 0,
+        parse_bound(end) if end else 2 ** 63 - 1
+    )
+
+
+def _match_names(names: Callable[[int], str], name: str, candidates: list[int]) -> list[int]:
+    """
+    _match_names
+
+    Matches the dialogues whose style or speaker contains a name, ignoring case, width and kana.
+
+    :param names: Function getting the style or speaker of a dialogue.
+    :param name: Name to be searched.
+    :param candidates: Sorted indexes of the dialogues to be matched.
+    :return: Sorted indexes of the dialogues matching.
+    """
+
+    folded_name: str = fold_text(name)
+    # Few distinct names repeat over every dialogue, each is only folded once
+    matching_names: set[str] = {
+        candidate_name for candidate_name in {names(index) for index in candidates}
+        if folded_name in fold_text(candidate_name)
+    }
+
+    return [index for index in candidates if names(index) in matching_names]
+
+
+class DialogueQuery:
+    def __init__(self, query: str) -> None:
+        """
+        DialogueQuery
+
+        Query searching the dialogues of the CardsEditor, made of terms separated by spaces,
+        all of which a dialogue must match. Double quotes keep spaces within a term.
+
+            text            Dialogues containing the text, ignoring case, width and kana.
+            re:pattern      Dialogues matching the regular expression, ignoring case.
+            ~text           Dialogues containing the text with a few typos, one for
+                            every SEARCH_FUZZY_CHARACTERS_PER_EDIT characters.
+            back:term       The text, regular expression or typos term, searched in the back of the cards.
+            t:start..end    Dialogues overlapping the time range, as [[hours:]minutes:]seconds[.milliseconds],
+                            either end may be left out.
+            dur:min..max    Dialogues lasting within the range, as t:, dur:1..8 being from 1 to 8 seconds.
+            len:min..max    Dialogues with a number of characters within the range, len:20.. being 20 or more.
+            style:name      Dialogues whose subtitles style contains the name.
+            speaker:name    Dialogues whose speaker contains the name.
+            has:media       Dialogues with some media selected, or has:video, has:audio and has:image.
+            -term           Dialogues not matching the term.
+
+        The text left outside of any other term is searched as a whole, as it's typed.
+
+        :param query: Query to be parsed.
+        :return:
+        """
+
+        self._plain_text: str
+        self._terms: list[_QueryTerm] = []
+
+        plain_texts: list[str] = []
+
+        for token in _QUERY_TOKEN_PATTERN.findall(query):
+            term: _QueryTerm | None = self._parse_term(token)
+
+            if not term: continue
+
+            if term.kind == _QueryTermKind.TEXT and not term.is_back and not term.is_negated:
+                plain_texts.append(cast(str, term.value))
+            else:
+                self._terms.append(term)
+
+        self._plain_text = " ".join(plain_texts)
+
+        # The plain text goes first, its trigrams narrow the dialogues the most for the least work
+        if self._plain_text: self._terms.insert(0, _QueryTerm(_QueryTermKind.TEXT, self._plain_text))
+
+
+    def _parse_term(self, token: str) -> _QueryTerm | None:
+        """
+        _parse_term
+
+        Parses a term of the query.
+
+        :param token: Term as typed.
+        :return: The term, None if it's empty.
+        """
+
+        is_negated: bool = token.startswith("-") and len(token) > 1
+        is_back: bool = False
+
+        if is_negated: token = token[1:]
+
+        key: str
+        separator: str
+        value: str
+        key, separator, value = token.partition(":")
+
+        match key.lower() if separator else None:
+            case "t":
+                return _QueryTerm(_QueryTermKind.TIME, _parse_range(value, _parse_time), is_negated=is_negated)
+            case "dur":
+                return _QueryTerm(_QueryTermKind.DURATION, _parse_range(value, _parse_time), is_negated=is_negated)
+            case "len":
+                return _QueryTerm(_QueryTermKind.LENGTH, _parse_range(value, _parse_count), is_negated=is_negated)
+            case "style" if _unquote(value):
+                return _QueryTerm(_QueryTermKind.STYLE, _unquote(value), is_negated=is_negated)
+            case "speaker" if _unquote(value):
+                return _QueryTerm(_QueryTermKind.SPEAKER, _unquote(value), is_negated=is_negated)
+            case "has":
+                if value.lower() not in _QUERY_MEDIA_FLAGS:
+                    raise ValueError(f"Invalid media {value!r}, expected one of {', '.join(_QUERY_MEDIA_FLAGS)}.")
+
+                return _QueryTerm(_QueryTermKind.MEDIA, _QUERY_MEDIA_FLAGS[value.lower()], is_negated=is_negated)
+            case "front" | "back":
+                is_back = key.lower() == "back"
+                token = value
+                key, separator, value = token.partition(":")
+
+        if separator and key.lower() == "re" and value:
+            try:
+                return _QueryTerm(_QueryTermKind.REGEX, compile(_unquote(value), IGNORECASE), is_back, is_negated)
+            except RegexError as e:
+                raise ValueError(f"Invalid regular expression {value!r}: {e}.")
+
+        if token.startswith("~") and _unquote(token[1:]):
+            return _QueryTerm(_QueryTermKind.FUZZY, _unquote(token[1:]), is_back, is_negated)
+
+        if not _unquote(token): return None
+
+        return _QueryTerm(_QueryTermKind.TEXT, _unquote(token), is_back, is_negated)
+
+
+    def get_plain_text(self) -> str | None:
+        """
+        get_plain_text
+
+        Gets the text searched by the query, if that's all it searches.
+
+        :return: The text, None if the query has any other term.
+        """
+
+        return self._plain_text if len(self._terms) == (1 if self._plain_text else 0) else None
+
+
+    def has_media_terms(self) -> bool:
+        return any(term.kind == _QueryTermKind.MEDIA for term in self._terms)
+
+
+    def match(
+        self,
+        candidates: Iterable[int],
+        front_search_index: SearchIndex,
+        back_search_index: SearchIndex,
+        dialogue_store: DialogueStore
+    ) -> list[int]:
+        """
+        match
+
+        Matches dialogues against the query, a term at a time, each only testing the dialogues left by the previous ones.
+
+        :param candidates: Sorted indexes of the dialogues to be matched.
+        :param front_search_index: SearchIndex of the front dialogues.
+        :param back_search_index: SearchIndex of the back dialogues.
+        :param dialogue_store: Store of the front dialogues, whose timestamps and medias are matched.
+        :return: Sorted indexes of the dialogues matching every term.
+        """
+
+        matches: list[int] = list(candidates)
+
+        for term in self._terms:
+            if not matches: break
+
+            search_index: SearchIndex = back_search_index if term.is_back else front_search_index
+            term_matches: list[int]
+
+            match term.kind:
+                case _QueryTermKind.TEXT:
+                    term_matches = search_index.search(cast(str, term.value), matches)
+                case _QueryTermKind.REGEX:
+                    term_matches = search_index.search_regex(cast(Pattern[str], term.value), matches)
+                case _QueryTermKind.FUZZY:
+                    term_matches = search_index.search_fuzzy(
+                        cast(str, term.value),
+                        max(1, len(cast(str, term.value)) // SEARCH_FUZZY_CHARACTERS_PER_EDIT),
+                        matches
+                    )
+                case _QueryTermKind.TIME:
+                    start: int
+                    end: int
+                    start, end = cast(tuple[int, int], term.value)
+                    term_matches = [
+                        index for index in matches
+                        if dialogue_store.get_start(index) <= end and dialogue_store.get_end(index) >= start
+                    ]
+                case _QueryTermKind.MEDIA:
+                    flags: bytes = dialogue_store.get_flags_column()
+                    media_flags: int = cast(int, term.value)
+                    term_matches = [index for index in matches if flags[index] & media_flags]
+                case _QueryTermKind.DURATION:
+                    shortest: int
+                    longest: int
+                    shortest, longest = cast(tuple[int, int], term.value)
+                    term_matches = [
+                        index for index in matches
+                        if shortest <= dialogue_store.get_end(index) - dialogue_store.get_start(index) <= longest
+                    ]
+                case _QueryTermKind.LENGTH:
+                    fewest: int
+                    most: int
+                    fewest, most = cast(tuple[int, int], term.value)
+                    term_matches = [
+                        index for index in matches if fewest <= len(front_search_index.get_text(index)) <= most
+                    ]
+                case _QueryTermKind.STYLE:
+                    term_matches = _match_names(dialogue_store.get_style, cast(str, term.value), matches)
+                case _QueryTermKind.SPEAKER:
+                    term_matches = _match_names(dialogue_store.get_speaker, cast(str, term.value), matches)
+
+            if term.is_negated:
+                matched: set[int] = set(term_matches)
+                term_matches = [index for index in matches if index not in matched]
+
+            matches = term_matches
+
+        return matches
+
+
+__all__: list[str] = ["DialogueQuery"]
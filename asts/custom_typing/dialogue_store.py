@@ -0,0 +1,444 @@
+from asts.custom_typing.globals import GIO_VERSION, GOBJECT_VERSION
+
+from gi import require_version
+require_version(*GIO_VERSION)
+require_version(*GOBJECT_VERSION)
+from gi.repository.Gio import ListModel
+from gi.repository.GObject import GType, Object, ParamFlags, ParamSpec, Property
+
+from array      import array
+from enum       import IntFlag
+from sys        import intern
+from typing     import cast, Iterable, Iterator, Literal
+from weakref    import WeakValueDictionary
+
+from asts.custom_typing.dialogue_info import DialogueInfo, DialogueInfoIndex
+from asts.custom_typing.timestamp import Timestamp
+from asts.custom_typing.timestamp_columns import TimestampColumns
+from asts.custom_typing.timestamp_field_info import TimestampFieldInfo
+
+
+class DialogueFlags(IntFlag):
+    """
+    DialogueFlags
+
+    Medias selected for a dialogue, as packed by DialogueStore.
+    """
+
+    NONE        = 0
+    HAS_VIDEO   = 1
+    HAS_AUDIO   = 2
+    HAS_IMAGE   = 4
+
+
+# DialogueInfo property of each media
+_MEDIA_FLAG_KEYS: dict[DialogueFlags, Literal[
+    DialogueInfoIndex.HAS_VIDEO, DialogueInfoIndex.HAS_AUDIO, DialogueInfoIndex.HAS_IMAGE
+]] = {
+    DialogueFlags.HAS_VIDEO: DialogueInfoIndex.HAS_VIDEO,
+    DialogueFlags.HAS_AUDIO: DialogueInfoIndex.HAS_AUDIO,
+    DialogueFlags.HAS_IMAGE: DialogueInfoIndex.HAS_IMAGE
+}
+
+
+class DialogueStore(Object, ListModel):
+    def __init__(self) -> None:
+        """
+        DialogueStore
+
+        Gio.ListModel of DialogueInfo backed by columns, the dialogues, their start and end timestamps
+        in milliseconds, their medias packed as DialogueFlags and the style and speaker of their cues.
+
+        Rows are only materialized as DialogueInfo objects when they're asked for, as the ColumnView does
+        for the rows it binds, and they're only kept while something else holds them. Changes made through a row
+        are written back to the columns and changes made through the store are forwarded to its row, if any.
+
+        The number of dialogues with some media selected is kept as the n-with-medias property,
+        notified whenever it changes.
+
+        :return:
+        """
+
+        super().__init__()
+
+        self._dialogues: list[str] = []
+        self._starts: array[int] = array("q")
+        self._ends: array[int] = array("q")
+        self._flags: bytearray = bytearray()
+        self._styles: list[str] = []
+        self._speakers: list[str] = []
+        self._n_with_medias: int = 0
+        # index -> row currently materialized
+        self._rows: WeakValueDictionary[int, DialogueInfo] = WeakValueDictionary()
+
+
+    @Property(type=int, default=0, flags=ParamFlags.READABLE)
+    def n_with_medias(self) -> int:
+        return self._n_with_medias
+
+
+    def _set_n_with_medias(self, n_with_medias: int) -> None:
+        if n_with_medias == self._n_with_medias: return
+
+        self._n_with_medias = n_with_medias
+
+        self.notify("n-with-medias")
+
+
+    def do_get_item_type(self) -> GType:
+        return DialogueInfo.__gtype__
+
+
+    def do_get_n_items(self) -> int:
+        return len(self._dialogues)
+
+
+    def do_get_item(self, position: int) -> DialogueInfo | None:
+        if not 0 <= position < len(self._dialogues): return None
+
+        row: DialogueInfo | None = self._rows.get(position)
+
+        if row: return row
+
+        row = self._materialize_row(position)
+        self._rows[position] = row
+
+        return row
+
+
+    def _materialize_row(self, index: int) -> DialogueInfo:
+        """
+        _materialize_row
+
+        Creates the DialogueInfo of a row, listening to its changes to write them back to the columns.
+
+        :param index: Index of the row.
+        :return: The row object.
+        """
+
+        flags: int = self._flags[index]
+        row: DialogueInfo = DialogueInfo(
+            dialogue=self._dialogues[index],
+            start_timestamp_field_info=TimestampFieldInfo(self._starts[index]),
+            end_timestamp_field_info=TimestampFieldInfo(self._ends[index]),
+            has_video=bool(flags & DialogueFlags.HAS_VIDEO),
+            has_audio=bool(flags & DialogueFlags.HAS_AUDIO),
+            has_image=bool(flags & DialogueFlags.HAS_IMAGE),
+            index=index
+        )
+
+        row.connect("notify", self._on_row_notify)
+        row[DialogueInfoIndex.START_TIMESTAMP_FIELD_INFO].connect(
+            "notify::timestamp",
+            self._on_row_start_timestamp_notify,
+            index
+        )
+        row[DialogueInfoIndex.END_TIMESTAMP_FIELD_INFO].connect(
+            "notify::timestamp",
+            self._on_row_end_timestamp_notify,
+            index
+        )
+
+        return row
+
+
+    def _on_row_notify(self, row: DialogueInfo, param_spec: ParamSpec) -> None:
+        """
+        _on_row_notify
+
+        Writes a change made through a row back to the columns.
+
+        :param row: Row which changed.
+        :param param_spec: Property which changed.
+        :return:
+        """
+
+        index: int = row.get_index()
+
+        match param_spec.name:
+            case "dialogue":
+                self.set_dialogue(index, row[DialogueInfoIndex.DIALOGUE])
+            case "has-video":
+                self.set_has_video(index, row[DialogueInfoIndex.HAS_VIDEO])
+            case "has-audio":
+                self.set_has_audio(index, row[DialogueInfoIndex.HAS_AUDIO])
+            case "has-image":
+                self.set_has_image(index, row[DialogueInfoIndex.HAS_IMAGE])
+
+
+    def _on_row_start_timestamp_notify(self, field_info: TimestampFieldInfo, _: ParamSpec, index: int) -> None:
+        self.set_start(index, field_info.get_timestamp_object().milliseconds)
+
+
+    def _on_row_end_timestamp_notify(self, field_info: TimestampFieldInfo, _: ParamSpec, index: int) -> None:
+        self.set_end(index, field_info.get_timestamp_object().milliseconds)
+
+
+    def extend(
+        self,
+        dialogues: list[str],
+        starts: list[int] | None = None,
+        ends: list[int] | None = None,
+        styles: list[str] | None = None,
+        speakers: list[str] | None = None
+    ) -> None:
+        """
+        extend
+
+        Appends dialogues to the store, notifying the views only once.
+
+        :param dialogues: Dialogues to be appended.
+        :param starts: (Optional) start of each dialogue in milliseconds.
+        :param ends: (Optional) end of each dialogue in milliseconds.
+        :param styles: (Optional) style of the cue of each dialogue.
+        :param speakers: (Optional) speaker of the cue of each dialogue.
+        :return:
+        """
+
+        if not dialogues: return
+
+        position: int = len(self._dialogues)
+
+        self._dialogues.extend(intern(dialogue) for dialogue in dialogues)
+        self._starts.extend(starts if starts is not None else [0] * len(dialogues))
+        self._ends.extend(ends if ends is not None else [0] * len(dialogues))
+        self._flags.extend(bytes(len(dialogues)))
+        # Few distinct styles and speakers repeat over every dialogue
+        self._styles.extend(intern(style) for style in styles or [""] * len(dialogues))
+        self._speakers.extend(intern(speaker) for speaker in speakers or [""] * len(dialogues))
+        self.items_changed(position, 0, len(dialogues))
+
+
+    def append(self, dialogue: str, start: int = 0, end: int = 0) -> None:
+        self.extend([dialogue], [start], [end])
+
+
+    def get_dialogue(self, index: int) -> str:
+        return self._dialogues[index]
+
+
+    def get_start(self, index: int) -> int:
+        return self._starts[index]
+
+
+    def get_end(self, index: int) -> int:
+        return self._ends[index]
+
+
+    def get_style(self, index: int) -> str:
+        return self._styles[index]
+
+
+    def get_speaker(self, index: int) -> str:
+        return self._speakers[index]
+
+
+    def get_flags(self, index: int) -> DialogueFlags:
+        return DialogueFlags(self._flags[index])
+
+
+    def has_video(self, index: int) -> bool:
+        return bool(self._flags[index] & DialogueFlags.HAS_VIDEO)
+
+
+    def has_audio(self, index: int) -> bool:
+        return bool(self._flags[index] & DialogueFlags.HAS_AUDIO)
+
+
+    def has_image(self, index: int) -> bool:
+        return bool(self._flags[index] & DialogueFlags.HAS_IMAGE)
+
+
+    def has_any_media(self, index: int) -> bool:
+        return self._flags[index] != DialogueFlags.NONE
+
+
+    def get_n_with_medias(self) -> int:
+        return self._n_with_medias
+
+
+    def get_flags_column(self) -> bytes:
+        """
+        get_flags_column
+
+        Gets a copy of the medias of the dialogues.
+
+        :return: The DialogueFlags of each dialogue packed in a byte, indexed as the store.
+        """
+
+        return bytes(self._flags)
+
+
+    def get_timestamp_columns(self) -> TimestampColumns:
+        """
+        get_timestamp_columns
+
+        Gets a copy of the timestamps of the dialogues.
+
+        :return: The timestamp columns, indexed as the store.
+        """
+
+        return TimestampColumns(self._starts, self._ends)
+
+
+    def set_dialogue(self, index: int, dialogue: str) -> None:
+        """
+        set_dialogue
+
+        Sets the dialogue of a row.
+
+        :param index: Index of the row.
+        :param dialogue: Dialogue, in Pango markup.
+        :return:
+        """
+
+        if self._dialogues[index] == dialogue: return
+
+        self._dialogues[index] = dialogue
+        row: DialogueInfo | None = self._rows.get(index)
+
+        if row: row[DialogueInfoIndex.DIALOGUE] = dialogue
+
+
+    def set_start(self, index: int, milliseconds: int) -> None:
+        """
+        set_start
+
+        Sets the start timestamp of a row.
+
+        :param index: Index of the row.
+        :param milliseconds: Start of the dialogue in milliseconds.
+        :return:
+        """
+
+        if self._starts[index] == milliseconds: return
+
+        self._starts[index] = milliseconds
+        row: DialogueInfo | None = self._rows.get(index)
+
+        if row: row[DialogueInfoIndex.START_TIMESTAMP_FIELD_INFO].timestamp = Timestamp(milliseconds)
+
+
+    def set_end(self, index: int, milliseconds: int) -> None:
+        """
+        set_end
+
+        Sets the end timestamp of a row.
+
+        :param index: Index of the row.
+        :param milliseconds: End of the dialogue in milliseconds.
+        :return:
+        """
+
+        if self._ends[index] == milliseconds: return
+
+        self._ends[index] = milliseconds
+        row: DialogueInfo | None = self._rows.get(index)
+
+        if row: row[DialogueInfoIndex.END_TIMESTAMP_FIELD_INFO].timestamp = Timestamp(milliseconds)
+
+
+    def _set_flag(self, index: int, flag: DialogueFlags, value: bool) -> bool:
+        """
+        _set_flag
+
+        Sets or clears a flag of a row.
+
+        :param index: Index of the row.
+        :param flag: Flag to be set or cleared.
+        :param value: True to set the flag.
+        :return: True if the flag changed.
+        """
+
+        flags: int = self._flags[index] | flag if value else self._flags[index] & ~flag
+
+        if flags == self._flags[index]: return False
+
+        previous_flags: int = self._flags[index]
+        self._flags[index] = flags
+
+        if not previous_flags or not flags:
+            self._set_n_with_medias(self._n_with_medias + (1 if flags else -1))
+
+        return True
+
+
+    def set_has_video(self, index: int, value: bool) -> None:
+        if not self._set_flag(index, DialogueFlags.HAS_VIDEO, value): return
+
+        row: DialogueInfo | None = self._rows.get(index)
+
+        if row: row[DialogueInfoIndex.HAS_VIDEO] = value
+
+
+    def set_has_audio(self, index: int, value: bool) -> None:
+        if not self._set_flag(index, DialogueFlags.HAS_AUDIO, value): return
+
+        row: DialogueInfo | None = self._rows.get(index)
+
+        if row: row[DialogueInfoIndex.HAS_AUDIO] = value
+
+
+    def set_has_image(self, index: int, value: bool) -> None:
+        if not self._set_flag(index, DialogueFlags.HAS_IMAGE, value): return
+
+        row: DialogueInfo | None = self._rows.get(index)
+
+        if row: row[DialogueInfoIndex.HAS_IMAGE] = value
+
+
+    def set_medias(self, flags: DialogueFlags, value: bool, indexes: Iterable[int] | None = None) -> None:
+        """
+        set_medias
+
+        Sets or clears medias of many rows at once.
+
+        The columns are changed in a single pass and only the rows currently materialized are notified,
+        which are the only ones a view may be showing, so the cost doesn't grow with the rows changed.
+
+        :param flags: Medias to be set or cleared.
+        :param value: True to set the medias.
+        :param indexes: (Optional) indexes of the rows, defaults to all of them.
+        :return:
+        """
+
+        if indexes is None:
+            # Every possible byte mapped to itself with the medias set or cleared
+            self._flags = self._flags.translate(bytes(
+                flags_byte | flags if value else flags_byte & ~flags & 0xFF for flags_byte in range(256)
+            ))
+        else:
+            for index in indexes:
+                self._flags[index] = self._flags[index] | flags if value else self._flags[index] & ~flags
+
+        self._set_n_with_medias(len(self._flags) - self._flags.count(DialogueFlags.NONE))
+
+        for index, row in list(self._rows.items()):
+            for flag, key in _MEDIA_FLAG_KEYS.items():
+                if flags & flag and row[key] != bool(self._flags[index] & flag):
+                    row[key] = bool(self._flags[index] & flag)
+
+
+    def __getitem__(self, index: int) -> DialogueInfo | None:
+        return self.do_get_item(index)
+
+
+    def __iter__(self) -> Iterator[DialogueInfo]:
+        """
+        __iter__
+
+        Iterates over the rows, materializing every one of them,
+        prefer the column getters when the row objects aren't needed.
+
+        :return: Iterator over the rows.
+        """
+
+        for index in range(len(self._dialogues)):
+            yield cast(DialogueInfo, self.do_get_item(index))
+
+
+    def __len__(self) -> int:
+        return len(self._dialogues)
+
+
+__all__: list[str] = ["DialogueFlags", "DialogueStore"]
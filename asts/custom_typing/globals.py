@@ -17,27 +17,29 @@ from os import path
 from typing import cast, Callable, Pattern
 from re import compile
 
-from asts.utils.core_utils import die
 
+# Default display, there is none when running headless
+DISPLAY: Display | None = Display.get_default()
 
-# Default display
-__display: Display | None = Display.get_default()
-DISPLAY: Display = __display if __display else die("Failed to get the default display, exiting...")
-
-# Loads the primary monitor width x height
-__get_primary_monitor_width: Callable[[], int] = (
-    lambda: cast(Monitor, DISPLAY.get_monitors()[0]).get_geometry().width
+# Loads the primary monitor width x height, zero when running headless
+__get_primary_monitor_width: Callable[[Display], int] = (
+    lambda display: cast(Monitor, display.get_monitors()[0]).get_geometry().width
 )
-__get_primary_monitor_height: Callable[[], int] = (
-    lambda: cast(Monitor, DISPLAY.get_monitors()[0]).get_geometry().height
+__get_primary_monitor_height: Callable[[Display], int] = (
+    lambda display: cast(Monitor, display.get_monitors()[0]).get_geometry().height
 )
-DISPLAY_WIDTH: int = __get_primary_monitor_width()
-DISPLAY_HEIGHT: int = __get_primary_monitor_height()
+DISPLAY_WIDTH: int = __get_primary_monitor_width(DISPLAY) if DISPLAY else 0
+DISPLAY_HEIGHT: int = __get_primary_monitor_height(DISPLAY) if DISPLAY else 0
 
 APPLICATION_ROOT_DIRECTORY: str = path.dirname(path.abspath(argv[0]))
 CACHE_DIR: str = path.join(APPLICATION_ROOT_DIRECTORY, "cache")
 CACHE_MEDIA_DIR: str = path.join(CACHE_DIR, "media")
+CACHE_MEDIA_STORE_DIR: str = path.join(CACHE_DIR, "media_store")
 CACHE_SUBTITLES_DIR: str = path.join(CACHE_DIR, "subtitles")
+CACHE_AUDIO_TRACKS_DIR: str = path.join(CACHE_DIR, "audio_tracks")
+CACHE_JOBS_DIR: str = path.join(CACHE_DIR, "jobs")
+CACHE_VOICE_ACTIVITY_DIR: str = path.join(CACHE_DIR, "voice_activity")
+CACHE_VIDEO_METADATA_DIR: str = path.join(CACHE_DIR, "video_metadata")
 RECENTLY_USED_FILEPATH: str = path.join(CACHE_DIR, "recently_used")
 ICONS_SYMBOLIC_DIRECTORY: str = path.join(
     APPLICATION_ROOT_DIRECTORY,
@@ -52,14 +54,99 @@ VIDEO_FORMAT: str = ".mp4"
 AUDIO_FORMAT: str = ".mp3"
 IMAGE_FORMAT: str = ".bmp"
 
-# Regex to match timestamp
-REGEX_TIMESTAMP_PATTERN: Pattern[str] = compile(r"^(?:[0-9]{2,3}:[0-9]{2}:[0-9]{2}[.,][0-9]{3})$")
+# Encode settings of the media files, changing them also changes
+# the keys of the medias kept in CACHE_MEDIA_STORE_DIR
+VIDEO_SCALE_WIDTH: int = 640
+AUDIO_BITRATE: str = "320k"
+VIDEO_ENCODE_SETTINGS: str = f"scale={VIDEO_SCALE_WIDTH}:-1"
+AUDIO_ENCODE_SETTINGS: str = f"b={AUDIO_BITRATE}"
+IMAGE_ENCODE_SETTINGS: str = f"scale={VIDEO_SCALE_WIDTH}:-1,vframes=1"
+
+# Maximum size in bytes of CACHE_MEDIA_STORE_DIR before the least recently used medias are evicted
+MEDIA_CACHE_MAX_SIZE: int = 2 * 1024 ** 3
+# Files of CACHE_MEDIA_STORE_DIR missing from its index are only removed once they're this old,
+# younger ones may still be being cut by another run
+MEDIA_CACHE_UNCOMMITTED_GRACE_SECONDS: float = 24 * 60 * 60
+
+# Layout of the decoded audio tracks kept in CACHE_AUDIO_TRACKS_DIR,
+# signed 16 bits little-endian interleaved samples
+AUDIO_TRACK_SAMPLE_RATE: int = 48000
+AUDIO_TRACK_CHANNELS: int = 2
+AUDIO_TRACK_SAMPLE_WIDTH: int = 2
+# Maximum size in bytes of CACHE_AUDIO_TRACKS_DIR before the least recently used tracks are evicted,
+# about 11 hours of audio at the layout above
+AUDIO_TRACK_CACHE_MAX_SIZE: int = 8 * 1024 ** 3
+
+# Every segment cut by a batch holds its own encoder,
+# this keeps the memory used by a single ffmpeg process bounded
+MAX_SEGMENTS_PER_BATCH: int = 32
+# Gap between two consecutive segments of a batch from where
+# seeking becomes cheaper than decoding everything in between
+MAX_BATCH_GAP_SECONDS: float = 30.0
+# Notes added to the collection within a single transaction,
+# notes already added are kept in case generating cards is interrupted
+NOTES_PER_TRANSACTION: int = 100
+# Number of ffmpeg processes the media scheduler starts with before adapting to the machine
+MEDIA_SCHEDULER_INITIAL_CONCURRENCY: int = 2
+# Minimum duration of the window over which the media scheduler measures throughput
+MEDIA_SCHEDULER_WINDOW_SECONDS: float = 2.0
+# Relative throughput change the media scheduler considers an improvement or a regression
+MEDIA_SCHEDULER_THROUGHPUT_TOLERANCE: float = 0.05
+# Largest gap in milliseconds between a translation cue overlapping no dialogue
+# and the nearest dialogue for it to still be aligned to that dialogue
+ALIGNMENT_MAX_GAP_MS: int = 500
+# Fraction of a dialogue a translation cue must cover to also be aligned to it,
+# besides the dialogue it overlaps the most, as happens when a translation merges dialogues
+ALIGNMENT_MIN_COVERAGE: float = 0.5
+# Duration of each frame of the voice activity envelope of a video
+VOICE_ACTIVITY_FRAME_MS: int = 10
+# Where, between the quietest and the loudest frames of a video, a frame starts being voiced
+VOICE_ACTIVITY_THRESHOLD: float = 0.35
+# Largest offset searched between the subtitles and the audio of a video
+SYNC_MAX_OFFSET_MS: int = 10000
+# Length of the stretches of a video whose offset is looked for on their own to follow drifting subtitles
+SYNC_SEGMENT_MS: int = 10 * 60 * 1000
+# Fewer cues than this in a stretch aren't enough to tell its offset
+SYNC_MIN_SEGMENT_CUES: int = 20
+# Dialogues added to the CardsEditor list stores at once while the subtitles are loaded,
+# the main loop gets to draw and handle input between two chunks
+DIALOGUES_LOADING_CHUNK_SIZE: int = 500
+# Number of recent searches whose matching dialogues are kept, so going back to one of them is instant
+DIALOGUE_FILTER_CACHE_SIZE: int = 16
+# A fuzzy search allows one typo for every this many characters searched
+SEARCH_FUZZY_CHARACTERS_PER_EDIT: int = 4
+# Shortest time between two progress updates of the cards generator, a frame at 60 fps
+PROGRESS_UPDATE_INTERVAL_SECONDS: float = 1 / 60
+# Shortest time between two progress lines of the command line when its output isn't a terminal
+PROGRESS_LOG_INTERVAL_SECONDS: float = 10.0
+# Farthest keyframe before a clip its start is moved back to when the clip is stream copied,
+# past it only the head of the clip up to the next keyframe is encoded
+KEYFRAME_SNAP_MAX_SECONDS: float = 2.0
+# Margin the clips are seeked past a keyframe with, so rounding never lands on the frame before it,
+# well below the duration of a frame
+KEYFRAME_SEEK_MARGIN_SECONDS: float = 0.001
+
+# Regex to match timestamp, capturing hours, minutes, seconds and milliseconds
+REGEX_TIMESTAMP_PATTERN: Pattern[str] = compile(r"^([0-9]{2,3}):([0-9]{2}):([0-9]{2})[.,]([0-9]{3})$")
 
 __all__: list[str] = [
     "GTK_VERSION", "GDK_VERSION", "GLIB_VERSION", "GIO_VERSION",
     "GOBJECT_VERSION", "PANGO_VERSION", "DISPLAY", "DISPLAY_WIDTH",
     "DISPLAY_HEIGHT", "APPLICATION_ROOT_DIRECTORY", "CACHE_DIR", "CACHE_MEDIA_DIR",
-    "RECENTLY_USED_FILEPATH", "ICONS_SYMBOLIC_DIRECTORY", "REGEX_TIMESTAMP_PATTERN",
-    "VIDEO_FORMAT", "AUDIO_FORMAT", "IMAGE_FORMAT"
+    "CACHE_MEDIA_STORE_DIR", "CACHE_SUBTITLES_DIR", "CACHE_AUDIO_TRACKS_DIR", "CACHE_JOBS_DIR",
+    "CACHE_VOICE_ACTIVITY_DIR", "CACHE_VIDEO_METADATA_DIR", "RECENTLY_USED_FILEPATH",
+    "ICONS_SYMBOLIC_DIRECTORY", "REGEX_TIMESTAMP_PATTERN",
+    "VIDEO_FORMAT", "AUDIO_FORMAT", "IMAGE_FORMAT", "VIDEO_SCALE_WIDTH", "AUDIO_BITRATE",
+    "VIDEO_ENCODE_SETTINGS", "AUDIO_ENCODE_SETTINGS", "IMAGE_ENCODE_SETTINGS",
+    "MEDIA_CACHE_MAX_SIZE", "MEDIA_CACHE_UNCOMMITTED_GRACE_SECONDS", "AUDIO_TRACK_SAMPLE_RATE",
+    "AUDIO_TRACK_CHANNELS", "AUDIO_TRACK_SAMPLE_WIDTH", "AUDIO_TRACK_CACHE_MAX_SIZE",
+    "MAX_SEGMENTS_PER_BATCH", "MAX_BATCH_GAP_SECONDS",
+    "NOTES_PER_TRANSACTION", "MEDIA_SCHEDULER_INITIAL_CONCURRENCY",
+    "MEDIA_SCHEDULER_WINDOW_SECONDS", "MEDIA_SCHEDULER_THROUGHPUT_TOLERANCE",
+    "ALIGNMENT_MAX_GAP_MS", "ALIGNMENT_MIN_COVERAGE", "VOICE_ACTIVITY_FRAME_MS",
+    "VOICE_ACTIVITY_THRESHOLD", "SYNC_MAX_OFFSET_MS", "SYNC_SEGMENT_MS",
+    "SYNC_MIN_SEGMENT_CUES", "DIALOGUES_LOADING_CHUNK_SIZE",
+    "DIALOGUE_FILTER_CACHE_SIZE", "SEARCH_FUZZY_CHARACTERS_PER_EDIT",
+    "PROGRESS_UPDATE_INTERVAL_SECONDS", "PROGRESS_LOG_INTERVAL_SECONDS",
+    "KEYFRAME_SNAP_MAX_SECONDS", "KEYFRAME_SEEK_MARGIN_SECONDS"
 ]
-
@@ -0,0 +1,292 @@
+from contextlib import contextmanager
+from hashlib    import sha1
+from json       import dump, load, JSONDecodeError
+from os         import listdir, makedirs, path, remove, replace
+from threading  import Lock
+from time       import time
+from typing     import Iterator
+
+# Only needed to share the store between runs, which isn't guarded on Windows
+try:
+    from fcntl  import flock, LOCK_EX, LOCK_UN
+except ImportError:
+    flock = None
+
+from asts.utils.core_utils import _print, NEW_LINE
+from asts.custom_typing.aliases import Filename, Filepath
+from asts.custom_typing.globals import (
+    CACHE_MEDIA_STORE_DIR, MEDIA_CACHE_MAX_SIZE, MEDIA_CACHE_UNCOMMITTED_GRACE_SECONDS
+)
+
+
+class MediaCache:
+    _INDEX_FILENAME: Filename = "index.json"
+    _LOCK_FILENAME: Filename = "index.lock"
+
+    def __init__(self, directory: Filepath = CACHE_MEDIA_STORE_DIR, max_size: int = MEDIA_CACHE_MAX_SIZE) -> None:
+        """
+        MediaCache
+
+        Persistent, content addressed store for the medias cut from videos.
+
+        Each media is named after a digest of the video identity, its start and end timestamps,
+        its kind and the encode settings used to create it, so the same media is never encoded twice,
+        even across sessions. The store is bounded by max_size, evicting the least recently used medias.
+
+        Only medias committed to the index are considered cached, leftovers of interrupted or failed encodes
+        are discarded on eviction once they're older than MEDIA_CACHE_UNCOMMITTED_GRACE_SECONDS.
+
+        Several runs may share the store, the index on disk is locked while it's read and written,
+        and merged with the entries of this run before being written back.
+
+        :param directory: Directory where the medias and the index are kept.
+        :param max_size: Maximum size in bytes the store can grow before evicting medias.
+        :return:
+        """
+
+        self._directory: Filepath = directory
+        self._index_filepath: Filepath = path.join(directory, self._INDEX_FILENAME)
+        self._lock_filepath: Filepath = path.join(directory, self._LOCK_FILENAME)
+        self._max_size: int = max_size
+        self._lock: Lock = Lock()
+        # filename -> [size in bytes, last access time]
+        self._entries: dict[Filename, list[float]] = {}
+
+        makedirs(self._directory, exist_ok=True)
+
+        with self._lock_index():
+            self._entries = self._read_index()
+
+
+    @contextmanager
+    def _lock_index(self) -> Iterator[None]:
+        """
+        _lock_index
+
+        Locks the index against the other threads of this run and against the other runs sharing the store.
+
+        :return:
+        """
+
+        with self._lock, open(self._lock_filepath, "a") as lock_file:
+            if flock: flock(lock_file, LOCK_EX)
+
+            try:
+                yield
+            finally:
+                if flock: flock(lock_file, LOCK_UN)
+
+
+    def _read_index(self) -> dict[Filename, list[float]]:
+        """
+        _read_index
+
+        Reads the index of committed medias, an unreadable index just starts the store over.
+        The index must be locked.
+
+        :return: The entries of the index on disk.
+        """
+
+        try:
+            with open(self._index_filepath, "r") as f:
+                return load(f)
+        except FileNotFoundError:
+            return {}
+        except (JSONDecodeError, OSError) as e:
+            _print(f"Failed to load media cache index, starting it over: {e}{NEW_LINE}", True)
+
+            return {}
+
+
+    def _merge_index(self) -> None:
+        """
+        _merge_index
+
+        Merges the index on disk, as other runs left it, into the entries of this run,
+        keeping the latest access time of the medias known to both. The index must be locked.
+
+        :return:
+        """
+
+        for filename, (size, last_access_time) in self._read_index().items():
+            entry: list[float] | None = self._entries.get(filename)
+
+            if entry:
+                entry[1] = max(entry[1], last_access_time)
+            else:
+                self._entries[filename] = [size, last_access_time]
+
+
+    def _write_index(self) -> None:
+        """
+        _write_index
+
+        Writes the index of committed medias to disk, the index must be locked.
+
+        :return:
+        """
+
+        partial_index_filepath: Filepath = f"{self._index_filepath}.part"
+
+        with open(partial_index_filepath, "w") as f:
+            dump(self._entries, f)
+
+        replace(partial_index_filepath, self._index_filepath)
+
+
+    def get_filepath(
+        self,
+        video_identity: str,
+        start_timestamp: str,
+        end_timestamp: str,
+        media_format: str,
+        encode_settings: str
+    ) -> Filepath:
+        """
+        get_filepath
+
+        Gets the content addressed filepath of a media.
+
+        :param video_identity: Identity of the video the media is cut from.
+        :param start_timestamp: Start timestamp of the media.
+        :param end_timestamp: End timestamp of the media.
+        :param media_format: Media file format, like VIDEO_FORMAT, AUDIO_FORMAT or IMAGE_FORMAT.
+        :param encode_settings: Settings used to encode the media.
+        :return: Filepath of the media within the store.
+        """
+
+        digest: str = sha1(
+            f"{video_identity}|{start_timestamp}|{end_timestamp}|{media_format}|{encode_settings}".encode()
+        ).hexdigest()
+
+        return path.join(self._directory, f"{digest}{media_format}")
+
+
+    def contains(self, filepath: Filepath) -> bool:
+        """
+        contains
+
+        Tells whether the media is cached, marking it as recently used if it is.
+
+        :param filepath: Filepath of the media within the store.
+        :return: True if the media is cached.
+        """
+
+        filename: Filename = path.basename(filepath)
+
+        with self._lock:
+            entry: list[float] | None = self._entries.get(filename)
+
+            if not entry: return False
+
+            if not path.exists(filepath):
+                del self._entries[filename]
+
+                return False
+
+            entry[1] = time()
+
+        return True
+
+
+    def commit(self, filepath: Filepath) -> None:
+        """
+        commit
+
+        Records a newly encoded media into the store.
+
+        :param filepath: Filepath of the media within the store.
+        :return:
+        """
+
+        if not path.exists(filepath) or not path.getsize(filepath):
+            self.discard(filepath)
+
+            return
+
+        with self._lock:
+            self._entries[path.basename(filepath)] = [path.getsize(filepath), time()]
+
+
+    def discard(self, filepath: Filepath) -> None:
+        """
+        discard
+
+        Removes a media from the store, used for medias whose encoding failed or was interrupted.
+
+        :param filepath: Filepath of the media within the store.
+        :return:
+        """
+
+        with self._lock:
+            self._entries.pop(path.basename(filepath), None)
+
+        try:
+            remove(filepath)
+        except FileNotFoundError:
+            pass
+
+
+    def evict(self) -> None:
+        """
+        evict
+
+        Removes the uncommitted files old enough not to be cut by another run and,
+        while the store is bigger than its maximum size, the least recently used medias.
+        The index is written to disk along the way.
+
+        :return:
+        """
+
+        with self._lock_index():
+            self._merge_index()
+
+            # Medias removed by another run
+            self._entries = {
+                filename: entry for filename, entry in self._entries.items()
+                if path.exists(path.join(self._directory, filename))
+            }
+
+            for filename in listdir(self._directory):
+                if filename in (self._INDEX_FILENAME, self._LOCK_FILENAME) or filename in self._entries: continue
+
+                filepath: Filepath = path.join(self._directory, filename)
+
+                try:
+                    if time() - path.getmtime(filepath) < MEDIA_CACHE_UNCOMMITTED_GRACE_SECONDS: continue
+
+                    remove(filepath)
+                except FileNotFoundError:
+                    pass
+
+            total_size: float = sum(size for size, _ in self._entries.values())
+
+            for filename, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+                if total_size <= self._max_size: break
+
+                try:
+                    remove(path.join(self._directory, filename))
+                except FileNotFoundError:
+                    pass
+
+                del self._entries[filename]
+                total_size -= size
+
+            self._write_index()
+
+
+    def save(self) -> None:
+        """
+        save
+
+        Writes the index of committed medias to disk, along with the medias committed by other runs meanwhile.
+
+        :return:
+        """
+
+        with self._lock_index():
+            self._merge_index()
+            self._write_index()
+
+
+__all__: list[str] = ["MediaCache"]
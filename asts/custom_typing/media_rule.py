@@ -0,0 +1,98 @@
+from asts.custom_typing.dialogue_query import DialogueQuery
+from asts.custom_typing.dialogue_store import DialogueFlags, DialogueStore
+from asts.custom_typing.search_index import SearchIndex
+
+
+_MEDIA_RULE_FLAGS: dict[str, DialogueFlags] = {
+    "video": DialogueFlags.HAS_VIDEO,
+    "audio": DialogueFlags.HAS_AUDIO,
+    "image": DialogueFlags.HAS_IMAGE
+}
+
+
+class MediaRule:
+    def __init__(self, rule: str) -> None:
+        """
+        MediaRule
+
+        Rule selecting a media for every dialogue matching a query, written as the media followed by
+        the query, see DialogueQuery. A dash before the media clears it instead.
+
+            audio dur:1..8 -re:♪ -style:sign -style:song
+            image len:20..
+            -audio speaker:narrator
+
+        As with the check buttons, selecting a video clears the audio and image of a dialogue, and the other way round.
+
+        :param rule: Rule to be parsed.
+        :return:
+        """
+
+        media: str
+        query: str
+        media, _, query = rule.strip().partition(" ")
+
+        self._is_clearing: bool = media.startswith("-")
+        media = media.removeprefix("-").lower()
+
+        if media not in _MEDIA_RULE_FLAGS:
+            raise ValueError(f"Invalid rule {rule!r}, expected it to start with one of {', '.join(_MEDIA_RULE_FLAGS)}.")
+
+        self._flags: DialogueFlags = _MEDIA_RULE_FLAGS[media]
+        self._query: DialogueQuery = DialogueQuery(query)
+
+
+    @staticmethod
+    def parse_rules(rules: str) -> "list[MediaRule]":
+        """
+        parse_rules
+
+        Parses rules separated by semicolons.
+
+        :param rules: Rules to be parsed.
+        :return: List of rules, in the order they were written.
+        """
+
+        return [MediaRule(rule) for rule in rules.split(";") if rule.strip()]
+
+
+    def apply(
+        self,
+        dialogue_store: DialogueStore,
+        front_search_index: SearchIndex,
+        back_search_index: SearchIndex
+    ) -> int:
+        """
+        apply
+
+        Selects or clears the media of the dialogues matching the rule, all at once.
+
+        :param dialogue_store: Store of the front dialogues.
+        :param front_search_index: SearchIndex of the front dialogues.
+        :param back_search_index: SearchIndex of the back dialogues.
+        :return: Number of dialogues matching the rule.
+        """
+
+        indexes: list[int] = self._query.match(
+            range(len(dialogue_store)),
+            front_search_index,
+            back_search_index,
+            dialogue_store
+        )
+
+        dialogue_store.set_medias(self._flags, not self._is_clearing, indexes)
+
+        if self._is_clearing: return len(indexes)
+
+        dialogue_store.set_medias(
+            DialogueFlags.HAS_AUDIO | DialogueFlags.HAS_IMAGE
+            if self._flags == DialogueFlags.HAS_VIDEO
+            else DialogueFlags.HAS_VIDEO,
+            False,
+            indexes
+        )
+
+        return len(indexes)
+
+
+__all__: list[str] = ["MediaRule"]
@@ -0,0 +1,75 @@
+from subprocess import Popen
+from threading  import Lock
+
+
+class ProcessRegistry:
+    def __init__(self) -> None:
+        """
+        ProcessRegistry
+
+        Keeps track of the child processes running on behalf of a cards generator, the ffmpeg processes,
+        so they can all be killed at once when cancelling instead of running to completion.
+        Once killed, processes registered afterwards are killed right away.
+
+        :return:
+        """
+
+        self._lock: Lock = Lock()
+        self._processes: set[Popen[bytes]] = set()
+        self._is_killed: bool = False
+
+
+    def register(self, process: Popen[bytes]) -> bool:
+        """
+        register
+
+        Keeps track of a process while it runs.
+
+        :param process: Process just started.
+        :return: False if the processes were already killed, the process is then killed too.
+        """
+
+        with self._lock:
+            if self._is_killed:
+                process.kill()
+
+                return False
+
+            self._processes.add(process)
+
+        return True
+
+
+    def unregister(self, process: Popen[bytes]) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+
+    def is_killed(self) -> bool:
+        return self._is_killed
+
+
+    def kill_all(self) -> int:
+        """
+        kill_all
+
+        Kills every process still running, as well as the ones registered from now on.
+
+        :return: Number of processes killed.
+        """
+
+        number_killed: int = 0
+
+        with self._lock:
+            self._is_killed = True
+
+            for process in self._processes:
+                if process.poll() is not None: continue
+
+                process.kill()
+                number_killed += 1
+
+        return number_killed
+
+
+__all__: list[str] = ["ProcessRegistry"]
@@ -0,0 +1,172 @@
+from collections    import Counter
+from typing         import Iterable, Pattern
+
+from asts.utils.search_utils import fold_text, get_fuzzy_distance, get_trigrams, strip_markup
+
+
+class SearchIndex:
+    def __init__(self) -> None:
+        """
+        SearchIndex
+
+        Index of the dialogues searched from the CardsEditor, indexed as their list store.
+
+        The dialogues are kept as their displayed text, as is and folded by fold_text, along with
+        the dialogues each trigram of the folded text is found in. A search intersects the dialogues
+        of the trigrams of the query and only compares the text of the dialogues left.
+
+        :return:
+        """
+
+        self._texts: list[str] = []
+        self._folded_texts: list[str] = []
+        # trigram -> indexes of the dialogues it's found in
+        self._trigrams: dict[str, set[int]] = {}
+
+
+    def __len__(self) -> int:
+        return len(self._folded_texts)
+
+
+    def _index_trigrams(self, index: int) -> None:
+        for trigram in get_trigrams(self._folded_texts[index]):
+            self._trigrams.setdefault(trigram, set()).add(index)
+
+
+    def extend(self, dialogues: Iterable[str]) -> None:
+        """
+        extend
+
+        Indexes dialogues appended to the list store.
+
+        :param dialogues: Dialogues, in Pango markup.
+        :return:
+        """
+
+        first_index: int = len(self._folded_texts)
+
+        self._texts.extend(strip_markup(dialogue) for dialogue in dialogues)
+        self._folded_texts.extend(fold_text(text) for text in self._texts[first_index:])
+
+        for index in range(first_index, len(self._folded_texts)):
+            self._index_trigrams(index)
+
+
+    def update(self, index: int, dialogue: str) -> None:
+        """
+        update
+
+        Indexes a dialogue again after it's been edited.
+
+        :param index: Index of the dialogue.
+        :param dialogue: Dialogue, in Pango markup.
+        :return:
+        """
+
+        text: str = strip_markup(dialogue)
+        folded_text: str = fold_text(text)
+
+        self._texts[index] = text
+
+        if folded_text == self._folded_texts[index]: return
+
+        for trigram in get_trigrams(self._folded_texts[index]):
+            self._trigrams[trigram].discard(index)
+
+        self._folded_texts[index] = folded_text
+        self._index_trigrams(index)
+
+
+    def get_text(self, index: int) -> str:
+        return self._texts[index]
+
+
+    def get_folded_text(self, index: int) -> str:
+        return self._folded_texts[index]
+
+
+    def search(self, query: str, candidates: Iterable[int] | None = None) -> list[int]:
+        """
+        search
+
+        Searches the dialogues containing the query, as they're displayed and folded.
+
+        :param query: Text to be searched.
+        :param candidates: (Optional) indexes of the dialogues to be searched, sorted, defaults to all of them.
+        :return: Sorted indexes of the dialogues containing the query.
+        """
+
+        folded_query: str = fold_text(query)
+        trigrams: set[str] = get_trigrams(folded_query)
+
+        if trigrams:
+            # Starting from the rarest trigram keeps every intersection small
+            postings: list[set[int]] = sorted(
+                (self._trigrams.get(trigram, set()) for trigram in trigrams),
+                key=len
+            )
+            indexes: set[int] = postings[0].intersection(*postings[1:])
+            candidates = sorted(indexes) if candidates is None else [
+                index for index in candidates if index in indexes
+            ]
+        elif candidates is None:
+            candidates = range(len(self._folded_texts))
+
+        if not folded_query: return list(candidates)
+
+        return [index for index in candidates if folded_query in self._folded_texts[index]]
+
+
+    def search_regex(self, pattern: Pattern[str], candidates: Iterable[int] | None = None) -> list[int]:
+        """
+        search_regex
+
+        Searches the dialogues matching a regular expression, as they're displayed.
+
+        :param pattern: Compiled regular expression.
+        :param candidates: (Optional) indexes of the dialogues to be searched, sorted, defaults to all of them.
+        :return: Sorted indexes of the dialogues matching the regular expression.
+        """
+
+        if candidates is None: candidates = range(len(self._texts))
+
+        return [index for index in candidates if pattern.search(self._texts[index])]
+
+
+    def search_fuzzy(self, query: str, max_distance: int, candidates: Iterable[int] | None = None) -> list[int]:
+        """
+        search_fuzzy
+
+        Searches the dialogues containing the query, as they're displayed and folded,
+        with up to max_distance characters inserted, deleted or replaced.
+
+        A single edit changes at most three trigrams, so when the query has enough of them
+        only the dialogues sharing the rest are compared.
+
+        :param query: Text to be searched.
+        :param max_distance: Largest number of edits.
+        :param candidates: (Optional) indexes of the dialogues to be searched, sorted, defaults to all of them.
+        :return: Sorted indexes of the dialogues containing the query within max_distance edits.
+        """
+
+        folded_query: str = fold_text(query)
+        trigrams: set[str] = get_trigrams(folded_query)
+        min_shared_trigrams: int = len(trigrams) - 3 * max_distance
+
+        if candidates is None: candidates = range(len(self._folded_texts))
+
+        if min_shared_trigrams > 0:
+            shared_trigrams: Counter[int] = Counter()
+
+            for trigram in trigrams:
+                shared_trigrams.update(self._trigrams.get(trigram, ()))
+
+            candidates = [index for index in candidates if shared_trigrams[index] >= min_shared_trigrams]
+
+        return [
+            index for index in candidates
+            if get_fuzzy_distance(folded_query, self._folded_texts[index]) <= max_distance
+        ]
+
+
+__all__: list[str] = ["SearchIndex"]
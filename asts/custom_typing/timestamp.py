@@ -1,5 +1,6 @@
 from re import Match
 
+from asts.utils.core_utils import milliseconds_to_timestamp
 from asts.custom_typing.globals import REGEX_TIMESTAMP_PATTERN
 from asts.custom_typing.aliases import StrTimestamp
 
@@ -7,27 +8,37 @@ from asts.custom_typing.aliases import StrTimestamp
 class Timestamp:
     _DEFAULT_TIMESTAMP: StrTimestamp = "00:00:00.000"
 
-    def __init__(self, timestamp: "StrTimestamp | Timestamp" = _DEFAULT_TIMESTAMP) -> None:
+    def __init__(self, timestamp: "StrTimestamp | Timestamp | int" = _DEFAULT_TIMESTAMP) -> None:
         """
         A class to represent a timestamp in the format HH:MM:SS.sss.
 
+        The timestamp is held as an integer number of milliseconds,
+        the string representation is only built when it's asked for.
+
         If internally the timestamp fails to be parsed the old value it was holding will be used,
         if the object is new and there is no privously timestamp the _DEFAULT_TIMESTAMP timestamp will be used.
 
-        :param timestamp: A timestamp object or a string in the format HH:MM:SS.sss.
+        :param timestamp: A timestamp object, a string in the format HH:MM:SS.sss or a number of milliseconds.
         "return"
         """
 
-        self._timestamp: StrTimestamp
+        self._milliseconds: int = 0
+        # Cache of the string representation, built on demand
+        self._timestamp: StrTimestamp | None = None
 
         if isinstance(timestamp, Timestamp):
-            self._timestamp = timestamp.timestamp
+            self._milliseconds = timestamp.milliseconds
+        elif isinstance(timestamp, int):
+            self.milliseconds = timestamp
         else:
-            self._timestamp = self._parseTimestampInternal(timestamp)
+            self._milliseconds = self._parseTimestampInternal(timestamp)
 
 
     @property
     def timestamp(self) -> StrTimestamp:
+        if self._timestamp is None:
+            self._timestamp = milliseconds_to_timestamp(self._milliseconds)
+
         return self._timestamp
 
 
@@ -35,36 +46,56 @@ class Timestamp:
     def timestamp(self, value: StrTimestamp = _DEFAULT_TIMESTAMP) -> None:
         if value == self.timestamp: return
 
-        self._timestamp = self._parseTimestampInternal(value)
+        self.milliseconds = self._parseTimestampInternal(value)
+
+
+    @property
+    def milliseconds(self) -> int:
+        return self._milliseconds
+
+
+    @milliseconds.setter
+    def milliseconds(self, value: int) -> None:
+        value = max(0, value)
+
+        if value == self._milliseconds: return
 
+        self._milliseconds = value
+        self._timestamp = None
 
-    def _parseTimestampInternal(self, timestamp: StrTimestamp | None = None) -> StrTimestamp:
+
+    @property
+    def seconds(self) -> float:
+        return self._milliseconds / 1000
+
+
+    def _parseTimestampInternal(self, timestamp: StrTimestamp | None = None) -> int:
         """
         _parseTimestampInternal
 
         Try to parse the string as a timestamp in the format HH:MM:SS.sss.
 
         :param timestamp: Strin to be parsed.
-        :return: The parsed timestamp or _DEFAULT_TIMESTAMP in case of fail.
+        :return: The parsed number of milliseconds or the current one in case of fail.
         """
 
-        result: StrTimestamp | None = self._parseTimestamp(timestamp) if timestamp else None
+        result: int | None = self._parseTimestamp(timestamp) if timestamp else None
 
-        if not result:
-            return (self._timestamp if hasattr(self, "_timestamp") else self._DEFAULT_TIMESTAMP)
+        if result is None:
+            return self._milliseconds
 
         return result
 
 
     @classmethod
-    def _parseTimestamp(cls, timestamp: StrTimestamp) -> StrTimestamp | None:
+    def _parseTimestamp(cls, timestamp: StrTimestamp) -> int | None:
         """
         _parseTimestamp
 
         Try to parse the string as a timestamp in the format HH:MM:SS.sss.
 
         :param timestamp: Strin to be parsed.
-        :return: The parsed timestamp or None in case of fail.
+        :return: The parsed number of milliseconds or None in case of fail.
         """
 
         result: Match[StrTimestamp] | None = REGEX_TIMESTAMP_PATTERN.match(timestamp) if timestamp else None
@@ -72,8 +103,13 @@ class Timestamp:
         if not result:
             return
 
-        return result.group().replace(",", ".")
+        hours: str
+        minutes: str
+        seconds: str
+        milliseconds: str
+        hours, minutes, seconds, milliseconds = result.groups()
 
+        return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(milliseconds)
 
-__all__: list[str] = ["Timestamp"]
 
+__all__: list[str] = ["Timestamp"]
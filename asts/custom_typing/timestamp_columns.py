@@ -0,0 +1,76 @@
+from array      import array
+from bisect     import bisect_left, bisect_right
+from typing     import Iterable
+
+
+class TimestampColumns:
+    def __init__(self, starts: Iterable[int] = (), ends: Iterable[int] = ()) -> None:
+        """
+        TimestampColumns
+
+        Start and end timestamps of a list of dialogues, in milliseconds,
+        kept as two contiguous integer columns indexed as the dialogues.
+
+        Comparisons are done on plain integers, nothing is parsed,
+        and as long as the starts are sorted the range queries are binary searches.
+
+        :param starts: Start of each dialogue, in milliseconds.
+        :param ends: End of each dialogue, in milliseconds.
+        :return:
+        """
+
+        self._starts: array[int] = array("q", starts)
+        self._ends: array[int] = array("q", ends)
+
+        if len(self._starts) != len(self._ends):
+            raise ValueError(
+                f"Expected as many ends as starts, but got {len(self._ends)} ends for {len(self._starts)} starts."
+            )
+
+        self._is_sorted: bool = all(
+            previous_start <= start for previous_start, start in zip(self._starts, self._starts[1:])
+        )
+
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+
+    def get_starts(self) -> "array[int]":
+        return self._starts
+
+
+    def get_ends(self) -> "array[int]":
+        return self._ends
+
+
+    def get_start(self, index: int) -> int:
+        return self._starts[index]
+
+
+    def get_end(self, index: int) -> int:
+        return self._ends[index]
+
+
+    def is_sorted(self) -> bool:
+        return self._is_sorted
+
+
+    def find_starting_within(self, start: int, end: int) -> range:
+        """
+        find_starting_within
+
+        Finds the dialogues starting within the range, the starts must be sorted.
+
+        :param start: Start of the range, in milliseconds.
+        :param end: End of the range, in milliseconds, inclusive.
+        :return: Range of indexes of the dialogues.
+        """
+
+        if not self._is_sorted:
+            raise ValueError("The starts must be sorted to be searched.")
+
+        return range(bisect_left(self._starts, start), bisect_right(self._starts, end))
+
+
+__all__: list[str] = ["TimestampColumns"]
@@ -30,7 +30,7 @@ class TimestampFieldInfoIndex(Enum):
 class TimestampFieldInfo(Object):
     def __init__(
         self,
-        timestamp: Timestamp | StrTimestamp = Timestamp(),
+        timestamp: Timestamp | StrTimestamp | int = Timestamp._DEFAULT_TIMESTAMP,
         glib_source_id: GlibSourceID = 0
     ) -> None:
         """
@@ -42,14 +42,15 @@ class TimestampFieldInfo(Object):
         The glib_source_id is mainly used to keep track of the glib_source_id of Glib.Source added by timeout_add,
         the timeout_add is used to tell wether or not the timestamp field is being edited.
 
-        :param timestamp: (Optional) timestamp in the format HH:MM:SS.sss, ex 00:03:23.482.
+        :param timestamp: (Optional) timestamp in the format HH:MM:SS.sss, ex 00:03:23.482, or in milliseconds.
         :param glib_source_id: (Optional) GLib.Source.glib_source_id.
         :return:
         """
 
         super().__init__()
 
-        self._timestamp: Timestamp = timestamp if isinstance(timestamp, Timestamp) else Timestamp(timestamp)
+        # Always a copy, the field is edited in place and mustn't be shared
+        self._timestamp: Timestamp = Timestamp(timestamp)
         self._glib_source_id: GlibSourceID = glib_source_id
 
 
@@ -71,10 +72,10 @@ class TimestampFieldInfo(Object):
 
         if value == self._timestamp.timestamp: return
 
-        self.notify("timestamp")
-
         self._timestamp.timestamp = value
 
+        self.notify("timestamp")
+
 
     @Property(type=GlibSourceID, default=0)
     def glib_source_id(self) -> GlibSourceID:
@@ -169,7 +170,7 @@ class TimestampFieldInfo(Object):
         """
 
         if isinstance(value, Timestamp):
-            self._timestamp.timestamp = value.timestamp
+            self._timestamp.milliseconds = value.milliseconds
 
             self.notify("timestamp")
 
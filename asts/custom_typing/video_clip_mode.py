@@ -0,0 +1,36 @@
+from enum import Enum
+
+from asts.custom_typing.globals import VIDEO_ENCODE_SETTINGS
+
+
+class VideoClipMode(Enum):
+    """
+    VideoClipMode
+
+    How the video clips of the cards are cut.
+    REENCODE: The clips are decoded and encoded again, scaled down to VIDEO_SCALE_WIDTH.
+    COPY: The clips are stream copied at the video resolution, their start is moved back
+          to the keyframe before it, when there is one close enough, see KEYFRAME_SNAP_MAX_SECONDS.
+    SMART: Only the head of the clips, up to their first keyframe, is encoded and the rest is stream copied.
+    """
+
+    REENCODE    = "reencode"
+    COPY        = "copy"
+    SMART       = "smart"
+
+
+    def get_encode_settings(self) -> str:
+        """
+        get_encode_settings
+
+        Gets the settings the clips are encoded with, the clips of each mode being kept apart in the media cache.
+
+        :return: The encode settings.
+        """
+
+        if self == VideoClipMode.REENCODE: return VIDEO_ENCODE_SETTINGS
+
+        return f"vcodec={self.value}"
+
+
+__all__: list[str] = ["VideoClipMode"]
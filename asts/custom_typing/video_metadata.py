@@ -0,0 +1,265 @@
+from bisect     import bisect_right
+from fractions  import Fraction
+from ffmpeg     import probe
+from ffmpeg     import Error as FFMPEGError
+from json       import dump, load, JSONDecodeError
+from os         import makedirs, path, replace
+from threading  import Lock
+from typing     import Any, NamedTuple
+
+from asts.utils.core_utils import _print, get_file_identity
+from asts.custom_typing.aliases import Filepath
+from asts.custom_typing.globals import CACHE_VIDEO_METADATA_DIR
+
+
+class AudioLayout(NamedTuple):
+    channels: int
+    sample_rate: int
+    channel_layout: str | None
+
+
+class VideoMetadata:
+    def __init__(self, video_filepath: Filepath) -> None:
+        """
+        VideoMetadata
+
+        Probes a video once and keeps what ffprobe tells about it under CACHE_VIDEO_METADATA_DIR,
+        its format, the table of its streams and, once they're asked for, the keyframes of its video stream.
+
+        The streams are read from the headers of the video, while the keyframes need to read every packet
+        of the video stream, nothing is decoded either way. The metadata is keyed by the video file identity,
+        so it's reused across sessions as long as the video file isn't modified.
+
+        :param video_filepath: Path to the video to be probed.
+        :return:
+        """
+
+        self._video_filepath: Filepath = video_filepath
+        self._metadata_filepath: Filepath = path.join(
+            CACHE_VIDEO_METADATA_DIR,
+            f"{get_file_identity(video_filepath)}.json"
+        )
+        self._lock: Lock = Lock()
+        # format -> ffprobe format, streams -> ffprobe streams,
+        # keyframes -> sorted times in seconds from the start of the video, as ffmpeg seeks them
+        self._metadata: dict[str, Any] | None = None
+
+
+    def _probe(self, **kwargs: str) -> dict[str, Any] | None:
+        """
+        _probe
+
+        Runs ffprobe over the video.
+
+        :param kwargs: Options of ffprobe.
+        :return: What ffprobe printed, None if the video couldn't be probed.
+        """
+
+        try:
+            return probe(self._video_filepath, loglevel="quiet", **kwargs)
+        except FFMPEGError as e:
+            _print(f"Error running ffmpeg probe on {self._video_filepath}: {e.stderr.decode() if e.stderr else e}", True)
+
+            return None
+
+
+    def _save(self) -> None:
+        """
+        _save
+
+        Writes the metadata to the cache, the lock must be held.
+
+        The metadata is first written to a temporary file and then moved in place,
+        so an interrupted write never leaves truncated metadata behind.
+
+        :return:
+        """
+
+        partial_filepath: Filepath = f"{self._metadata_filepath}.part"
+
+        makedirs(CACHE_VIDEO_METADATA_DIR, exist_ok=True)
+
+        with open(partial_filepath, "w") as f:
+            dump(self._metadata, f)
+
+        replace(partial_filepath, self._metadata_filepath)
+
+
+    def _load(self) -> dict[str, Any]:
+        """
+        _load
+
+        Loads the metadata from the cache, probing the video if it isn't cached yet, the lock must be held.
+
+        :return: The metadata, empty if the video couldn't be probed.
+        """
+
+        if self._metadata is not None: return self._metadata
+
+        try:
+            with open(self._metadata_filepath, "r") as f:
+                self._metadata = load(f)
+
+                return self._metadata
+        except FileNotFoundError:
+            pass
+        except (JSONDecodeError, OSError) as e:
+            _print(f"Failed to load the metadata of {self._video_filepath}, probing it again: {e}", True)
+
+        probe_result: dict[str, Any] | None = self._probe()
+
+        # Not cached, the video is probed again next time
+        if probe_result is None: return {}
+
+        self._metadata = {"format": probe_result.get("format", {}), "streams": probe_result.get("streams", [])}
+        self._save()
+
+        return self._metadata
+
+
+    def get_streams(self, codec_type: str | None = None) -> list[dict[str, Any]]:
+        """
+        get_streams
+
+        Gets the streams of the video, as ffprobe describes them.
+
+        :param codec_type: (Optional) type of the streams, like "video", "audio" or "subtitle", all of them otherwise.
+        :return: The streams, in the order of the video.
+        """
+
+        with self._lock:
+            streams: list[dict[str, Any]] = self._load().get("streams", [])
+
+        return [stream for stream in streams if not codec_type or stream.get("codec_type") == codec_type]
+
+
+    def get_video_stream(self) -> dict[str, Any] | None:
+        """
+        get_video_stream
+
+        Gets the video stream of the video, cover arts attached as a video stream left out.
+
+        :return: The first video stream, None if there is none.
+        """
+
+        return next(
+            (
+                stream for stream in self.get_streams("video")
+                if not stream.get("disposition", {}).get("attached_pic")
+            ),
+            None
+        )
+
+
+    def get_audio_layout(self) -> AudioLayout | None:
+        """
+        get_audio_layout
+
+        Gets the layout of the audio stream of the video.
+
+        :return: The number of channels, sample rate and channel layout of the first audio stream,
+                 None if there is none.
+        """
+
+        audio_streams: list[dict[str, Any]] = self.get_streams("audio")
+
+        if not audio_streams: return None
+
+        return AudioLayout(
+            int(audio_streams[0].get("channels", 0)),
+            int(audio_streams[0].get("sample_rate", 0)),
+            audio_streams[0].get("channel_layout")
+        )
+
+
+    def prepare_keyframes(self) -> bool:
+        """
+        prepare_keyframes
+
+        Indexes the keyframes of the video stream if they aren't cached yet, reading the flags of its packets.
+
+        The times of the keyframes are worked out from their integer timestamps, and made relative to
+        the start time of the video, since that's what the times given to ffmpeg to seek are relative to.
+        Videos such as MPEG-TS recordings or MP4s with B-frames don't start at 0.
+
+        :return: True if there is some keyframe to cut the clips from.
+        """
+
+        with self._lock:
+            metadata: dict[str, Any] = self._load()
+
+            if not metadata: return False
+
+            if "keyframes" not in metadata:
+                probe_result: dict[str, Any] | None = self._probe(
+                    select_streams="V:0",
+                    show_entries="packet=pts,flags:stream=time_base"
+                )
+
+                if probe_result is None or not probe_result.get("streams"): return False
+
+                time_base: Fraction = Fraction(probe_result["streams"][0].get("time_base", "1/1"))
+                start_time: str = metadata.get("format", {}).get("start_time", "0")
+                start: Fraction = Fraction(start_time) if start_time != "N/A" else Fraction(0)
+
+                metadata["keyframes"] = sorted(
+                    float(int(packet["pts"]) * time_base - start)
+                    for packet in probe_result.get("packets") or []
+                    if "K" in packet.get("flags", "") and packet.get("pts", "N/A") != "N/A"
+                )
+                self._save()
+
+            return bool(metadata["keyframes"])
+
+
+    def _get_keyframes(self) -> list[float]:
+        with self._lock:
+            return self._load().get("keyframes", [])
+
+
+    def get_codec_name(self) -> str | None:
+        video_stream: dict[str, Any] | None = self.get_video_stream()
+
+        return video_stream.get("codec_name") if video_stream else None
+
+
+    def get_pix_fmt(self) -> str | None:
+        video_stream: dict[str, Any] | None = self.get_video_stream()
+
+        return video_stream.get("pix_fmt") if video_stream else None
+
+
+    def get_keyframe_before(self, seconds: float) -> float | None:
+        """
+        get_keyframe_before
+
+        Gets the last keyframe at or before a time, where a stream copy starting at that time really starts.
+        The keyframes must be prepared.
+
+        :param seconds: Time in seconds.
+        :return: Time in seconds of the keyframe, None if there is none.
+        """
+
+        keyframes: list[float] = self._get_keyframes()
+        position: int = bisect_right(keyframes, seconds)
+
+        return keyframes[position - 1] if position else None
+
+
+    def get_keyframe_after(self, seconds: float) -> float | None:
+        """
+        get_keyframe_after
+
+        Gets the first keyframe strictly after a time. The keyframes must be prepared.
+
+        :param seconds: Time in seconds.
+        :return: Time in seconds of the keyframe, None if there is none.
+        """
+
+        keyframes: list[float] = self._get_keyframes()
+        position: int = bisect_right(keyframes, seconds)
+
+        return keyframes[position] if position < len(keyframes) else None
+
+
+__all__: list[str] = ["AudioLayout", "VideoMetadata"]
@@ -0,0 +1,121 @@
+from array      import array
+from ffmpeg     import input as FFMPEGInput
+from ffmpeg     import Error as FFMPEGError
+from os         import makedirs, path, replace
+from sys        import byteorder
+
+from asts.utils.core_utils import _print, get_file_identity
+from asts.utils.sync_utils import detect_voice_activity
+from asts.custom_typing.aliases import Filepath
+from asts.custom_typing.globals import CACHE_VOICE_ACTIVITY_DIR, VOICE_ACTIVITY_FRAME_MS
+
+
+class VoiceActivityCache:
+    # The voice band is filtered at this rate before being squared, decoding is what takes the longest
+    _ANALYSIS_SAMPLE_RATE: int = 8000
+    _VOICE_BAND_LOW_FREQUENCY: int = 300
+    _VOICE_BAND_HIGH_FREQUENCY: int = 3400
+
+    def __init__(self, video_filepath: Filepath) -> None:
+        """
+        VoiceActivityCache
+
+        Computes once which frames of the audio of a video are voiced and keeps them under CACHE_VOICE_ACTIVITY_DIR,
+        one byte for each frame of VOICE_ACTIVITY_FRAME_MS.
+
+        The envelope is keyed by the video file identity, so it's reused across sessions
+        as long as the video file isn't modified.
+
+        :param video_filepath: Path to the video whose voice activity should be detected.
+        :return:
+        """
+
+        self._video_filepath: Filepath = video_filepath
+        self._voice_activity_filepath: Filepath = path.join(
+            CACHE_VOICE_ACTIVITY_DIR,
+            f"{get_file_identity(video_filepath)}.{VOICE_ACTIVITY_FRAME_MS}ms"
+        )
+
+
+    def _compute_powers(self) -> "array[float] | None":
+        """
+        _compute_powers
+
+        Decodes the audio of the video down to the mean power of its voice band for each frame.
+
+        The audio is downmixed, band-passed and squared by ffmpeg, resampling it to one sample
+        per frame then averages the power of each frame.
+
+        :return: Power of each frame, None if the audio couldn't be decoded.
+        """
+
+        try:
+            stdout: bytes
+            stdout, _ = FFMPEGInput(self._video_filepath).audio.filter(
+                "aresample", self._ANALYSIS_SAMPLE_RATE
+            ).filter(
+                "aformat", channel_layouts="mono"
+            ).filter(
+                "highpass", f=self._VOICE_BAND_LOW_FREQUENCY
+            ).filter(
+                "lowpass", f=self._VOICE_BAND_HIGH_FREQUENCY
+            ).filter(
+                "aeval", "val(0)*val(0)"
+            ).output(
+                "pipe:",
+                format="f32le",
+                acodec="pcm_f32le",
+                ar=1000 // VOICE_ACTIVITY_FRAME_MS
+            ).global_args(
+                "-nostdin",
+                "-loglevel",
+                "error"
+            ).run(capture_stdout=True, capture_stderr=True)
+        except FFMPEGError as e:
+            _print(f"Error decoding the audio of {self._video_filepath}: {e.stderr.decode() if e.stderr else e}", True)
+
+            return None
+
+        powers: array[float] = array("f")
+
+        powers.frombytes(stdout[:len(stdout) - len(stdout) % powers.itemsize])
+
+        if byteorder != "little": powers.byteswap()
+
+        return powers
+
+
+    def get_voice_activity(self) -> bytearray | None:
+        """
+        get_voice_activity
+
+        Gets the voice activity of the video, detecting it if it isn't cached yet.
+
+        The activity is first written to a temporary file and then moved in place,
+        so an interrupted write never leaves a truncated envelope behind.
+
+        :return: One byte per frame, 1 if it's voiced, 0 otherwise, None if the audio couldn't be decoded.
+        """
+
+        if path.exists(self._voice_activity_filepath):
+            with open(self._voice_activity_filepath, "rb") as f:
+                return bytearray(f.read())
+
+        powers: array[float] | None = self._compute_powers()
+
+        if powers is None: return None
+
+        voice_activity: bytearray = detect_voice_activity(powers)
+        partial_filepath: Filepath = f"{self._voice_activity_filepath}.part"
+
+        makedirs(CACHE_VOICE_ACTIVITY_DIR, exist_ok=True)
+
+        with open(partial_filepath, "wb") as f:
+            f.write(voice_activity)
+
+        replace(partial_filepath, self._voice_activity_filepath)
+
+        return voice_activity
+
+
+__all__: list[str] = ["VoiceActivityCache"]
@@ -6,8 +6,7 @@ require_version(*GLIB_VERSION)
 require_version(*GOBJECT_VERSION)
 from gi.repository.Gtk import (
     Align, Application, Box, Button, ColorDialog, ColumnView,
-    ColumnViewColumn, CustomFilter, FilterChange, FilterListModel,
-    Frame, Grid, INVALID_LIST_POSITION, ListItem, ListScrollFlags,
+    ColumnViewColumn, Entry, FilterChange, Frame, Grid, INVALID_LIST_POSITION, ListItem, ListScrollFlags,
     Image, Orientation, ProgressBar, ScrolledWindow,
     SearchEntry, Separator, SignalListItemFactory,
     SingleSelection,  StyleContext, STYLE_PROVIDER_PRIORITY_APPLICATION,
@@ -20,19 +19,21 @@ from gi.repository.GLib     import idle_add, timeout_add
 from gi.repository.Pango    import Style, Underline, Weight
 from gi.repository.GObject  import ParamSpec, BindingFlags
 
-from concurrent.futures import Future
-from typing             import cast, Literal, Iterator
+from threading          import Event, Thread
+from typing             import cast, Iterable, Literal
 from os                 import path
 
 from asts.custom_typing.globals import (
     DISPLAY_HEIGHT, DISPLAY_WIDTH,
     ICONS_SYMBOLIC_DIRECTORY
 )
-from asts.utils.core_utils import is_timestamp_within, handle_exception_if_any, NEW_LINE
+from asts.utils.core_utils import handle_exception_if_any
 from asts.utils.extra_utils import (
-    extract_all_dialogues, get_tagged_text_from_text_buffer,
+    create_dialogues_chunks, get_tagged_text_from_text_buffer, DialoguesChunk,
     set_widget_margin, apply_tagged_text_to_text_buffer
 )
+from asts.utils.subtitles_utils import parse_subtitles, SubtitleCue
+from asts.utils.search_utils import fold_text
 from asts.custom_typing.aliases import (
     Filepath, OptionalFilepath, SelectionBounds, StrTimestamp
 )
@@ -40,10 +41,15 @@ from asts.custom_typing.timestamp_field_info import TimestampFieldInfoIndex
 from asts.custom_typing.dialogue_info import DialogueInfo, DialogueInfoIndex
 from asts.custom_typing.rgba import RGBA
 from asts.custom_typing.row_selection import RowSelection
-from asts.custom_typing.typed_list_store import TypedListStore
+from asts.custom_typing.dialogue_store import DialogueFlags, DialogueStore
+from asts.custom_typing.dialogue_filter_model import DialogueFilterModel
+from asts.custom_typing.search_index import SearchIndex
+from asts.custom_typing.dialogue_query import DialogueQuery
+from asts.custom_typing.media_rule import MediaRule
 from asts.custom_typing.css_manager import CssManager
 from asts.custom_typing.cards_editor_states import CardsEditorState, CardsEditorStates
 from asts.cards_generator.cards_generator import CardsGenerator
+from asts.cards_generator.progress_aggregator import ProgressSnapshot
 from asts.interface.warning_dialog import WarningDialog
 from asts.custom_typing.entry_wrapper import EntryWrapper
 from asts.custom_typing.check_button_wrapper import CheckButtonWrapper
@@ -87,11 +93,16 @@ class CardsEditor(Window):
         self._subtitles_filepath: Filepath                      = subtitles_filepath
         self._optional_subtitles_filepath: OptionalFilepath     = optional_subtitles_filepath
         self._deck_name: str                                    = deck_name
-        self._number_medias_toggled: int = 0
         self._front_field_text_buffer: TextBufferWrapper
         self._back_field_text_buffer: TextBufferWrapper
-        self._front_field_list_store: TypedListStore[DialogueInfo]
-        self._back_field_list_store: TypedListStore[DialogueInfo]
+        self._front_field_list_store: DialogueStore
+        self._back_field_list_store: DialogueStore
+        self._search_index: SearchIndex
+        self._back_search_index: SearchIndex
+        self._search_query: DialogueQuery = DialogueQuery("")
+        self._dialogue_filter_model: DialogueFilterModel
+        # folded search term the dialogues were last filtered by, None if the search had more than text
+        self._previous_search_term: str | None = ""
         self._dialogues_columnview: ColumnView
         self._selected_row: SingleSelection
         self._row_selection: RowSelection
@@ -99,8 +110,17 @@ class CardsEditor(Window):
         self._progress_bar: ProgressBar
         self._cancel_button: Button
         self._generate_button: Button
+        self._all_videos_check_button: CheckButtonWrapper
+        self._all_audios_check_button: CheckButtonWrapper
+        self._all_images_check_button: CheckButtonWrapper
+        # Insensitive while the dialogues are loaded, the rules would miss the dialogues still to come
+        self._media_rules_frame: Frame
+        self._are_dialogues_loaded: bool = False
+        # Set when the window closes, the loading thread stops sending chunks
+        self._dialogues_loading_stopped: Event = Event()
         self._cards_editor_state: CardsEditorState = CardsEditorState()
-        self._futures_list: list[Future[None]] = []
+        # Set from the click on the generate button until the cards generator is done
+        self._is_generating: bool = False
 
         self.set_resizable(False)
         self.set_modal(True)
@@ -183,78 +203,145 @@ class CardsEditor(Window):
         """
         _populate_list_store
 
-        Fills both list store (front and back) with subtitles.
+        Creates both list stores (front and back) and starts filling them with subtitles in a thread,
+        the window is shown right away and the dialogues appear as they're loaded.
 
         :return:
         """
 
-        self._front_field_list_store = TypedListStore(DialogueInfo)
-        self._back_field_list_store = TypedListStore(DialogueInfo)
-        dialogues_list: list[DialogueInfo] = extract_all_dialogues(self._subtitles_filepath)
-        opt_dialogues_list: list[DialogueInfo] = extract_all_dialogues(self._optional_subtitles_filepath)
+        self._front_field_list_store = DialogueStore()
+        self._back_field_list_store = DialogueStore()
+        self._search_index = SearchIndex()
+        self._back_search_index = SearchIndex()
 
-        for dialogue in dialogues_list:
-            self._front_field_list_store.append(dialogue)
+        self._front_field_list_store.connect("notify::n-with-medias", self._update_generate_button_sensitive)
+        self.connect("close-request", self._on_close_request)
+        Thread(target=self._load_dialogues, daemon=True).start()
 
-        DialogueInfo.reset()
 
-        # the subtitles and its respective translations
-        # may or may not be of same lenght
-        # in that case fill the list with dummy values
-        dialogues_iter: Iterator[DialogueInfo] = dialogues_list.__iter__()
-        optional_dialogues_iter: Iterator[DialogueInfo] = opt_dialogues_list.__iter__()
-        dialogue_info: DialogueInfo | None = next(dialogues_iter, None)
-        opt_dialogue_info: DialogueInfo | None = next(optional_dialogues_iter, None)
-        optional_dialogue_info: DialogueInfo = DialogueInfo()
+    def _on_close_request(self, _: Window) -> bool:
+        """
+        _on_close_request
 
-        while True:
-            if not dialogue_info: break
+        Handles the close-request signal, stopping the loading of the dialogues.
 
-            if not opt_dialogue_info:
-                self._back_field_list_store.append(DialogueInfo())
-                dialogue_info = next(dialogues_iter, None)
+        :param window: Window which emitted the signal.
+        :return: False to let the window be closed.
+        """
 
-                continue
+        self._dialogues_loading_stopped.set()
 
-            start_timestamp: StrTimestamp
-            end_timestamp: StrTimestamp
-            optional_start_timestamp: StrTimestamp
-            optional_end_timestamp: StrTimestamp
+        return False
 
-            start_timestamp = (
-                dialogue_info[DialogueInfoIndex.START_TIMESTAMP_FIELD_INFO]
-                [TimestampFieldInfoIndex.TIMESTAMP]
-            )
-            end_timestamp = (
-                dialogue_info[DialogueInfoIndex.END_TIMESTAMP_FIELD_INFO]
-                [TimestampFieldInfoIndex.TIMESTAMP]
-            )
-            optional_start_timestamp = (
-                opt_dialogue_info[DialogueInfoIndex.START_TIMESTAMP_FIELD_INFO]
-                [TimestampFieldInfoIndex.TIMESTAMP]
+
+    def _load_dialogues(self) -> None:
+        """
+        _load_dialogues
+
+        Parses the subtitles and sends their dialogues to the main thread a chunk at a time.
+        Unreadable or malformed subtitles, like ones that aren't UTF-8, are warned about instead.
+
+        :return:
+        """
+
+        try:
+            subtitle_cues: list[SubtitleCue] = list(parse_subtitles(self._subtitles_filepath))
+            opt_subtitle_cues: list[SubtitleCue] = (
+                list(parse_subtitles(self._optional_subtitles_filepath))
+                if self._optional_subtitles_filepath
+                else []
             )
-            optional_end_timestamp = (
-                opt_dialogue_info[DialogueInfoIndex.END_TIMESTAMP_FIELD_INFO]
-                [TimestampFieldInfoIndex.TIMESTAMP]
+
+            for dialogues_chunk in create_dialogues_chunks(subtitle_cues, opt_subtitle_cues):
+                if self._dialogues_loading_stopped.is_set(): return
+
+                idle_add(self._extend_list_stores, dialogues_chunk)
+        except (OSError, ValueError) as e:
+            idle_add(self._on_dialogues_loading_failed, f"Failed to read the subtitles: {e}")
+            return
+
+        idle_add(self._on_dialogues_loaded)
+
+
+    def _extend_list_stores(self, dialogues_chunk: DialoguesChunk) -> bool:
+        """
+        _extend_list_stores
+
+        Appends a chunk of dialogues to both list stores,
+        the medias selected through the select all check buttons are selected for them too.
+
+        :param dialogues_chunk: Chunk of dialogues.
+        :return: False to remove this callback from the list of
+                 event sources and to not be called again.
+        """
+
+        first_index: int = len(self._front_field_list_store)
+        flags: DialogueFlags = (
+            (DialogueFlags.HAS_VIDEO if self._all_videos_check_button.get_active() else DialogueFlags.NONE)
+            | (DialogueFlags.HAS_AUDIO if self._all_audios_check_button.get_active() else DialogueFlags.NONE)
+            | (DialogueFlags.HAS_IMAGE if self._all_images_check_button.get_active() else DialogueFlags.NONE)
+        )
+
+        # The back is read by the index of the front rows and the front rows are searched
+        # as soon as they're appended, both must be there first
+        self._back_field_list_store.extend(dialogues_chunk.backs)
+        self._search_index.extend(dialogues_chunk.dialogues)
+        self._back_search_index.extend(dialogues_chunk.backs)
+        self._front_field_list_store.extend(
+            dialogues_chunk.dialogues,
+            dialogues_chunk.starts,
+            dialogues_chunk.ends,
+            dialogues_chunk.styles,
+            dialogues_chunk.speakers
+        )
+
+        if flags:
+            self._front_field_list_store.set_medias(
+                flags,
+                True,
+                range(first_index, len(self._front_field_list_store))
             )
 
-            if (is_timestamp_within(start_timestamp, end_timestamp, optional_start_timestamp)
-            and is_timestamp_within(start_timestamp, end_timestamp, optional_end_timestamp)):
-                optional_dialogue_info[DialogueInfoIndex.DIALOGUE] += (
-                    f"{NEW_LINE}{opt_dialogue_info[DialogueInfoIndex.DIALOGUE]}"
-                    if optional_dialogue_info[DialogueInfoIndex.DIALOGUE]
-                    else f"{opt_dialogue_info[DialogueInfoIndex.DIALOGUE]}"
-                )
-                opt_dialogue_info = next(optional_dialogues_iter, None)
+        if first_index == 0: self._force_emit_selection_changed(position=0, n_items=1)
 
-                continue
+        return False
 
-            self._back_field_list_store.append(optional_dialogue_info)
-            optional_dialogue_info = DialogueInfo()
-            dialogue_info = next(dialogues_iter, None)
 
+    def _on_dialogues_loaded(self) -> bool:
+        """
+        _on_dialogues_loaded
 
-        DialogueInfo.reset()
+        Called once all the dialogues are in the list stores.
+
+        :return: False to remove this callback from the list of
+                 event sources and to not be called again.
+        """
+
+        self._are_dialogues_loaded = True
+
+        self._media_rules_frame.set_sensitive(True)
+        self._update_generate_button_sensitive()
+
+        return False
+
+
+    def _on_dialogues_loading_failed(self, message: str) -> bool:
+        """
+        _on_dialogues_loading_failed
+
+        Warns that the subtitles couldn't be loaded.
+
+        :param message: Warning message.
+        :return: False to remove this callback from the list of
+                 event sources and to not be called again.
+        """
+
+        warning_dialog: WarningDialog = WarningDialog(self)
+
+        warning_dialog.set_warning_message(message)
+        warning_dialog.show_all()
+
+        return False
 
 
     def _setup_dialogues_column_view(self) -> None:
@@ -578,9 +665,7 @@ class CardsEditor(Window):
         is_active: bool = check_button.get_active()
         row.has_video = is_active
 
-        if not is_active:
-            self._number_medias_toggled -= 1
-            return
+        if not is_active: return
 
         if row.has_audio:
             row.has_audio = False
@@ -588,8 +673,6 @@ class CardsEditor(Window):
         if row.has_image:
             row.has_image = False
 
-        self._number_medias_toggled += 1
-
 
     def _on_has_audio_toggled(
         self,
@@ -604,15 +687,11 @@ class CardsEditor(Window):
 
         row.has_audio = is_active
 
-        if not is_active:
-            self._number_medias_toggled -= 1
-            return
+        if not is_active: return
 
         if row.has_video:
             row.has_video = False
 
-        self._number_medias_toggled += 1
-
 
     def _on_has_image_toggled(
         self,
@@ -627,15 +706,11 @@ class CardsEditor(Window):
 
         row.has_image = is_active
 
-        if not is_active:
-            self._number_medias_toggled -= 1
-            return
+        if not is_active: return
 
         if row.has_video:
             row.has_video = False
 
-        self._number_medias_toggled += 1
-
 
     def _factory_has_audio_setup(
         self,
@@ -871,6 +946,8 @@ class CardsEditor(Window):
         if not row: return
 
         row[DialogueInfoIndex.DIALOGUE] = get_tagged_text_from_text_buffer(text_buffer)
+        self._search_index.update(row.get_index(), row[DialogueInfoIndex.DIALOGUE])
+        self._dialogue_filter_model.invalidate_row(row.get_index())
 
 
     def _on_back_field_text_buffer_changed(self, text_buffer: TextBufferWrapper) -> None:
@@ -890,6 +967,8 @@ class CardsEditor(Window):
         index: int = row.get_index()
         back: DialogueInfo = cast(DialogueInfo, self._back_field_list_store[index])
         back[DialogueInfoIndex.DIALOGUE] = get_tagged_text_from_text_buffer(text_buffer)
+        self._back_search_index.update(index, back[DialogueInfoIndex.DIALOGUE])
+        self._dialogue_filter_model.invalidate_row(index)
 
 
     def _setup_search_entry(self) -> None:
@@ -902,64 +981,83 @@ class CardsEditor(Window):
         """
 
         self._search_entry = SearchEntry(halign=Align.END)
-        custom_filter: CustomFilter = CustomFilter.new(self._dialogues_filter_func, None)
-        filter_list_model: FilterListModel = FilterListModel(
-            model=self._front_field_list_store.get_list_store(),
-            filter=custom_filter
-        )
+        self._dialogue_filter_model = DialogueFilterModel(self._front_field_list_store)
 
         set_widget_margin(self._search_entry, DISPLAY_WIDTH * 0.002)
-        self._selected_row.set_model(filter_list_model)
-        self._search_entry.connect("search-changed", self._on_search_changed, filter_list_model)
+        self._selected_row.set_model(self._dialogue_filter_model)
+        self._search_entry.connect("search-changed", self._on_search_changed)
         self._main_grid.attach(self._search_entry, 0, 0, 1, 1)
 
 
-    def _dialogues_filter_func(self, row: DialogueInfo, *_: object) -> bool:
+    def _search_dialogues(self, candidates: Iterable[int]) -> list[int]:
         """
-        _dialogues_filter_func
+        _search_dialogues
 
-        Function called to determine if the row should be matched.
+        Matches the dialogues against the search query, see DialogueQuery.
 
-        :param row: DialogueInfo Gtk.GObject derived object.
-        :param user_data: Arguments.
-        :return: True if the filter matches the search term in the row.
+        :param candidates: Sorted indexes of the dialogues to be searched.
+        :return: Sorted indexes of the dialogues matching the search query.
         """
 
-        search_term: str = self._search_entry.get_text().lower()
-
-        if not search_term: return True
-
-        return search_term in row[DialogueInfoIndex.DIALOGUE].lower()
+        return self._search_query.match(
+            candidates,
+            self._search_index,
+            self._back_search_index,
+            self._front_field_list_store
+        )
 
 
-    def _on_search_changed(
-        self,
-        search_entry: SearchEntry,
-        filter_list_model: FilterListModel
-    ) -> None:
+    def _on_search_changed(self, search_entry: SearchEntry) -> None:
         """
         _on_search_changed
 
         Handles the search-changed signal.
 
         :param search_entry: SearchEntry widget which emmited the signal.
-        :param filter_list_model: List model filter.
         :return:
         """
 
-        custom_filter: CustomFilter = cast(CustomFilter, filter_list_model.get_filter())
+        search_term: str = search_entry.get_text()
+
+        try:
+            self._search_query = DialogueQuery(search_term)
+        except ValueError as e:
+            # The query is likely still being typed, the dialogues are left as they are
+            search_entry.add_css_class("error")
+            search_entry.set_tooltip_text(str(e))
+            return
+
+        search_entry.remove_css_class("error")
+        search_entry.set_tooltip_text(None)
 
+        plain_text: str | None = self._search_query.get_plain_text()
+        folded_search_term: str | None = fold_text(plain_text) if plain_text is not None else None
+        change: FilterChange = FilterChange.DIFFERENT
+
+        # A text containing the previous one matches only dialogues the previous one matched, and vice versa
+        if folded_search_term is not None and self._previous_search_term is not None:
+            if self._previous_search_term in folded_search_term:
+                change = FilterChange.MORE_STRICT
+            elif folded_search_term in self._previous_search_term:
+                change = FilterChange.LESS_STRICT
+
+        self._previous_search_term = folded_search_term
         self._row_selection.block_selection_updates()
-        custom_filter.changed(FilterChange.DIFFERENT)
+        self._dialogue_filter_model.set_match_func(
+            self._search_dialogues if plain_text != "" else None,
+            change,
+            # The medias selected change without the dialogues being searched again
+            None if self._search_query.has_media_terms()
+            else folded_search_term if folded_search_term is not None
+            else search_term
+        )
 
-        n_items: int = filter_list_model.get_n_items()
+        n_items: int = self._dialogue_filter_model.get_n_items()
 
         if n_items == 0:
             self._force_emit_selection_changed()
             return
 
-        search_term: str = search_entry.get_text()
-
         if not search_term:
             self._row_selection.unblock_selection_updates()
             self._selected_row.set_selected(INVALID_LIST_POSITION)
@@ -1499,44 +1597,107 @@ class CardsEditor(Window):
         videos_label: LabelWrapper = LabelWrapper(label="Videos", halign=Align.CENTER)
         audios_label: LabelWrapper = LabelWrapper(label="Audios", halign=Align.CENTER)
         images_label: LabelWrapper = LabelWrapper(label="Images", halign=Align.CENTER)
-        all_videos_check_button: CheckButtonWrapper = CheckButtonWrapper(halign=Align.CENTER)
-        all_audios_check_button: CheckButtonWrapper = CheckButtonWrapper(halign=Align.CENTER)
-        all_images_check_button: CheckButtonWrapper = CheckButtonWrapper(halign=Align.CENTER)
+        self._all_videos_check_button = CheckButtonWrapper(halign=Align.CENTER)
+        self._all_audios_check_button = CheckButtonWrapper(halign=Align.CENTER)
+        self._all_images_check_button = CheckButtonWrapper(halign=Align.CENTER)
 
         set_widget_margin(videos_frame, DISPLAY_WIDTH * 0.005)
         set_widget_margin(audios_frame, DISPLAY_WIDTH * 0.005)
         set_widget_margin(images_frame, DISPLAY_WIDTH * 0.005)
-        all_videos_check_button.set_tooltip_text("Select all videos.")
-        all_audios_check_button.set_tooltip_text("Select all audios.")
-        all_images_check_button.set_tooltip_text("Select all images.")
-        all_videos_check_button.connect(
+        self._all_videos_check_button.set_tooltip_text("Select all videos.")
+        self._all_audios_check_button.set_tooltip_text("Select all audios.")
+        self._all_images_check_button.set_tooltip_text("Select all images.")
+        self._all_videos_check_button.connect(
             "toggled",
             self._on_select_all_videos_toggled,
-            all_audios_check_button,
-            all_images_check_button
+            self._all_audios_check_button,
+            self._all_images_check_button
         )
-        all_audios_check_button.connect(
+        self._all_audios_check_button.connect(
             "toggled",
             self._on_select_all_audios_toggled,
-            all_videos_check_button
+            self._all_videos_check_button
         )
-        all_images_check_button.connect(
+        self._all_images_check_button.connect(
             "toggled",
             self._on_select_all_images_toggled,
-            all_videos_check_button
+            self._all_videos_check_button
         )
         videos_box.append(videos_label)
-        videos_box.append(all_videos_check_button)
+        videos_box.append(self._all_videos_check_button)
         audios_box.append(audios_label)
-        audios_box.append(all_audios_check_button)
+        audios_box.append(self._all_audios_check_button)
         images_box.append(images_label)
-        images_box.append(all_images_check_button)
+        images_box.append(self._all_images_check_button)
         grid.attach(videos_frame, 0, 0, 1, 1)
         grid.attach(audios_frame, 1, 0, 1, 1)
         grid.attach(images_frame, 2, 0, 1, 1)
+        self._setup_media_rules_entry(grid)
         self._main_grid.attach(main_frame, 0, 2, 1, 1)
 
 
+    def _setup_media_rules_entry(self, grid: Grid) -> None:
+        """
+        _setup_media_rules_entry
+
+        Setup the entry for selecting medias by rules, next to the select all check buttons,
+        it's only sensitive once all the dialogues are loaded.
+
+        :param grid: Grid holding the select all check buttons.
+        :return:
+        """
+
+        rules_box: Box = Box(orientation=Orientation.VERTICAL)
+        rules_entry_box: Box = Box(orientation=Orientation.HORIZONTAL)
+        rules_label: LabelWrapper = LabelWrapper(label="Rules", halign=Align.CENTER)
+        rules_entry: Entry = Entry(
+            placeholder_text="audio dur:1..8 -re:♪ -style:sign; image len:20..",
+            width_chars=40
+        )
+        apply_button: Button = Button(label="Apply")
+
+        self._media_rules_frame = Frame(child=rules_box, sensitive=self._are_dialogues_loaded)
+
+        set_widget_margin(self._media_rules_frame, DISPLAY_WIDTH * 0.005)
+        rules_entry.set_tooltip_text(
+            "Rules separated by semicolons, each a media (video, audio or image) followed by a search query "
+            "selecting it for the dialogues matching, a dash before the media clears it instead."
+        )
+        rules_entry.connect("activate", self._on_apply_media_rules, rules_entry)
+        apply_button.connect("clicked", self._on_apply_media_rules, rules_entry)
+        rules_entry_box.append(rules_entry)
+        rules_entry_box.append(apply_button)
+        rules_box.append(rules_label)
+        rules_box.append(rules_entry_box)
+        grid.attach(self._media_rules_frame, 3, 0, 1, 1)
+
+
+    def _on_apply_media_rules(self, _: Widget, rules_entry: Entry) -> None:
+        """
+        _on_apply_media_rules
+
+        Handles the activate signal of the rules entry and the clicked signal of its apply button,
+        selecting the medias of the dialogues matching each rule, in order.
+
+        :param widget: Widget which emitted the signal.
+        :param rules_entry: Entry with the rules.
+        :return:
+        """
+
+        try:
+            media_rules: list[MediaRule] = MediaRule.parse_rules(rules_entry.get_text())
+        except ValueError as e:
+            warning_dialog: WarningDialog = WarningDialog(self)
+
+            warning_dialog.set_warning_message(str(e))
+            warning_dialog.show_all()
+
+            return
+
+        for media_rule in media_rules:
+            media_rule.apply(self._front_field_list_store, self._search_index, self._back_search_index)
+
+
     def _on_select_all_videos_toggled(
         self,
         all_videos_check_button: CheckButtonWrapper,
@@ -1557,12 +1718,12 @@ class CardsEditor(Window):
 
         is_toggled: bool = all_videos_check_button.get_active()
 
-        for dialogue_info in self._front_field_list_store:
-            dialogue_info.has_video = is_toggled
+        self._front_field_list_store.set_medias(DialogueFlags.HAS_VIDEO, is_toggled)
 
         if is_toggled:
             all_audios_check_button.set_active(False)
             all_images_check_button.set_active(False)
+            self._front_field_list_store.set_medias(DialogueFlags.HAS_AUDIO | DialogueFlags.HAS_IMAGE, False)
 
 
     def _on_select_all_audios_toggled(
@@ -1582,11 +1743,11 @@ class CardsEditor(Window):
 
         is_toggled: bool = all_audios_check_button.get_active()
 
-        for dialogue_info in self._front_field_list_store:
-            dialogue_info.has_audio = is_toggled
+        self._front_field_list_store.set_medias(DialogueFlags.HAS_AUDIO, is_toggled)
 
         if is_toggled:
             all_videos_check_button.set_active(False)
+            self._front_field_list_store.set_medias(DialogueFlags.HAS_VIDEO, False)
 
 
     def _on_select_all_images_toggled(
@@ -1606,11 +1767,11 @@ class CardsEditor(Window):
 
         is_toggled: bool = all_images_check_button.get_active()
 
-        for dialogue_info in self._front_field_list_store:
-            dialogue_info.has_image = is_toggled
+        self._front_field_list_store.set_medias(DialogueFlags.HAS_IMAGE, is_toggled)
 
         if is_toggled:
             all_videos_check_button.set_active(False)
+            self._front_field_list_store.set_medias(DialogueFlags.HAS_VIDEO, False)
 
 
     def _setup_cancel_button(self, buttons_box: Box) -> None:
@@ -1648,33 +1809,52 @@ class CardsEditor(Window):
 
         if self._cards_editor_state.is_state(CardsEditorStates.RUNNING):
             self._cards_editor_state.set_state(CardsEditorStates.CANCELLED)
-            timeout_add(300, self._set_cancel_button_sensitive)
 
             return
 
         self.close()
 
 
-    def _set_cancel_button_sensitive(self) -> bool:
+    def _on_cards_editor_state_changed(self, previous_state: CardsEditorStates, state: CardsEditorStates) -> None:
         """
-        _set_cancel_button_sensitive
+        _on_cards_editor_state_changed
 
-        Callback to watch for the conditions to set the cancel_button sensitive.
+        Listener of the CardsEditorState, which may be changed by the cards generator thread,
+        the widgets are updated from the main thread.
 
+        :param previous_state: State before the change.
+        :param state: New state.
         :return:
         """
 
-        if self._are_all_futures_done():
-            self._cancel_button.set_sensitive(True)
-            self._progress_bar.set_text("Cancelled.")
-            self._cards_editor_state.set_state(CardsEditorStates.NORMAL)
+        idle_add(self._update_state_widgets, previous_state, state)
 
-            return False
 
-        self._cancel_button.set_sensitive(False)
-        self._progress_bar.set_text("Cancelling, please wait.")
+    def _update_state_widgets(self, previous_state: CardsEditorStates, state: CardsEditorStates) -> bool:
+        """
+        _update_state_widgets
+
+        Updates the cancel and generate buttons and the progress bar after the state changed.
+        The cards generator only goes back to NORMAL once all of its tasks are done,
+        after sending its last progress, which tells the work cancelling avoided.
 
-        return True
+        :param previous_state: State before the change.
+        :param state: New state.
+        :return: False to remove this callback from the list of
+                 event sources and to not be called again.
+        """
+
+        if state == CardsEditorStates.CANCELLED:
+            self._cancel_button.set_sensitive(False)
+            self._progress_bar.set_text("Cancelling, please wait.")
+        elif state == CardsEditorStates.NORMAL:
+            self._is_generating = False
+
+            if previous_state == CardsEditorStates.CANCELLED: self._cancel_button.set_sensitive(True)
+
+        self._update_generate_button_sensitive()
+
+        return False
 
 
     def _setup_generate_button(self, buttons_box: Box) -> None:
@@ -1697,40 +1877,26 @@ class CardsEditor(Window):
             DISPLAY_WIDTH * 0.005
         )
         self._generate_button.connect("clicked", self._on_generate_button_clicked)
+        self._cards_editor_state.add_listener(self._on_cards_editor_state_changed)
         buttons_box.append(self._generate_button)
-        timeout_add(150, self._set_generate_button_sensitive)
-
-
-    def _set_generate_button_sensitive(self) -> bool:
-        """
-        _set_generate_button_sensitive
-
-        Callback to watch for the conditions to set the generate_button sensitive.
 
-        :return: A boolean value to tell if this callback should still be called.
-        """
-
-        if (not self._number_medias_toggled > 0
-            or not self._are_all_futures_done()
-            or (self._progress_bar.get_fraction() > 0
-            and self._progress_bar.get_fraction() < 1)):
-            self._generate_button.set_sensitive(False)
-        else:
-            self._generate_button.set_sensitive(True)
-
-        return True
 
-
-    def _are_all_futures_done(self) -> bool:
+    def _update_generate_button_sensitive(self, *_: object) -> None:
         """
-        _is_all_futures_done
+        _update_generate_button_sensitive
 
-        Tells whether or not all futures are done.
+        Sets the generate button sensitive if there are medias selected, all the dialogues are loaded
+        and no cards are being generated. Called whenever any of those change, instead of being polled.
 
-        :return: True if all futures are done.
+        :return:
         """
 
-        return all(future.done() for future in self._futures_list)
+        self._generate_button.set_sensitive(
+            self._front_field_list_store.get_n_with_medias() > 0
+            and self._are_dialogues_loaded
+            and not self._is_generating
+            and self._cards_editor_state.is_state(CardsEditorStates.NORMAL)
+        )
 
 
     def _on_generate_button_clicked(self, _: Button) -> None:
@@ -1761,46 +1927,13 @@ class CardsEditor(Window):
 
             return
 
+        self._is_generating = True
+
+        self._update_generate_button_sensitive()
         self._progress_bar.set_fraction(0)
         self._progress_bar.set_show_text(True)
         cards_generator.start()
 
-        self._futures_list = cards_generator.get_futures_list()
-
-        timeout_add(300, self._on_all_futures_done_empty_futures_list)
-
-
-    def _on_all_futures_done(self) -> bool:
-        """
-        _on_all_futures_done
-
-        Reset the CardsEditor widgets status when all tasks are done already.
-
-        :return: A boolean value to tell whether this callback should still be called.
-        """
-
-        if not self._are_all_futures_done(): return True
-
-        self._cards_editor_state.set_state(CardsEditorStates.NORMAL)
-
-        return False
-
-
-    def _on_all_futures_done_empty_futures_list(self) -> bool:
-        """
-        _on_all_futures_done_empty_futures_list
-
-        Callback to watch for the conditions to empty the futures_list.
-
-        :return: A boolean value to tell whether this callback should still be called.
-        """
-
-        if not self._are_all_futures_done(): return True
-
-        self._futures_list = []
-
-        return False
-
 
     def _setup_progress_bar(self, buttons_box: Box) -> None:
         """
@@ -1819,31 +1952,31 @@ class CardsEditor(Window):
         buttons_box.append(self._progress_bar)
 
 
-    def _update_progress_bar(self, current_completed_task: int, total_number_tasks: int) -> bool:
+    def _update_progress_bar(self, progress: ProgressSnapshot) -> bool:
         """
         _update_progress_bar
 
-        Updates the progress of progress bar.
+        Updates the progress of progress bar, the progress of each stage is shown as its tooltip.
 
-        :param current_completed_task: Number of the current completed task.
-        :param total_number_tasks: Total number of tasks to be completed.
+        :param progress: Progress of the cards generator.
         :return: False to remove this callback from the list of
                  event sources and to not be called again.
         """
 
         text: str | None = (
-            None if current_completed_task < total_number_tasks
-            else "Cancelled." if self._cards_editor_state.is_state(CardsEditorStates.CANCELLED)
+            progress.get_summary()
+            if not progress.is_done() or progress.is_cancelled
             else "Done"
         )
         fraction: float = (
-            current_completed_task / total_number_tasks
-            if not self._cards_editor_state.is_state(CardsEditorStates.CANCELLED)
+            progress.completed / progress.total
+            if progress.total and not progress.is_cancelled
             else 1.0
         )
 
         self._progress_bar.set_fraction(fraction)
         self._progress_bar.set_text(text)
+        self._progress_bar.set_tooltip_text(progress.get_stages_summary() or None)
         self._progress_bar.set_show_text(True)
 
         return False
@@ -1862,20 +1995,17 @@ class CardsEditor(Window):
         self._progress_bar.set_show_text(False)
 
 
-    def idle_add_update_progress_bar(
-        self,
-        current_completed_task: int,
-        total_number_tasks: int
-    ) -> None:
+    def idle_add_update_progress_bar(self, progress: ProgressSnapshot) -> None:
         """
         idle_add_update_progress_bar
 
-        :param current_completed_task: Number of the current completed task.
-        :param total_number_tasks: Total number of tasks to be completed.
+        Called by the cards generator from its threads, at most once a frame.
+
+        :param progress: Progress of the cards generator.
         :return:
         """
 
-        idle_add(self._update_progress_bar, current_completed_task, total_number_tasks)
+        idle_add(self._update_progress_bar, progress)
 
 
 __all__: list[str] = ["CardsEditor"]
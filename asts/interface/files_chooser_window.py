@@ -11,7 +11,7 @@ require_version(*PANGO_VERSION)
 require_version(*GOBJECT_VERSION)
 
 from gi.repository.GObject import ParamSpec
-from gi.repository.GLib import timeout_add, idle_add
+from gi.repository.GLib import idle_add
 from gi.repository.GLib import Error as GLibError
 from gi.repository.Gio import AsyncResult, File, Icon
 from gi.repository.Gtk import (
@@ -67,8 +67,9 @@ class _CustomFileChooser(Box):
         self._filepath: str = ""
         self._parent: Window | None = parent
         self._file_chooser_dialog: FileDialog
-        self._selection_callbacks: list[tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]] = selection_callbacks
-        self._deselection_callbacks: list[tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]] = deselection_callbacks
+        # Copies, the default lists are shared by every file chooser
+        self._selection_callbacks: list[tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]] = list(selection_callbacks)
+        self._deselection_callbacks: list[tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]] = list(deselection_callbacks)
         self._button.set_child(self._text_label)
         set_widget_margin(self, DISPLAY_WIDTH * 0.005)
         self._button.set_hexpand(True)
@@ -121,6 +122,22 @@ class _CustomFileChooser(Box):
             _print(f"dialog.open_finish: {e}." + NEW_LINE + "Error selecting file." + NEW_LINE)
 
 
+    def add_selection_changed_callback(self, callback: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """
+        add_selection_changed_callback
+
+        Adds a callback to be called whenever a file is selected or deselected.
+
+        :param callback: Callback function.
+        :param args: Arguments of the callback, if any.
+        :param kwargs: Keyword arguments of the callback, if any.
+        :return:
+        """
+
+        self._selection_callbacks.append((callback, args, kwargs))
+        self._deselection_callbacks.append((callback, args, kwargs))
+
+
     def add_file_filter(self, file_filter: FileFilter) -> None:
         """
         add_file_filter
@@ -480,8 +497,13 @@ class FilesChooserWindow(Window):
             DISPLAY_WIDTH * 0.005
         )
         self._next_button.connect('clicked', self._on_next_button_clicked)
-        timeout_add(300, self._setup_sensitive_next_button)
-        timeout_add(300, self._check_invalid_selection)
+        self._entry.connect('changed', lambda _: self._setup_sensitive_next_button())
+
+        for filechooser in self._filechoosers_list:
+            filechooser.add_selection_changed_callback(self._on_file_selection_changed)
+
+        # The cached files were selected before the callbacks were there
+        self._on_file_selection_changed()
 
 
     def _setup_text_entry(self) -> None:
@@ -767,13 +789,27 @@ class FilesChooserWindow(Window):
         return self._entry.get_text()
 
 
-    def _check_invalid_selection(self) -> bool:
+    def _on_file_selection_changed(self) -> None:
+        """
+        _on_file_selection_changed
+
+        Called whenever a file chooser selects or deselects a file,
+        unselecting an invalid file and updating the next button.
+
+        :return:
+        """
+
+        self._check_invalid_selection()
+        self._setup_sensitive_next_button()
+
+
+    def _check_invalid_selection(self) -> None:
         """
         _check_invalid_selection
 
         Unselects any invalid filename selected through file choosers.
 
-        :return: True to keep timeout_add running.
+        :return:
         """
 
         anki_collection_filepath: Filepath = self.get_filepath(_FileChooserButtonIndex.ANKI2_COLLECTION)
@@ -793,16 +829,14 @@ class FilesChooserWindow(Window):
         if optional_subtitle_filepath and not is_file_subtitles(optional_subtitle_filepath):
             self._filechoosers_list[_FileChooserButtonIndex.OPTIONAL_SUBTITLE].unselect_all()
 
-        return True
-
 
-    def _setup_sensitive_next_button(self) -> bool:
+    def _setup_sensitive_next_button(self) -> None:
         """
         _setup_sensitive_next_button
 
         Set if a button is clickable or not.
 
-        :return: True to keep timeout_add running.
+        :return:
         """
 
         is_anki_collection: bool = is_file_collection(self.get_filepath(_FileChooserButtonIndex.ANKI2_COLLECTION))
@@ -815,8 +849,6 @@ class FilesChooserWindow(Window):
         else:
             self._next_button.set_sensitive(False)
 
-        return True
-
 
     def _on_next_button_clicked(self, _: Button) -> None:
         """
@@ -0,0 +1,114 @@
+from array      import array
+from bisect     import bisect_left, bisect_right
+
+from asts.custom_typing.globals import ALIGNMENT_MAX_GAP_MS, ALIGNMENT_MIN_COVERAGE
+from asts.custom_typing.timestamp_columns import TimestampColumns
+
+
+def _get_sorted_order(timestamp_columns: TimestampColumns) -> list[int]:
+    """
+    _get_sorted_order
+
+    Gets the indexes of the cues sorted by their start and then by their end.
+
+    :param timestamp_columns: Timestamps of the cues.
+    :return: List of indexes.
+    """
+
+    if timestamp_columns.is_sorted(): return list(range(len(timestamp_columns)))
+
+    starts: array[int] = timestamp_columns.get_starts()
+    ends: array[int] = timestamp_columns.get_ends()
+
+    return sorted(range(len(timestamp_columns)), key=lambda index: (starts[index], ends[index]))
+
+
+def align_by_overlap(
+    timestamp_columns: TimestampColumns,
+    translation_timestamp_columns: TimestampColumns,
+    max_gap_ms: int = ALIGNMENT_MAX_GAP_MS,
+    min_coverage: float = ALIGNMENT_MIN_COVERAGE
+) -> list[list[int]]:
+    """
+    align_by_overlap
+
+    Aligns the cues of a translation to the cues of the subtitles by their overlap in time.
+
+    Every translation cue goes to the cue it overlaps the most, so cues shifted from each other
+    or split in several translation cues still land together. A translation cue merging several cues
+    also goes to every other cue it covers at least min_coverage of. A translation cue overlapping
+    no cue at all goes to the nearest one, if it's no farther than max_gap_ms.
+
+    The cues are swept in order of their start, each translation cue is looked up with binary searches
+    and only the cues around it are compared, so it runs in O((n + m) log n) for ordinary subtitles.
+
+    :param timestamp_columns: Timestamps of the cues of the subtitles.
+    :param translation_timestamp_columns: Timestamps of the cues of the translation.
+    :param max_gap_ms: Largest gap from a translation cue overlapping no cue to the nearest cue.
+    :param min_coverage: Fraction of a cue that a translation cue must cover to also be aligned to it.
+    :return: For each cue of the subtitles, the indexes of its translation cues sorted by their start.
+    """
+
+    alignment: list[list[int]] = [[] for _ in range(len(timestamp_columns))]
+
+    if not timestamp_columns or not translation_timestamp_columns: return alignment
+
+    order: list[int] = _get_sorted_order(timestamp_columns)
+    starts: array[int] = array("q", (timestamp_columns.get_start(index) for index in order))
+    ends: array[int] = array("q", (timestamp_columns.get_end(index) for index in order))
+    # Highest end up to each position and where it is, the prefix maximum never decreases so it can be searched,
+    # cues before the first position whose prefix maximum goes past a start all end before it
+    prefix_max_ends: array[int] = array("q")
+    prefix_max_positions: array[int] = array("q")
+
+    for position, end in enumerate(ends):
+        if not prefix_max_ends or end > prefix_max_ends[-1]:
+            prefix_max_ends.append(end)
+            prefix_max_positions.append(position)
+        else:
+            prefix_max_ends.append(prefix_max_ends[-1])
+            prefix_max_positions.append(prefix_max_positions[-1])
+
+    for translation_index in _get_sorted_order(translation_timestamp_columns):
+        translation_start: int = translation_timestamp_columns.get_start(translation_index)
+        # Cues without duration still overlap the cue they're in
+        translation_end: int = max(translation_timestamp_columns.get_end(translation_index), translation_start + 1)
+        first_position: int = bisect_right(prefix_max_ends, translation_start)
+        last_position: int = bisect_left(starts, translation_end)
+        best_position: int = -1
+        best_overlap: int = 0
+        covered_positions: list[int] = []
+
+        for position in range(first_position, last_position):
+            overlap: int = min(ends[position], translation_end) - max(starts[position], translation_start)
+
+            if overlap <= 0: continue
+
+            if overlap > best_overlap:
+                best_position = position
+                best_overlap = overlap
+
+            if overlap >= min_coverage * (ends[position] - starts[position]):
+                covered_positions.append(position)
+
+        if best_position < 0:
+            # Nothing overlaps, the nearest cue is either the one ending last before or the one starting next after
+            previous_gap: int = (
+                translation_start - prefix_max_ends[first_position - 1] if first_position > 0 else max_gap_ms + 1
+            )
+            next_position: int = bisect_left(starts, translation_start)
+            next_gap: int = starts[next_position] - translation_end if next_position < len(starts) else max_gap_ms + 1
+
+            if min(previous_gap, next_gap) > max_gap_ms: continue
+
+            best_position = prefix_max_positions[first_position - 1] if previous_gap <= next_gap else next_position
+
+        alignment[order[best_position]].append(translation_index)
+
+        for position in covered_positions:
+            if position != best_position: alignment[order[position]].append(translation_index)
+
+    return alignment
+
+
+__all__: list[str] = ["align_by_overlap"]
@@ -1,4 +1,6 @@
-from datetime   import datetime, timedelta
+from datetime   import timedelta
+from hashlib    import sha1
+from os         import path, stat, stat_result
 from typing     import Any, Callable, Iterable, TextIO, NoReturn, TypeVar
 from sys        import exit, stdout, stderr
 from platform   import system as ps
@@ -71,50 +73,94 @@ def handle_exception_if_any(
         fatal_handler(f"{message}{NEW_LINE}{e}.")
 
 
-def timestamp_to_timedelta(timestamp: str,  _format: str = "%H:%M:%S.%f") -> timedelta:
+def timestamp_to_milliseconds(timestamp: str) -> int:
+    """
+    timestamp_to_milliseconds
+
+    Return the number of milliseconds represented by the timestamp.
+    Parsed by hand, without strptime, as it's called for every dialogue.
+
+    timestamp: Timestamp in the format of "%H:%M:%S.%f", the decimal separator can be a comma too.
+    :return: Number of milliseconds.
+    """
+
+    hours: str
+    minutes: str
+    seconds: str
+    hours, minutes, seconds = timestamp.split(":")
+    whole_seconds: str
+    fraction: str
+    whole_seconds, _, fraction = seconds.replace(",", ".").partition(".")
+
+    return (
+        ((int(hours) * 60 + int(minutes)) * 60 + int(whole_seconds)) * 1000
+        + (int(fraction[:3].ljust(3, "0")) if fraction else 0)
+    )
+
+
+def timestamp_to_timedelta(timestamp: str) -> timedelta:
     """
     timestamp_to_timedelta
 
     Return a timedelta object built based by the timestamp.
 
-    timestamp: Timestamp in the format of _format.
-    _format: Format of the timestamps.
+    timestamp: Timestamp in the format of "%H:%M:%S.%f".
     :return: timedelta object.
     """
 
-    parsed_time: datetime = datetime.strptime(timestamp, _format)
+    return timedelta(milliseconds=timestamp_to_milliseconds(timestamp))
 
-    return timedelta(
-        hours=parsed_time.hour,
-        minutes=parsed_time.minute,
-        seconds=parsed_time.second,
-        microseconds=parsed_time.microsecond // 1000
-    )
 
+def timestamp_to_seconds(timestamp: str) -> float:
+    """
+    timestamp_to_seconds
+
+    Return the number of seconds represented by the timestamp.
+
+    timestamp: Timestamp in the format of "%H:%M:%S.%f".
+    :return: Number of seconds, fractional part included.
+    """
 
-def is_timestamp_within(
-    start_timestamp: str,
-    end_timestamp: str,
-    given_timestamp: str,
-    _format: str = "%H:%M:%S.%f"
-) -> bool:
+    return timestamp_to_milliseconds(timestamp) / 1000
+
+
+def milliseconds_to_timestamp(milliseconds: int) -> str:
+    """
+    milliseconds_to_timestamp
+
+    Return the timestamp representing the number of milliseconds.
+
+    milliseconds: Number of milliseconds.
+    :return: Timestamp in the format of "%H:%M:%S.%f" with a milliseconds fractional part.
+    """
+
+    seconds: int
+    minutes: int
+    hours: int
+    seconds, milliseconds = divmod(max(0, milliseconds), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+
+def is_timestamp_within(start_timestamp: str, end_timestamp: str, given_timestamp: str) -> bool:
     """
     is_timestamp_within
 
     Tell if the given timestamp is within the start and end timestamp.
 
-    start_timestamp: Start timestamp in the format of _format.
-    end_timestamp: End timestamp in the format of _format.
-    given_timestamp: Given timestamp in the format of _format.
-    _format: Format of the timestamps.
+    start_timestamp: Start timestamp in the format of "%H:%M:%S.%f".
+    end_timestamp: End timestamp in the format of "%H:%M:%S.%f".
+    given_timestamp: Given timestamp in the format of "%H:%M:%S.%f".
     :return: True if the given time is within the start and end timestamp.
     """
 
-    start_timedelta: timedelta = timestamp_to_timedelta(start_timestamp, _format)
-    end_timedelta: timedelta = timestamp_to_timedelta(end_timestamp, _format)
-    given_timedelta: timedelta = timestamp_to_timedelta(given_timestamp, _format)
-
-    return start_timedelta <= given_timedelta <= end_timedelta
+    return (
+        timestamp_to_milliseconds(start_timestamp)
+        <= timestamp_to_milliseconds(given_timestamp)
+        <= timestamp_to_milliseconds(end_timestamp)
+    )
 
 
 def clamp(value: float, _min: float, _max: float) -> float:
@@ -132,6 +178,25 @@ def clamp(value: float, _min: float, _max: float) -> float:
     return _min if value < _min else _max if value > _max else value
 
 
+def get_file_identity(filepath: str) -> str:
+    """
+    get_file_identity
+
+    Creates an identifier for the file built from its path, inode, size and modification time,
+    so it stays the same across sessions while the file isn't replaced or modified.
+
+    :param filepath: Path to the file.
+    :return: Hexadecimal digest identifying the file.
+    """
+
+    real_filepath: str = path.realpath(filepath)
+    file_stat: stat_result = stat(real_filepath)
+
+    return sha1(
+        f"{real_filepath}:{file_stat.st_ino}:{file_stat.st_size}:{file_stat.st_mtime_ns}".encode()
+    ).hexdigest()
+
+
 _T = TypeVar("_T")
 
 def get_chunked(_list: list[_T], chunk_size: int) -> list[list[_T]]:
@@ -156,7 +221,9 @@ def get_chunked(_list: list[_T], chunk_size: int) -> list[list[_T]]:
 
 
 __all__: list[str] = [
-    "_print", "clamp", "die", "handle_exception_if_any",
-    "is_timestamp_within", "get_chunked", "NEW_LINE"
+    "_print", "clamp", "die", "handle_exception_if_any", "get_file_identity",
+    "is_timestamp_within", "get_chunked", "timestamp_to_milliseconds", "timestamp_to_seconds",
+    "milliseconds_to_timestamp",
+    "NEW_LINE"
 ]
 
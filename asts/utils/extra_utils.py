@@ -13,31 +13,72 @@ from gi.repository.Pango import (
 )
 
 from subprocess import Popen
-from ffmpeg     import probe
 from ffmpeg     import input as FFMPEGInput
 from ffmpeg     import Error as FFMPEGError
+from ffmpeg     import merge_outputs
+from ffmpeg     import output as FFMPEGOutput
+from ffmpeg     import probe
+from ffmpeg.nodes import FilterableStream, FilterNode, OutputStream
 from glob       import glob
-from pysrt      import open as popen
-from pysrt      import SubRipFile
-from pyasstosrt import Subtitle, Dialogue
 from os         import makedirs, path, remove
 from tomllib    import load
-from typing     import Any
+from typing     import Any, Iterator, NamedTuple
 
-from asts.utils.core_utils import NEW_LINE, die, handle_exception_if_any, _print
+from asts.utils.core_utils import (
+    NEW_LINE, die, handle_exception_if_any, _print
+)
+from asts.utils.ffmpeg_utils import run_ffmpeg
+from asts.utils.subtitles_utils import parse_subtitles, SubtitleCue
+from asts.utils.alignment_utils import align_by_overlap
 from asts.custom_typing.aliases import (
     Filename, Filepath, OptionalFilepath,
     OptionalVideoFilepath, OptionalImageFilepath,
     OptionalAudioFilepath, OptionalFilename, StrTimestamp
 )
-from asts.custom_typing.globals import CACHE_MEDIA_DIR, CACHE_SUBTITLES_DIR, RECENTLY_USED_FILEPATH
+from asts.custom_typing.globals import (
+    CACHE_MEDIA_DIR, CACHE_MEDIA_STORE_DIR, CACHE_SUBTITLES_DIR, CACHE_AUDIO_TRACKS_DIR,
+    CACHE_JOBS_DIR, CACHE_VOICE_ACTIVITY_DIR, CACHE_VIDEO_METADATA_DIR, RECENTLY_USED_FILEPATH,
+    VIDEO_SCALE_WIDTH, VIDEO_ENCODE_SETTINGS, AUDIO_BITRATE, DIALOGUES_LOADING_CHUNK_SIZE,
+    KEYFRAME_SNAP_MAX_SECONDS, KEYFRAME_SEEK_MARGIN_SECONDS
+)
 from asts.custom_typing.format_tags import FormatTags
 from asts.custom_typing.dialogue_info import DialogueInfo
+from asts.custom_typing.dialogue_store import DialogueStore
 from asts.custom_typing.card_info import CardInfo, CardInfoIndex
 from asts.custom_typing.rgba import RGBA
 from asts.custom_typing.text_buffer_pango_markup_parser import TextBufferPangoMarkupParser
 from asts.custom_typing.cards_editor_states import CardsEditorState, CardsEditorStates
+from asts.custom_typing.process_registry import ProcessRegistry
+from asts.custom_typing.video_metadata import VideoMetadata
+from asts.custom_typing.video_clip_mode import VideoClipMode
 from asts.custom_typing.timestamp_field_info import TimestampFieldInfo
+from asts.custom_typing.timestamp_columns import TimestampColumns
+
+
+# Encoders of the codecs whose clips can be smart cut, their encoded head is joined to the stream copied rest
+_SMART_CUT_ENCODERS: dict[str, str] = {
+    "h264": "libx264",
+    "hevc": "libx265"
+}
+# Profiles of the encoders above, by codec and ffprobe name of the profile of the video
+_SMART_CUT_PROFILES: dict[str, dict[str, str]] = {
+    "h264": {
+        "Constrained Baseline": "baseline",
+        "Baseline": "baseline",
+        "Main": "main",
+        "High": "high",
+        "High 10": "high10",
+        "High 4:2:2": "high422",
+        "High 4:4:4 Predictive": "high444"
+    },
+    "hevc": {
+        "Main": "main",
+        "Main 10": "main10",
+        "Main Still Picture": "mainstillpicture"
+    }
+}
+# Fields of the video stream the encoded head of a smart cut clip must share with its stream copied rest
+_SMART_CUT_MATCHING_FIELDS: tuple[str, ...] = ("codec_name", "profile", "level", "width", "height", "pix_fmt")
 
 
 def is_file_collection(filename: OptionalFilename = None) -> bool:
@@ -108,143 +149,526 @@ def remove_cached_media_files() -> None:
         pass
 
 
-def cut_video(input_file: Filepath, card_info: CardInfo, cards_editor_state: CardsEditorState) -> None:
+def cut_video(
+    input_file: Filepath,
+    card_info: CardInfo,
+    cards_editor_state: CardsEditorState,
+    single_pass: bool = True,
+    process_registry: ProcessRegistry | None = None
+) -> bool:
     """
     cut_video
 
     Cut the video making a short clip, audio or image.
 
+    When single_pass is set, all the requested medias are written by the same ffmpeg process,
+    so the input is opened, demuxed and seeked only once for every output.
+
     :param input_file: Path of the video to be used.
-    :param list_media_info: A list with info about how the final media will be.
+    :param card_info: Info about how the final media will be.
     :param cards_editor_state: State object that keeps the track of CardsEditor's class state.
-    :return:
+    :param single_pass: If all medias should be extracted by a single ffmpeg invocation.
+    :param process_registry: (Optional) registry keeping track of the ffmpeg processes, to kill them when cancelling.
+    :return: True if all the medias were cut.
     """
 
-    if cards_editor_state.is_state(CardsEditorStates.CANCELLED): return
+    if cards_editor_state.is_state(CardsEditorStates.CANCELLED): return False
 
     start_timestamp: StrTimestamp           = card_info[CardInfoIndex.START_TIMESTAMP].timestamp
     end_timestamp: StrTimestamp             = card_info[CardInfoIndex.END_TIMESTAMP].timestamp
     video_filepath: OptionalVideoFilepath   = card_info[CardInfoIndex.VIDEO_FILEPATH]
     audio_filepath: OptionalAudioFilepath   = card_info[CardInfoIndex.AUDIO_FILEPATH]
     image_filepath: OptionalImageFilepath   = card_info[CardInfoIndex.IMAGE_FILEPATH]
+    input_stream: FilterableStream          = FFMPEGInput(input_file, ss=start_timestamp, to=end_timestamp)
+    output_streams: list[OutputStream]      = []
 
-    try:
-        if video_filepath:
-            FFMPEGInput(
-                input_file,
-                ss=start_timestamp,
-                to=end_timestamp
-            ).output(
+    if video_filepath:
+        output_streams.append(
+            input_stream.output(
                 video_filepath,
-                vf="scale=640:-1",
-            ).global_args(
-                "-y",
-                "-nostdin",
-                "-loglevel",
-                "quiet"
-            ).run()
-        if audio_filepath:
-            FFMPEGInput(
-                input_file,
-                ss=start_timestamp,
-                to=end_timestamp
-            ).output(
+                vf=VIDEO_ENCODE_SETTINGS
+            )
+        )
+    if audio_filepath:
+        output_streams.append(
+            input_stream.output(
                 audio_filepath,
                 vn=None,
-                b="320k"
+                b=AUDIO_BITRATE
+            )
+        )
+    if image_filepath:
+        output_streams.append(
+            input_stream.output(
+                image_filepath,
+                vsync=0,
+                vframes=1,
+                vf=VIDEO_ENCODE_SETTINGS
+            )
+        )
+
+    if not output_streams: return True
+
+    try:
+        if single_pass:
+            return run_ffmpeg(
+                merge_outputs(*output_streams).global_args(
+                    "-y",
+                    "-nostdin",
+                    "-loglevel",
+                    "quiet"
+                ),
+                process_registry
+            )
+
+        for output_stream in output_streams:
+            if not run_ffmpeg(
+                output_stream.global_args(
+                    "-y",
+                    "-nostdin",
+                    "-loglevel",
+                    "quiet"
+                ),
+                process_registry
+            ): return False
+    except FFMPEGError as e:
+        _print(f"Error running ffmpeg: {e.stderr.decode() if e.stderr else e}", True)
+
+        return False
+
+    return True
+
+
+def _copy_video_clip(
+    input_file: Filepath,
+    start: float,
+    end: float,
+    video_filepath: Filepath,
+    process_registry: ProcessRegistry | None = None
+) -> bool:
+    """
+    _copy_video_clip
+
+    Stream copies the video of a clip, only its audio is encoded.
+
+    The clip is seeked a little past its keyframe, the stream copy still starts from it.
+
+    :param input_file: Path of the video to be used.
+    :param start: Start of the clip in seconds, it must be a keyframe.
+    :param end: End of the clip in seconds.
+    :param video_filepath: Path of the clip.
+    :param process_registry: (Optional) registry keeping track of the ffmpeg process, to kill it when cancelling.
+    :return: True if the clip was cut.
+    :raises FFMPEGError: If ffmpeg failed.
+    """
+
+    return run_ffmpeg(
+        FFMPEGInput(input_file, ss=f"{start + KEYFRAME_SEEK_MARGIN_SECONDS:.6f}", to=f"{end:.6f}").output(
+            video_filepath,
+            vcodec="copy",
+            avoid_negative_ts="make_zero"
+        ).global_args(
+            "-y",
+            "-nostdin",
+            "-loglevel",
+            "quiet"
+        ),
+        process_registry
+    )
+
+
+def _get_smart_cut_encode_settings(video_metadata: VideoMetadata) -> dict[str, str]:
+    """
+    _get_smart_cut_encode_settings
+
+    Gets the settings the head of a smart cut clip is encoded with, the codec, profile, level,
+    pixel format and frame rate of the video, the frame rate only when it's constant.
+
+    :param video_metadata: Metadata of the video, whose codec must be one of _SMART_CUT_ENCODERS.
+    :return: Output options of ffmpeg.
+    """
+
+    video_stream: dict[str, Any] = video_metadata.get_video_stream() or {}
+    codec_name: str = video_metadata.get_codec_name() or ""
+    pix_fmt: str | None = video_metadata.get_pix_fmt()
+    profile: str | None = _SMART_CUT_PROFILES[codec_name].get(video_stream.get("profile", ""))
+    level: int = int(video_stream.get("level", -99))
+    frame_rate: str | None = video_stream.get("r_frame_rate")
+    encode_settings: dict[str, str] = {"vcodec": _SMART_CUT_ENCODERS[codec_name]}
+
+    if pix_fmt: encode_settings["pix_fmt"] = pix_fmt
+    if profile: encode_settings["profile:v"] = profile
+
+    # ffprobe gives the level of H.264 times 10 and the one of HEVC times 30
+    if level > 0 and codec_name == "h264": encode_settings["level:v"] = f"{level / 10:g}"
+    if level > 0 and codec_name == "hevc": encode_settings["x265-params"] = f"level-idc={level / 30:g}"
+
+    if frame_rate and frame_rate != "0/0" and frame_rate == video_stream.get("avg_frame_rate"):
+        encode_settings["r"] = frame_rate
+
+    return encode_settings
+
+
+def _get_smart_cut_matching_fields(video_filepath: Filepath) -> tuple[Any, ...] | None:
+    """
+    _get_smart_cut_matching_fields
+
+    Gets the fields of the video stream of a part of a smart cut clip, see _SMART_CUT_MATCHING_FIELDS.
+
+    :param video_filepath: Path of the part.
+    :return: The fields, None if the part couldn't be probed or has no video stream.
+    """
+
+    try:
+        streams: list[dict[str, Any]] = probe(
+            video_filepath,
+            loglevel="quiet",
+            select_streams="v:0"
+        ).get("streams") or []
+    except FFMPEGError:
+        return None
+
+    if not streams: return None
+
+    return tuple(streams[0].get(field) for field in _SMART_CUT_MATCHING_FIELDS)
+
+
+def _smart_cut_video_clip(
+    input_file: Filepath,
+    start: float,
+    keyframe: float,
+    end: float,
+    video_filepath: Filepath,
+    video_metadata: VideoMetadata,
+    process_registry: ProcessRegistry | None = None
+) -> bool | None:
+    """
+    _smart_cut_video_clip
+
+    Encodes the head of a clip up to its first keyframe with the codec of the video and stream copies the rest,
+    the video of both parts is then joined and muxed with the audio of the whole clip, if the video has any.
+
+    The container of the clip only holds the parameter sets of the encoded head, the copied rest carries
+    the ones of the video in band, through MPEG-TS, and only decoders following them there decode it.
+    So the head is encoded with the profile, level, pixel format and frame rate of the video,
+    and the clip isn't joined unless both parts share them as well as the size of the video.
+    The head stops a little before the keyframe and the rest is seeked a little past it,
+    so the frames around the keyframe are neither lost nor repeated.
+
+    :param input_file: Path of the video to be used.
+    :param start: Start of the clip in seconds.
+    :param keyframe: First keyframe of the clip in seconds, past its start and before its end.
+    :param end: End of the clip in seconds.
+    :param video_filepath: Path of the clip.
+    :param video_metadata: Metadata of the video, with its keyframes.
+    :param process_registry: (Optional) registry keeping track of the ffmpeg processes, to kill them when cancelling.
+    :return: True if the clip was cut, None if its parts don't match and it must be cut otherwise.
+    :raises FFMPEGError: If ffmpeg failed.
+    """
+
+    head_filepath: Filepath = f"{video_filepath}.head.ts"
+    tail_filepath: Filepath = f"{video_filepath}.tail.ts"
+    concat_filepath: Filepath = f"{video_filepath}.concat"
+    audio_streams: list[FilterableStream] = []
+
+    if video_metadata.get_audio_layout():
+        audio_streams.append(FFMPEGInput(input_file, ss=f"{start:.6f}", to=f"{end:.6f}").audio)
+
+    try:
+        if not run_ffmpeg(
+            merge_outputs(
+                FFMPEGInput(
+                    input_file,
+                    ss=f"{start:.6f}",
+                    to=f"{keyframe - KEYFRAME_SEEK_MARGIN_SECONDS:.6f}"
+                ).video.output(
+                    head_filepath,
+                    **_get_smart_cut_encode_settings(video_metadata)
+                ),
+                FFMPEGInput(
+                    input_file,
+                    ss=f"{keyframe + KEYFRAME_SEEK_MARGIN_SECONDS:.6f}",
+                    to=f"{end:.6f}"
+                ).video.output(
+                    tail_filepath,
+                    vcodec="copy"
+                )
             ).global_args(
                 "-y",
                 "-nostdin",
                 "-loglevel",
                 "quiet"
-            ).run()
-        if image_filepath:
-            FFMPEGInput(
-                input_file,
-                ss=start_timestamp,
-                to=end_timestamp,
-            ).output(
-                image_filepath,
-                vsync=0,
-                vframes=1,
-                filter_complex="scale=640:-1"
+            ),
+            process_registry
+        ): return False
+
+        head_fields: tuple[Any, ...] | None = _get_smart_cut_matching_fields(head_filepath)
+
+        if head_fields is None or head_fields != _get_smart_cut_matching_fields(tail_filepath):
+            _print(f"The encoded head of {video_filepath} doesn't match the video, encoding the whole clip", True)
+
+            return None
+
+        with open(concat_filepath, "w") as f:
+            for filepath in (head_filepath, tail_filepath):
+                escaped_filepath: str = path.abspath(filepath).replace("'", "'\\''")
+                f.write(f"file '{escaped_filepath}'{NEW_LINE}")
+
+        return run_ffmpeg(
+            FFMPEGOutput(
+                FFMPEGInput(concat_filepath, f="concat", safe=0).video,
+                *audio_streams,
+                video_filepath,
+                vcodec="copy"
             ).global_args(
                 "-y",
                 "-nostdin",
                 "-loglevel",
                 "quiet"
-            ).run()
-    except FFMPEGError as e:
-        _print(f"Error running ffmpeg probe: {e.stderr.decode()}", True)
+            ),
+            process_registry
+        )
+    finally:
+        for filepath in (head_filepath, tail_filepath, concat_filepath):
+            if path.exists(filepath): remove(filepath)
+
+
+def cut_video_clip(
+    input_file: Filepath,
+    card_info: CardInfo,
+    cards_editor_state: CardsEditorState,
+    video_metadata: VideoMetadata,
+    video_clip_mode: VideoClipMode,
+    process_registry: ProcessRegistry | None = None
+) -> bool:
+    """
+    cut_video_clip
+
+    Cut the video clip of a card from the keyframes of the video, see VideoClipMode.
 
+    A clip starting on a keyframe, or close enough to one in COPY mode, is stream copied from it.
+    Otherwise its head is encoded up to the next keyframe and the rest is stream copied,
+    clips without any keyframe before their end, videos whose codec can't be encoded
+    and clips whose encoded head doesn't match the video are cut as in REENCODE mode.
 
-def is_ass_file(sub_filepath: OptionalFilepath = None) -> bool:
+    :param input_file: Path of the video to be used.
+    :param card_info: Card whose video clip should be cut, its other medias are left out.
+    :param cards_editor_state: State object that keeps the track of CardsEditor's class state.
+    :param video_metadata: Metadata of the video, with its keyframes already prepared.
+    :param video_clip_mode: How the clip is cut, either COPY or SMART.
+    :param process_registry: (Optional) registry keeping track of the ffmpeg processes, to kill them when cancelling.
+    :return: True if the clip was cut.
     """
-    is_ass_file
 
-    Returns true if is a .ass subtitle file.
+    if cards_editor_state.is_state(CardsEditorStates.CANCELLED): return False
 
-    :param sub_filepath: Path to the .ass subtitle file.
-    :return: True if it is .ass subtitle file.
-    """
+    video_filepath: OptionalVideoFilepath = card_info[CardInfoIndex.VIDEO_FILEPATH]
 
-    if sub_filepath:
-        return sub_filepath.endswith(".ass")
+    if not video_filepath: return True
 
-    return False
+    start: float = card_info[CardInfoIndex.START_TIMESTAMP].seconds
+    end: float = card_info[CardInfoIndex.END_TIMESTAMP].seconds
+    keyframe_before: float | None = video_metadata.get_keyframe_before(start)
+    keyframe_after: float | None = video_metadata.get_keyframe_after(start)
+
+    try:
+        if keyframe_before is not None and (
+            start - keyframe_before <= KEYFRAME_SEEK_MARGIN_SECONDS
+            or video_clip_mode == VideoClipMode.COPY and start - keyframe_before <= KEYFRAME_SNAP_MAX_SECONDS
+        ):
+            return _copy_video_clip(input_file, keyframe_before, end, video_filepath, process_registry)
+
+        if (
+            keyframe_after is not None and keyframe_after < end
+            and video_metadata.get_codec_name() in _SMART_CUT_ENCODERS
+        ):
+            is_smart_cut: bool | None = _smart_cut_video_clip(
+                input_file,
+                start,
+                keyframe_after,
+                end,
+                video_filepath,
+                video_metadata,
+                process_registry
+            )
+
+            if is_smart_cut is not None: return is_smart_cut
+    except FFMPEGError as e:
+        _print(f"Error running ffmpeg: {e.stderr.decode() if e.stderr else e}", True)
+
+        return False
+
+    return cut_video(
+        input_file,
+        CardInfo(
+            start_timestamp=card_info[CardInfoIndex.START_TIMESTAMP],
+            end_timestamp=card_info[CardInfoIndex.END_TIMESTAMP],
+            video_filepath=video_filepath
+        ),
+        cards_editor_state,
+        process_registry=process_registry
+    )
 
 
-def open_sub_file(subtitles_filepath: Filepath) -> list[Dialogue] | SubRipFile | None:
+def _trim_video_stream(video_stream: FilterableStream, start: float, end: float) -> FilterableStream:
     """
-    open_sub_file
+    _trim_video_stream
 
-    Opens the subtitle file and return its dialogues.
+    Trims a segment out of a video stream, rebasing its timestamps and scaling it down.
 
-    :param sub_filepath: Subtitle filepath.
-    :return: The dialogues or None in case of some failure.
+    :param video_stream: Video stream to be trimmed.
+    :param start: Start of the segment in seconds, relative to the stream.
+    :param end: End of the segment in seconds, relative to the stream.
+    :return: The trimmed video stream.
     """
 
-    if is_ass_file(subtitles_filepath):
-        return Subtitle(subtitles_filepath).export(output_dir="", output_dialogues=True)
+    return video_stream.trim(start=start, end=end).setpts("PTS-STARTPTS").filter("scale", VIDEO_SCALE_WIDTH, -1)
+
 
-    return popen(subtitles_filepath)
+def _trim_audio_stream(audio_stream: FilterableStream, start: float, end: float) -> FilterableStream:
+    """
+    _trim_audio_stream
 
+    Trims a segment out of an audio stream, rebasing its timestamps.
 
-def split_dialogue_line(opened_sub_indexed: SubRipFile | Dialogue) -> list[str]:
+    :param audio_stream: Audio stream to be trimmed.
+    :param start: Start of the segment in seconds, relative to the stream.
+    :param end: End of the segment in seconds, relative to the stream.
+    :return: The trimmed audio stream.
     """
-    split_dialogue_line
 
-    Splits a line of dialogue at the "\\n" character returning each element inside a list.
+    return audio_stream.filter("atrim", start=start, end=end).filter("asetpts", "PTS-STARTPTS")
 
-    :param opened_sub_indexed:
-    :return: A list with each element of the dialogue line [index, start, end, text].
+
+def cut_videos_batch(
+    input_file: Filepath,
+    card_info_list: list[CardInfo],
+    cards_editor_state: CardsEditorState,
+    process_registry: ProcessRegistry | None = None,
+    has_audio: bool = True
+) -> bool:
     """
+    cut_videos_batch
+
+    Cut the clips, audios and images of several cards from a single decoder pass.
+
+    The input is seeked once to the start of the earliest card and decoded up to the end of the latest one,
+    the segment of each card is then trimmed out of the decoded streams and written to its own outputs.
+
+    :param input_file: Path of the video to be used.
+    :param card_info_list: Cards whose medias should be cut, preferably sorted by their start timestamp.
+    :param cards_editor_state: State object that keeps the track of CardsEditor's class state.
+    :param process_registry: (Optional) registry keeping track of the ffmpeg process, to kill it when cancelling.
+    :param has_audio: If the video has an audio stream, the video clips are left silent otherwise
+                      and the cards must not have any audio.
+    :return: True if all the medias were cut.
+    """
+
+    if cards_editor_state.is_state(CardsEditorStates.CANCELLED): return False
+
+    if len(card_info_list) < 2:
+        return all([
+            cut_video(input_file, card_info, cards_editor_state, process_registry=process_registry)
+            for card_info in card_info_list
+        ])
+
+    segments: list[tuple[float, float, CardInfo]] = [
+        (
+            card_info[CardInfoIndex.START_TIMESTAMP].seconds,
+            card_info[CardInfoIndex.END_TIMESTAMP].seconds,
+            card_info
+        )
+        for card_info in card_info_list
+    ]
+    range_start: float = min(start for start, _, _ in segments)
+    range_end: float = max(end for _, end, _ in segments)
+    number_video_branches: int = sum(
+        bool(card_info[CardInfoIndex.VIDEO_FILEPATH]) + bool(card_info[CardInfoIndex.IMAGE_FILEPATH])
+        for card_info in card_info_list
+    )
+    number_audio_branches: int = sum(
+        bool(card_info[CardInfoIndex.VIDEO_FILEPATH]) * has_audio + bool(card_info[CardInfoIndex.AUDIO_FILEPATH])
+        for card_info in card_info_list
+    )
+    input_stream: FilterableStream = FFMPEGInput(input_file, ss=f"{range_start:.3f}", to=f"{range_end:.3f}")
+    video_branches: Iterator[FilterableStream] = iter(())
+    audio_branches: Iterator[FilterableStream] = iter(())
+    output_streams: list[OutputStream] = []
+
+    # Only the streams that are really needed are decoded,
+    # so audio only batches never pay for decoding the video
+    if number_video_branches:
+        video_split: FilterNode = input_stream.video.filter_multi_output("split", number_video_branches)
+        video_branches = iter([video_split[i] for i in range(number_video_branches)])
+
+    if number_audio_branches:
+        audio_split: FilterNode = input_stream.audio.filter_multi_output("asplit", number_audio_branches)
+        audio_branches = iter([audio_split[i] for i in range(number_audio_branches)])
+
+    for start, end, card_info in segments:
+        relative_start: float = start - range_start
+        relative_end: float = end - range_start
+        video_filepath: OptionalVideoFilepath = card_info[CardInfoIndex.VIDEO_FILEPATH]
+        audio_filepath: OptionalAudioFilepath = card_info[CardInfoIndex.AUDIO_FILEPATH]
+        image_filepath: OptionalImageFilepath = card_info[CardInfoIndex.IMAGE_FILEPATH]
+
+        if video_filepath:
+            output_streams.append(
+                FFMPEGOutput(
+                    _trim_video_stream(next(video_branches), relative_start, relative_end),
+                    *([_trim_audio_stream(next(audio_branches), relative_start, relative_end)] if has_audio else []),
+                    video_filepath
+                )
+            )
+        if audio_filepath:
+            output_streams.append(
+                FFMPEGOutput(
+                    _trim_audio_stream(next(audio_branches), relative_start, relative_end),
+                    audio_filepath,
+                    b=AUDIO_BITRATE
+                )
+            )
+        if image_filepath:
+            output_streams.append(
+                FFMPEGOutput(
+                    _trim_video_stream(next(video_branches), relative_start, relative_end),
+                    image_filepath,
+                    vframes=1
+                )
+            )
+
+    if not output_streams: return True
+
+    try:
+        return run_ffmpeg(
+            merge_outputs(*output_streams).global_args(
+                "-y",
+                "-nostdin",
+                "-loglevel",
+                "quiet"
+            ),
+            process_registry
+        )
+    except FFMPEGError as e:
+        _print(f"Error running ffmpeg: {e.stderr.decode() if e.stderr else e}", True)
 
-    return str(opened_sub_indexed).split("\n")
+        return False
 
 
-def create_dialogue_info(subtitle: list[str]) -> DialogueInfo:
+def create_dialogue_info(subtitle_cue: SubtitleCue) -> DialogueInfo:
     """
     create_dialogue_info
 
     Fills up info about the dialogue creating a DialogueInfo object.
 
-    :param subtitle: A list representing a subtitle in the srt format like:
-                     [ "0", "00:00:00,000 --> 00:00:00,000", "Some lines of text", "maybe some more text"]
+    :param subtitle_cue: A cue parsed from the subtitles.
     :return: A DialogueInfo object with its properties set.
     """
 
-    # dialogues = [ "0", "00:00:00,000 --> 00:00:00,000", "Some lines of dialogues", "maybe some more text"]
-
-    _start_time: str
-    _end_time: str
-    _start_time, _end_time = map(lambda s: s.replace(",", ".").strip(), subtitle[1].split("-->"))
-    _dialogue: str = "\n".join(dlg for dlg in subtitle[2:] if dlg)
-
     card_info: DialogueInfo = DialogueInfo(
-        dialogue = markup_escape_text(_dialogue, length = -1),
-        start_timestamp_field_info = TimestampFieldInfo(_start_time),
-        end_timestamp_field_info = TimestampFieldInfo(_end_time),
+        dialogue = markup_escape_text(subtitle_cue.text, length = -1),
+        start_timestamp_field_info = TimestampFieldInfo(subtitle_cue.start_ms),
+        end_timestamp_field_info = TimestampFieldInfo(subtitle_cue.end_ms),
         has_video = False,
         has_audio = False,
         has_image = False
@@ -253,6 +677,25 @@ def create_dialogue_info(subtitle: list[str]) -> DialogueInfo:
     return card_info
 
 
+def read_subtitle_cues(subtitles_filepath: OptionalFilepath) -> list[SubtitleCue]:
+    """
+    read_subtitle_cues
+
+    Returns all cues from the subtitles parsed.
+
+    :param subtitles_filepath: Filepath of the subtitle file.
+    :return: A list with the parsed cues, if no filepath was specified return an empty list.
+    """
+
+    if not subtitles_filepath:
+        return []
+
+    try:
+        return list(parse_subtitles(subtitles_filepath))
+    except OSError as e:
+        die(f"Failed to read the subtitles file {subtitles_filepath}: {e}")
+
+
 def extract_all_dialogues(subtitles_filepath: OptionalFilepath) -> list[DialogueInfo]:
     """
     extract_all_dialogues
@@ -264,20 +707,110 @@ def extract_all_dialogues(subtitles_filepath: OptionalFilepath) -> list[Dialogue
              if no filepath was specified return an empty list.
     """
 
-    list_dialogues: list[DialogueInfo] = []
+    return [create_dialogue_info(subtitle_cue) for subtitle_cue in read_subtitle_cues(subtitles_filepath)]
 
-    if not subtitles_filepath:
-        return list_dialogues
 
-    open_sub: list[Dialogue] | SubRipFile | None = open_sub_file(subtitles_filepath)
+def create_timestamp_columns(subtitle_cues: list[SubtitleCue]) -> TimestampColumns:
+    """
+    create_timestamp_columns
+
+    Gathers the start and end timestamps of the cues into columns of milliseconds.
+
+    :param subtitle_cues: List of cues.
+    :return: The timestamp columns, indexed as subtitle_cues.
+    """
+
+    return TimestampColumns(
+        [subtitle_cue.start_ms for subtitle_cue in subtitle_cues],
+        [subtitle_cue.end_ms for subtitle_cue in subtitle_cues]
+    )
+
+
+class DialoguesChunk(NamedTuple):
+    dialogues: list[str]
+    starts: list[int]
+    ends: list[int]
+    backs: list[str]
+    styles: list[str]
+    speakers: list[str]
+
 
-    if not open_sub:
-        die("open_sub_file function call failed.")
+def create_dialogues_chunks(
+    subtitle_cues: list[SubtitleCue],
+    opt_subtitle_cues: list[SubtitleCue],
+    chunk_size: int = DIALOGUES_LOADING_CHUNK_SIZE
+) -> Iterator[DialoguesChunk]:
+    """
+    create_dialogues_chunks
+
+    Turns the cues into dialogues for both list stores (front and back), chunk_size dialogues at a time,
+    the cues of the optional subtitles are aligned to the dialogues by their overlap and merged into their backs.
+
+    Nothing here touches a list store, so the chunks can be made away from the main thread.
+
+    :param subtitle_cues: Cues of the subtitles used for the front of the cards.
+    :param opt_subtitle_cues: Cues of the subtitles used for the back of the cards.
+    :param chunk_size: Number of dialogues in each chunk.
+    :return: An iterator of chunks of dialogues.
+    """
+
+    # the subtitles and its respective translations may or may not be of same lenght,
+    # dialogues without translation get an empty back
+    alignment: list[list[int]] = align_by_overlap(
+        create_timestamp_columns(subtitle_cues),
+        create_timestamp_columns(opt_subtitle_cues)
+    )
+
+    for first_index in range(0, len(subtitle_cues), chunk_size):
+        chunk: list[SubtitleCue] = subtitle_cues[first_index:first_index + chunk_size]
+
+        yield DialoguesChunk(
+            [markup_escape_text(subtitle_cue.text, length = -1) for subtitle_cue in chunk],
+            [subtitle_cue.start_ms for subtitle_cue in chunk],
+            [subtitle_cue.end_ms for subtitle_cue in chunk],
+            [
+                markup_escape_text(
+                    NEW_LINE.join(opt_subtitle_cues[opt_index].text for opt_index in opt_indexes),
+                    length = -1
+                )
+                for opt_indexes in alignment[first_index:first_index + chunk_size]
+            ],
+            [subtitle_cue.style for subtitle_cue in chunk],
+            [subtitle_cue.speaker for subtitle_cue in chunk]
+        )
 
-    for sub in open_sub:
-        list_dialogues.append(create_dialogue_info(split_dialogue_line(sub)))
 
-    return list_dialogues
+def create_dialogues_list_stores(
+    subtitles_filepath: OptionalFilepath,
+    optional_subtitles_filepath: OptionalFilepath
+) -> tuple[DialogueStore, DialogueStore]:
+    """
+    create_dialogues_list_stores
+
+    Creates both list stores (front and back) filled with the subtitles, see create_dialogues_chunks.
+
+    :param subtitles_filepath: Filepath of the subtitles used for the front of the cards.
+    :param optional_subtitles_filepath: Filepath of the subtitles used for the back of the cards.
+    :return: A tuple with the front and back list stores, the back having a dialogue for each front one.
+    """
+
+    front_field_list_store: DialogueStore = DialogueStore()
+    back_field_list_store: DialogueStore = DialogueStore()
+
+    for dialogues_chunk in create_dialogues_chunks(
+        read_subtitle_cues(subtitles_filepath),
+        read_subtitle_cues(optional_subtitles_filepath)
+    ):
+        front_field_list_store.extend(
+            dialogues_chunk.dialogues,
+            dialogues_chunk.starts,
+            dialogues_chunk.ends,
+            dialogues_chunk.styles,
+            dialogues_chunk.speakers
+        )
+        back_field_list_store.extend(dialogues_chunk.backs)
+
+    return front_field_list_store, back_field_list_store
 
 
 def set_widget_margin(
@@ -460,7 +993,12 @@ def create_cache_dir() -> None:
     """
 
     makedirs(CACHE_MEDIA_DIR, exist_ok=True)
+    makedirs(CACHE_MEDIA_STORE_DIR, exist_ok=True)
     makedirs(CACHE_SUBTITLES_DIR, exist_ok=True)
+    makedirs(CACHE_AUDIO_TRACKS_DIR, exist_ok=True)
+    makedirs(CACHE_JOBS_DIR, exist_ok=True)
+    makedirs(CACHE_VOICE_ACTIVITY_DIR, exist_ok=True)
+    makedirs(CACHE_VIDEO_METADATA_DIR, exist_ok=True)
 
 
 def cache_recently_used_files(
@@ -535,6 +1073,7 @@ def get_recently_used_files() -> dict[str, str] | None:
 def get_available_encoded_languages(video_filepath: str) -> dict[str, dict[str, str]]:
     """
     Return a dictionary of available languages, if there's any.
+    The streams are probed once per video, see VideoMetadata.
 
     :param video_filepath: Path to the video file.
     :return: Available languages.
@@ -542,34 +1081,20 @@ def get_available_encoded_languages(video_filepath: str) -> dict[str, dict[str,
 
     languages: dict[str, dict[str, str]] = {}
 
-    try:
-        streams: list[dict[str, Any]] | None = probe(
-            video_filepath,
-            select_streams = "s",
-            show_entries = "stream=index,codec_name,codec_type:stream_tags=language",
-            loglevel = "quiet"
-        ).get("streams")
-
-        if not streams:
-            return languages
+    for stream in VideoMetadata(video_filepath).get_streams("subtitle"):
+        index: str | None = stream.get("index")
+        codec_name: str | None = stream.get("codec_name")
+        tags: dict[str, str] | None = stream.get("tags")
 
-        for stream in streams:
-            index: str | None = stream.get("index")
-            codec_name: str | None = stream.get("codec_name")
-            codec_type: str | None = stream.get("codec_type")
-            tags: dict[str, str] | None = stream.get("tags")
+        if not codec_name or not tags or not index:
+            continue
 
-            if not codec_name or not tags or codec_type != "subtitle" or not index:
-                continue
+        language: str | None = tags.get("language")
 
-            language: str | None = tags.get("language")
+        if not language:
+            continue
 
-            if not language:
-                continue
-
-            languages[language + " - " + str(index)] = {"index": str(index), "language": language, "codec_name": codec_name}
-    except FFMPEGError as e:
-        _print(f"Error running ffmpeg probe: {e.stderr.decode()}", True)
+        languages[language + " - " + str(index)] = {"index": str(index), "language": language, "codec_name": codec_name}
 
     return languages
 
@@ -614,11 +1139,13 @@ def write_subtitle_file(
 
 
 __all__: list[str] = [
-    "remove_cached_media_files", "create_cache_dir", "cut_video", "extract_all_dialogues",
+    "remove_cached_media_files", "create_cache_dir", "cut_video", "cut_video_clip", "cut_videos_batch",
+    "read_subtitle_cues",
+    "extract_all_dialogues", "create_timestamp_columns", "DialoguesChunk", "create_dialogues_chunks",
+    "create_dialogues_list_stores",
     "get_tagged_text_from_text_buffer", "apply_pango_markup_to_text_buffer",
     "apply_tagged_text_to_text_buffer", "is_file_collection",
     "is_file_subtitles", "is_file_video", "cache_recently_used_files",
     "set_widget_margin", "handle_exception_if_any", "get_recently_used_files",
     "get_available_encoded_languages", "write_subtitle_file"
 ]
-
@@ -0,0 +1,46 @@
+from subprocess import Popen
+from ffmpeg     import Error as FFMPEGError
+from ffmpeg.nodes import OutputStream
+
+from asts.custom_typing.process_registry import ProcessRegistry
+
+
+def run_ffmpeg(
+    output_stream: OutputStream,
+    process_registry: ProcessRegistry | None = None,
+    input: bytes | memoryview | None = None
+) -> bool:
+    """
+    run_ffmpeg
+
+    Runs ffmpeg as OutputStream.run does, the process being registered while it runs
+    so that cancelling can kill it.
+
+    :param output_stream: Output stream, with its global arguments.
+    :param process_registry: (Optional) registry to keep track of the process in.
+    :param input: (Optional) data sent to the standard input of ffmpeg.
+    :return: True if ffmpeg ran to completion, False if it was killed through the registry.
+    :raises FFMPEGError: If ffmpeg failed.
+    """
+
+    process: Popen[bytes] = output_stream.run_async(pipe_stdin=input is not None)
+
+    if process_registry and not process_registry.register(process):
+        process.wait()
+
+        return False
+
+    try:
+        process.communicate(input)
+    finally:
+        if process_registry: process_registry.unregister(process)
+
+    # Killed by a signal
+    if process.returncode < 0 and process_registry and process_registry.is_killed(): return False
+
+    if process.returncode: raise FFMPEGError("ffmpeg", None, None)
+
+    return True
+
+
+__all__: list[str] = ["run_ffmpeg"]
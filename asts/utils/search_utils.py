@@ -0,0 +1,109 @@
+from html         import unescape
+from re           import compile
+from typing       import Pattern
+from unicodedata  import normalize
+
+
+_MARKUP_TAG_PATTERN: Pattern[str] = compile(r"<[^>]*>")
+# Katakana from ァ to ヶ sit right after their hiragana counterparts from ぁ to ゖ
+_KATAKANA_TO_HIRAGANA: dict[int, int] = {codepoint: codepoint - 0x60 for codepoint in range(0x30A1, 0x30F7)}
+_TRIGRAM_LENGTH: int = 3
+
+
+def strip_markup(markup: str) -> str:
+    """
+    strip_markup
+
+    Gets the text of Pango markup as it's displayed, without tags and with its entities unescaped.
+
+    :param markup: Pango markup.
+    :return: Displayed text.
+    """
+
+    return unescape(_MARKUP_TAG_PATTERN.sub("", markup))
+
+
+def fold_text(text: str) -> str:
+    """
+    fold_text
+
+    Folds a text so that the ways of writing the same thing compare equal.
+
+    Full and half width characters are brought to their usual width, case is folded
+    and katakana is written as hiragana, kanji are left as they are.
+
+    :param text: Text to be folded.
+    :return: Folded text.
+    """
+
+    return normalize("NFKC", text).casefold().translate(_KATAKANA_TO_HIRAGANA)
+
+
+def get_trigrams(text: str) -> set[str]:
+    """
+    get_trigrams
+
+    Gets every sequence of three characters of a text.
+
+    :param text: Text, usually folded.
+    :return: Set of trigrams, empty if the text is shorter than a trigram.
+    """
+
+    return {text[index:index + _TRIGRAM_LENGTH] for index in range(len(text) - _TRIGRAM_LENGTH + 1)}
+
+
+def get_fuzzy_distance(pattern: str, text: str) -> int:
+    """
+    get_fuzzy_distance
+
+    Gets the fewest edits (insertions, deletions or substitutions of a character)
+    turning the pattern into some part of the text.
+
+    Every column of the edit distance table is kept as bit vectors of its vertical differences, as in
+    Myers' bit-parallel algorithm, so each character of the text costs a few integer operations.
+
+    :param pattern: Pattern to be found.
+    :param text: Text to search the pattern in.
+    :return: The edit distance, 0 if the pattern is found as is.
+    """
+
+    if not pattern: return 0
+
+    mask: int = (1 << len(pattern)) - 1
+    last_bit: int = 1 << (len(pattern) - 1)
+    # character -> bits of the positions where it's found in the pattern
+    pattern_bits: dict[str, int] = {}
+
+    for position, character in enumerate(pattern):
+        pattern_bits[character] = pattern_bits.get(character, 0) | (1 << position)
+
+    positive_vertical: int = mask
+    negative_vertical: int = 0
+    distance: int = len(pattern)
+    best_distance: int = distance
+
+    for character in text:
+        equal: int = pattern_bits.get(character, 0)
+        vertical_change: int = equal | negative_vertical
+        horizontal_change: int = (((equal & positive_vertical) + positive_vertical) ^ positive_vertical) | equal
+        positive_horizontal: int = negative_vertical | (~(horizontal_change | positive_vertical) & mask)
+        negative_horizontal: int = positive_vertical & horizontal_change
+
+        if positive_horizontal & last_bit:
+            distance += 1
+        elif negative_horizontal & last_bit:
+            distance -= 1
+
+        # The pattern may start anywhere in the text, the first row of the table stays at zero
+        positive_horizontal = (positive_horizontal << 1) & mask
+        negative_horizontal = (negative_horizontal << 1) & mask
+        positive_vertical = negative_horizontal | (~(vertical_change | positive_horizontal) & mask)
+        negative_vertical = positive_horizontal & vertical_change
+        best_distance = min(best_distance, distance)
+
+        if not best_distance: return 0
+
+    return best_distance
+
+
+__all__: list[str] = ["fold_text", "get_fuzzy_distance", "get_trigrams", "strip_markup"]
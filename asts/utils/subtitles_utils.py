@@ -0,0 +1,269 @@
+from re     import compile, Match
+from typing import Iterable, Iterator, NamedTuple, Pattern, TextIO
+
+from asts.custom_typing.aliases import Filepath, OptionalFilepath
+
+
+class SubtitleCue(NamedTuple):
+    start_ms: int
+    end_ms: int
+    text: str
+    style: str = ""
+    speaker: str = ""
+
+
+# 00:00:01,000 --> 00:00:02,500, a dot is accepted as the decimal separator too
+_SRT_TIMING_PATTERN: Pattern[str] = compile(
+    r"(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})"
+)
+# 0:00:01.00, ASS times have centiseconds
+_ASS_TIME_PATTERN: Pattern[str] = compile(r"(\d+):(\d{1,2}):(\d{1,2})(?:\.(\d{1,3}))?")
+_ASS_OVERRIDE_BLOCK_PATTERN: Pattern[str] = compile(r"\{([^}]*)\}")
+_ASS_DRAWING_TAG_PATTERN: Pattern[str] = compile(r"\\p(\d+)")
+_ASS_DEFAULT_EVENTS_FORMAT: list[str] = [
+    "layer", "start", "end", "style", "name", "marginl", "marginr", "marginv", "effect", "text"
+]
+
+
+def _to_milliseconds(hours: str, minutes: str, seconds: str, fraction: str | None) -> int:
+    """
+    _to_milliseconds
+
+    Converts the parts of a timestamp to milliseconds.
+
+    :param hours: Hours.
+    :param minutes: Minutes.
+    :param seconds: Seconds.
+    :param fraction: Decimal digits of the seconds, of any precision up to milliseconds.
+    :return: Number of milliseconds.
+    """
+
+    milliseconds: int = int(fraction.ljust(3, "0")) if fraction else 0
+
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + milliseconds
+
+
+def parse_srt(lines: Iterable[str]) -> Iterator[SubtitleCue]:
+    """
+    parse_srt
+
+    Parses SubRip subtitles in a single pass, yielding the cues as they're read.
+
+    :param lines: Lines of the subtitles.
+    :return: Iterator over the cues in the order they appear.
+    """
+
+    start_ms: int = 0
+    end_ms: int = 0
+    text_lines: list[str] = []
+    is_in_cue: bool = False
+    match: Match[str] | None
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        # The index line, if any, is ignored, cues are identified by their timing line
+        match = _SRT_TIMING_PATTERN.search(line) if "-->" in line else None
+
+        if match:
+            # Cues not separated by a blank line, the index of the next cue is left out
+            if text_lines and text_lines[-1].strip().isdigit(): text_lines.pop()
+            if text_lines: yield SubtitleCue(start_ms, end_ms, "\n".join(text_lines))
+
+            start_ms = _to_milliseconds(*match.group(1, 2, 3, 4))
+            end_ms = _to_milliseconds(*match.group(5, 6, 7, 8))
+            text_lines = []
+            is_in_cue = True
+
+            continue
+
+        if not is_in_cue: continue
+
+        if line.strip():
+            text_lines.append(line)
+
+            continue
+
+        if text_lines: yield SubtitleCue(start_ms, end_ms, "\n".join(text_lines))
+
+        text_lines = []
+        is_in_cue = False
+
+    if is_in_cue and text_lines: yield SubtitleCue(start_ms, end_ms, "\n".join(text_lines))
+
+
+def strip_ass_text(text: str) -> str:
+    """
+    strip_ass_text
+
+    Converts the text of an ASS event to plain text: override tags are removed,
+    drawings are dropped and hard line breaks and hard spaces are replaced.
+
+    :param text: Text field of an ASS event.
+    :return: Plain text of the event.
+    """
+
+    if "{" in text and "\\p" not in text:
+        text = _ASS_OVERRIDE_BLOCK_PATTERN.sub("", text)
+    elif "{" in text:
+        parts: list[str] = _ASS_OVERRIDE_BLOCK_PATTERN.split(text)
+        plain_parts: list[str] = []
+        is_drawing: bool = False
+
+        # Even items are text, odd items are the content of the override blocks
+        for index, part in enumerate(parts):
+            if index % 2:
+                for scale in _ASS_DRAWING_TAG_PATTERN.findall(part):
+                    is_drawing = scale != "0"
+
+                continue
+
+            if not is_drawing: plain_parts.append(part)
+
+        text = "".join(plain_parts)
+
+    if "\\" in text:
+        text = text.replace("\\N", "\n").replace("\\n", " ").replace("\\h", " ")
+
+    return "\n".join(line.strip() for line in text.split("\n")).strip()
+
+
+def _parse_ass_time(timestamp: str) -> int | None:
+    """
+    _parse_ass_time
+
+    Parses an ASS timestamp.
+
+    :param timestamp: Timestamp like 0:00:01.00.
+    :return: Number of milliseconds, None if it isn't a valid timestamp.
+    """
+
+    match: Match[str] | None = _ASS_TIME_PATTERN.fullmatch(timestamp.strip())
+
+    if not match: return None
+
+    return _to_milliseconds(*match.group(1, 2, 3, 4))
+
+
+def parse_ass(lines: Iterable[str]) -> Iterator[SubtitleCue]:
+    """
+    parse_ass
+
+    Parses SubStation Alpha subtitles in a single pass over the [Events] section.
+    Events may be written in any order, so the cues are sorted by their start once all are read.
+
+    :param lines: Lines of the subtitles.
+    :return: Iterator over the cues sorted by their start.
+    """
+
+    cues: list[SubtitleCue] = []
+    events_format: list[str] = _ASS_DEFAULT_EVENTS_FORMAT
+    # Position of each field within the events format
+    start_index: int = events_format.index("start")
+    end_index: int = events_format.index("end")
+    style_index: int = events_format.index("style")
+    name_index: int = events_format.index("name")
+    text_index: int = events_format.index("text")
+    is_events_section: bool = False
+
+    for line in lines:
+        line = line.strip()
+
+        if line.startswith("["):
+            is_events_section = line.lower() == "[events]"
+
+            continue
+
+        if not is_events_section: continue
+
+        key, separator, value = line.partition(":")
+
+        if not separator: continue
+
+        key = key.strip().lower()
+
+        if key == "format":
+            events_format = [field.strip().lower() for field in value.split(",")]
+
+            if not {"start", "end", "text"}.issubset(events_format):
+                is_events_section = False
+
+                continue
+
+            start_index = events_format.index("start")
+            end_index = events_format.index("end")
+            style_index = events_format.index("style") if "style" in events_format else -1
+            name_index = events_format.index("name") if "name" in events_format else -1
+            text_index = events_format.index("text")
+
+            continue
+
+        # Comment events and everything else are left out
+        if key != "dialogue": continue
+
+        fields: list[str] = value.split(",", len(events_format) - 1)
+
+        if len(fields) != len(events_format): continue
+
+        start_ms: int | None = _parse_ass_time(fields[start_index])
+        end_ms: int | None = _parse_ass_time(fields[end_index])
+
+        if start_ms is None or end_ms is None: continue
+
+        text: str = strip_ass_text(fields[text_index])
+
+        if not text: continue
+
+        cues.append(
+            SubtitleCue(
+                start_ms,
+                end_ms,
+                text,
+                fields[style_index].strip() if style_index >= 0 else "",
+                fields[name_index].strip() if name_index >= 0 else ""
+            )
+        )
+
+    cues.sort(key=lambda cue: (cue.start_ms, cue.end_ms))
+
+    yield from cues
+
+
+def is_ass_file(subtitles_filepath: OptionalFilepath = None) -> bool:
+    """
+    is_ass_file
+
+    Returns true if is a .ass or .ssa subtitle file.
+
+    :param subtitles_filepath: Path to the subtitle file.
+    :return: True if it is .ass subtitle file.
+    """
+
+    if subtitles_filepath:
+        return subtitles_filepath.lower().endswith((".ass", ".ssa"))
+
+    return False
+
+
+def parse_subtitles(subtitles_filepath: Filepath) -> Iterator[SubtitleCue]:
+    """
+    parse_subtitles
+
+    Parses a subtitle file, SubRip or SubStation Alpha depending on its extension.
+    Can raise OSError in case the file can't be read.
+
+    :param subtitles_filepath: Subtitle filepath.
+    :return: Iterator over the cues of the subtitles.
+    """
+
+    f: TextIO
+
+    with open(subtitles_filepath, "r", encoding="utf-8-sig", errors="replace") as f:
+        if is_ass_file(subtitles_filepath):
+            yield from parse_ass(f)
+        else:
+            yield from parse_srt(f)
+
+
+__all__: list[str] = [
+    "SubtitleCue", "is_ass_file", "parse_ass", "parse_srt", "parse_subtitles", "strip_ass_text"
+]
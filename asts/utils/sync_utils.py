@@ -0,0 +1,219 @@
+from array      import array
+from bisect     import bisect_right
+from itertools  import accumulate
+from math       import log10
+from statistics import median
+
+from asts.custom_typing.globals import (
+    VOICE_ACTIVITY_FRAME_MS, VOICE_ACTIVITY_THRESHOLD, SYNC_MAX_OFFSET_MS,
+    SYNC_SEGMENT_MS, SYNC_MIN_SEGMENT_CUES
+)
+from asts.custom_typing.timestamp_columns import TimestampColumns
+
+
+# Lags are first searched every few frames and then refined around the best one,
+# the correlation of whole cues is wide enough to not be missed in between
+_COARSE_LAG_STEP: int = 5
+
+
+def detect_voice_activity(powers: "array[float]", threshold: float = VOICE_ACTIVITY_THRESHOLD) -> bytearray:
+    """
+    detect_voice_activity
+
+    Tells which frames of an audio envelope are voiced. The threshold sits between the quiet
+    and the loud frames of the envelope itself, on a logarithmic scale, so it follows the loudness of the video.
+
+    :param powers: Mean power of the voice band of each frame.
+    :param threshold: Where, between the quietest and the loudest frames, a frame starts being voiced.
+    :return: One byte per frame, 1 if it's voiced, 0 otherwise.
+    """
+
+    if not powers: return bytearray()
+
+    # Silence would be minus infinity, it's brought to the quietest audible power
+    levels: list[float] = [log10(power) if power > 1e-10 else -10.0 for power in powers]
+    sorted_levels: list[float] = sorted(levels)
+    quiet_level: float = sorted_levels[len(sorted_levels) // 10]
+    loud_level: float = sorted_levels[len(sorted_levels) * 95 // 100]
+    threshold_level: float = quiet_level + (loud_level - quiet_level) * threshold
+
+    return bytearray(level > threshold_level for level in levels)
+
+
+def _score_lag(
+    voiced_prefix_sums: "array[int]",
+    voiced_density: float,
+    start_frames: list[int],
+    end_frames: list[int],
+    lag: int
+) -> float:
+    """
+    _score_lag
+
+    Correlates the cues shifted by the lag with the voiced frames. Each frame within a cue counts
+    as much as it's more likely voiced than any frame, so cues shifted past the ends don't score.
+
+    :param voiced_prefix_sums: Number of voiced frames before each frame.
+    :param voiced_density: Fraction of voiced frames.
+    :param start_frames: First frame of each cue.
+    :param end_frames: Frame past the end of each cue.
+    :param lag: Frames the cues are shifted by.
+    :return: Score of the lag, the higher the better.
+    """
+
+    last_frame: int = len(voiced_prefix_sums) - 1
+    voiced_frames: int = 0
+    cue_frames: int = 0
+
+    for start_frame, end_frame in zip(start_frames, end_frames):
+        start_frame = min(max(start_frame + lag, 0), last_frame)
+        end_frame = min(max(end_frame + lag, 0), last_frame)
+        voiced_frames += voiced_prefix_sums[end_frame] - voiced_prefix_sums[start_frame]
+        cue_frames += end_frame - start_frame
+
+    return voiced_frames - voiced_density * cue_frames
+
+
+def _find_best_lag(
+    voiced_prefix_sums: "array[int]",
+    voiced_density: float,
+    start_frames: list[int],
+    end_frames: list[int],
+    min_lag: int,
+    max_lag: int
+) -> tuple[int, float]:
+    """
+    _find_best_lag
+
+    Searches the lag maximizing the correlation of the cues with the voiced frames,
+    every few lags first and then every lag around the best of those.
+
+    :param voiced_prefix_sums: Number of voiced frames before each frame.
+    :param voiced_density: Fraction of voiced frames.
+    :param start_frames: First frame of each cue.
+    :param end_frames: Frame past the end of each cue.
+    :param min_lag: Lowest lag searched, in frames.
+    :param max_lag: Highest lag searched, in frames.
+    :return: The best lag, in frames, and its score.
+    """
+
+    best_lag: int = max(
+        range(min_lag, max_lag + 1, _COARSE_LAG_STEP),
+        key=lambda lag: _score_lag(voiced_prefix_sums, voiced_density, start_frames, end_frames, lag)
+    )
+    best_lag = max(
+        range(max(min_lag, best_lag - _COARSE_LAG_STEP), min(max_lag, best_lag + _COARSE_LAG_STEP) + 1),
+        key=lambda lag: _score_lag(voiced_prefix_sums, voiced_density, start_frames, end_frames, lag)
+    )
+
+    return best_lag, _score_lag(voiced_prefix_sums, voiced_density, start_frames, end_frames, best_lag)
+
+
+def detect_sync_offsets(
+    voice_activity: bytearray,
+    timestamp_columns: TimestampColumns,
+    frame_ms: int = VOICE_ACTIVITY_FRAME_MS
+) -> list[tuple[int, int]]:
+    """
+    detect_sync_offsets
+
+    Detects how far the cues of the subtitles are from the voice of the video.
+
+    The cues are correlated with the voiced frames through prefix sums, each lag costs a pass over the cues
+    instead of a pass over the frames. Stretches of SYNC_SEGMENT_MS are searched on their own too,
+    so subtitles drifting from the audio, as when timed for another frame rate, are followed.
+    The offset of the whole video is what's used when the stretches are too few to tell.
+
+    :param voice_activity: One byte per frame of the video, 1 if it's voiced, see detect_voice_activity.
+    :param timestamp_columns: Timestamps of the cues of the subtitles, in milliseconds.
+    :param frame_ms: Duration of each frame.
+    :return: Offsets to be added to the timestamps, as pairs of a position and the offset there,
+             both in milliseconds and sorted by position, empty if no offset could be detected.
+    """
+
+    if not voice_activity or not timestamp_columns: return []
+
+    voiced_prefix_sums: array[int] = array("q", accumulate(voice_activity, initial=0))
+    voiced_density: float = voiced_prefix_sums[-1] / len(voice_activity)
+    order: list[int] = sorted(range(len(timestamp_columns)), key=timestamp_columns.get_start)
+    start_frames: list[int] = [timestamp_columns.get_start(index) // frame_ms for index in order]
+    end_frames: list[int] = [timestamp_columns.get_end(index) // frame_ms for index in order]
+    max_lag: int = SYNC_MAX_OFFSET_MS // frame_ms
+
+    global_lag: int
+    global_score: float
+    global_lag, global_score = _find_best_lag(
+        voiced_prefix_sums, voiced_density, start_frames, end_frames, -max_lag, max_lag
+    )
+
+    # The cues match the voice no better than they'd match random frames
+    if global_score <= 0: return []
+
+    segment_frames: int = SYNC_SEGMENT_MS // frame_ms
+    offsets: list[tuple[int, int]] = []
+    first_index: int = 0
+
+    while first_index < len(start_frames):
+        last_index: int = bisect_right(start_frames, start_frames[first_index] + segment_frames, first_index)
+
+        if last_index - first_index >= SYNC_MIN_SEGMENT_CUES:
+            segment_lag: int
+            segment_score: float
+            segment_lag, segment_score = _find_best_lag(
+                voiced_prefix_sums,
+                voiced_density,
+                start_frames[first_index:last_index],
+                end_frames[first_index:last_index],
+                -max_lag,
+                max_lag
+            )
+
+            if segment_score > 0:
+                offsets.append((
+                    (start_frames[first_index] + start_frames[last_index - 1]) // 2 * frame_ms,
+                    segment_lag * frame_ms
+                ))
+
+        first_index = last_index
+
+    if len(offsets) < 2: return [(0, global_lag * frame_ms)]
+
+    # A stretch mostly without dialogues can lock onto music, a median with its neighbours leaves it out
+    return [
+        (position, int(median(offset for _, offset in offsets[index - 1:index + 2])))
+        if 0 < index < len(offsets) - 1 else (position, offset)
+        for index, (position, offset) in enumerate(offsets)
+    ]
+
+
+def get_sync_offset(sync_offsets: list[tuple[int, int]], milliseconds: int) -> int:
+    """
+    get_sync_offset
+
+    Gets the offset at a position, interpolated between the offsets detected around it.
+
+    :param sync_offsets: Offsets detected, see detect_sync_offsets.
+    :param milliseconds: Position, in milliseconds.
+    :return: Offset to be added to the position, in milliseconds.
+    """
+
+    if not sync_offsets: return 0
+
+    index: int = bisect_right(sync_offsets, milliseconds, key=lambda sync_offset: sync_offset[0])
+
+    if index == 0: return sync_offsets[0][1]
+    if index == len(sync_offsets): return sync_offsets[-1][1]
+
+    previous_position: int
+    previous_offset: int
+    next_position: int
+    next_offset: int
+    previous_position, previous_offset = sync_offsets[index - 1]
+    next_position, next_offset = sync_offsets[index]
+
+    return previous_offset + (next_offset - previous_offset) * (milliseconds - previous_position) // (
+        next_position - previous_position
+    )
+
+
+__all__: list[str] = ["detect_sync_offsets", "detect_voice_activity", "get_sync_offset"]